@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    bench_codec.py: Decoding of JSON responses into payload objects, old path against the codecs
+"""
+
+import json
+import timeit
+from tttech.pyware.codec import CODECS
+from tttech.pyware.payload import create_payload
+
+
+def search_result(issues):
+    """ A JIRA search result with `issues` issues """
+    return {'startAt': 0, 'maxResults': issues, 'total': issues, 'issues': [
+        {'id': str(10000 + i), 'key': 'ABC-%d' % i, 'fields': {
+            'summary': 'Summary of issue %d' % i, 'labels': ['bulk', 'import'], 'priority': {'id': '3', 'name': 'Major'},
+            'assignee': {'name': 'user%d' % (i % 7), 'displayName': 'User %d' % (i % 7), 'active': True},
+            'customfield_10010': i * 0.5, 'components': [{'id': str(i % 5), 'name': 'Component'}]}}
+        for i in range(issues)]}
+
+
+def main():
+    for issues in (10, 1000, 20000):
+        body = json.dumps(search_result(issues)).encode('utf-8')
+        number = max(1, 2000 // issues)
+        print('%d issues, %d KiB' % (issues, len(body) // 1024))
+        # before: decoded to str (response.text), parsed, then copied into payloads
+        old = min(timeit.repeat(lambda: create_payload(json.loads(body.decode('utf-8'))), number=number, repeat=5)) / number
+        print('  %-20s %9.3f ms' % ('text+json+copy', old * 1000))
+        for name, codec_cls in CODECS.items():
+            codec = codec_cls()
+            t = min(timeit.repeat(lambda: create_payload(codec.loads(body)), number=number, repeat=5)) / number
+            print('  %-20s %9.3f ms  %.2fx' % (name + '+copy', t * 1000, old / t))
+            t = min(timeit.repeat(lambda: codec.loads(body), number=number, repeat=5)) / number
+            print('  %-20s %9.3f ms  %.2fx' % (name + ' (plain)', t * 1000, old / t))
+        # what the codecs use for payloads: one pass, the object hook builds the payloads
+        t = min(timeit.repeat(lambda: CODECS['json']().loads_payload(body), number=number, repeat=5)) / number
+        print('  %-20s %9.3f ms  %.2fx' % ('loads_payload', t * 1000, old / t))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    bench_json_stream.py: Peak memory and time of decoding a large JSON array at once and element by element
+"""
+
+import json
+import time
+import tracemalloc
+from tttech.pyware.codec import JsonCodec
+from tttech.pyware.json_stream import iter_json_items
+from bench_codec import search_result
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    body = json.dumps(search_result(200000)).encode('utf-8')
+    chunks = lambda: (body[i:i + 64 * 1024] for i in range(0, len(body), 64 * 1024))
+    print('200000 issues, %d MiB, read in 64 KiB chunks' % (len(body) // 2 ** 20))
+
+    def at_once():
+        # the body is read as a whole, then decoded
+        count = 0
+        for issue in JsonCodec().loads_payload(b''.join(chunks())).issues:
+            count += 1
+
+    def streamed():
+        count = 0
+        for issue in iter_json_items(chunks(), 'issues'):
+            count += 1
+
+    for name, fn in [('at once', at_once), ('streamed', streamed)]:
+        elapsed, peak = measure(fn)
+        print('  %-10s %8.1f ms  peak %8.2f MiB' % (name, elapsed * 1000, peak / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
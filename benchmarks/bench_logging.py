@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    bench_logging.py: Time per call of a generated method, logging as it is now against the eager logging it replaced
+"""
+
+import os
+import timeit
+import logging
+import requests
+from tttech.pyware.core import RestHandler
+from tttech.pyware.client_builder import ClientBuilder
+
+WADL = os.path.join(os.path.dirname(__file__), '..', 'tests', 'jira-rest-plugin-7.6.9.wadl')
+BODY = b'{"key": "ABC-1", "fields": {"summary": "' + b'x' * 20000 + b'"}}'
+LOGGERS = ('', 'tttech.pyware.client_builder', 'tttech.pyware.wadl_parser')
+
+
+def response():
+    response = requests.Response()
+    response.status_code = 200
+    response.headers['Content-Type'] = 'application/json'
+    response._content = BODY
+    return response
+
+
+def per_call(fn, number=5000):
+    return min(timeit.repeat(fn, number=number, repeat=7)) / number
+
+
+def old_call_logging(logger, url, response):
+    """ What a generated method logged per call before: seven debug lines, the arguments made strings before
+        the level check, and the response body
+    """
+    logger.debug("Template params: %s", str(['issueIdOrKey']))
+    logger.debug("Template args  : %s", str(['ABC-1']))
+    logger.debug("Query params   : %s", str(['fields', 'expand', 'properties', 'updateHistory']))
+    logger.debug("Query args     : %s", str({'fields': 'summary', 'expand': 'names'}))
+    logger.debug("URL            : %s", url)
+    logger.debug("DATADICT       : %s", None)
+    logger.debug("Files          : %s", 0)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(response.text)
+
+
+def old_configuration(stream):
+    """ What building a client did to logging before: basicConfig at DEBUG, the client_builder logger at DEBUG """
+    logging.getLogger().handlers = [logging.StreamHandler(stream)]
+    logging.getLogger().handlers[0].setFormatter(logging.Formatter('%(message)s'))
+    logging.getLogger().setLevel(logging.DEBUG)
+    logging.getLogger('tttech.pyware.client_builder').setLevel(logging.DEBUG)
+
+
+def warning_configuration():
+    """ An application logging warnings and errors only """
+    logging.getLogger().handlers = [logging.NullHandler()]
+    for name in LOGGERS:
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+def restore(handlers, levels):
+    logging.getLogger().handlers = handlers
+    for name, level in levels.items():
+        logging.getLogger(name).setLevel(level)
+
+
+def main():
+    handler = RestHandler(base_url='https://www.example.com/rest', user='user', password='password')
+    # no transport: what is measured is the work of pyware itself
+    handler._send = lambda *args: response()
+    client = ClientBuilder(wadl_file=WADL, api_prefix='api/2', rest_handler=handler)
+    call = lambda: client.issue.get('ABC-1', fields='summary', expand='names')
+
+    # the old way: the current call, with its own per-call debug lines dropped for the seven it replaced
+    parser_logger = logging.getLogger('tttech.pyware.wadl_parser')
+    url = handler.base_url + '/api/2/issue/ABC-1'
+    body = response()
+    old_call = lambda: (old_call_logging(parser_logger, url, body), call())
+    only_old = lambda record: record.funcName == 'old_call_logging'
+
+    saved = (list(logging.getLogger().handlers), {name: logging.getLogger(name).level for name in LOGGERS})
+    devnull = open(os.devnull, 'w')
+    try:
+        parser_logger.addFilter(only_old)
+        old_configuration(devnull)
+        print('old, as constructed:  %.1f us per call' % (per_call(old_call) * 1e6))
+        warning_configuration()
+        print('old, level WARNING:   %.1f us per call' % (per_call(old_call) * 1e6))
+        parser_logger.removeFilter(only_old)
+
+        # as the library leaves it now: an application which does not configure logging
+        restore(*saved)
+        print('now, as constructed:  %.1f us per call' % (per_call(call) * 1e6))
+        warning_configuration()
+        print('now, level WARNING:   %.1f us per call' % (per_call(call) * 1e6))
+    finally:
+        parser_logger.removeFilter(only_old)
+        restore(*saved)
+        devnull.close()
+
+if __name__ == '__main__':
+    main()
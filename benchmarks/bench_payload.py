@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    bench_payload.py: Conversion time and peak memory of eager and lazy payloads, reading two fields of a large response
+"""
+
+import json
+import timeit
+import tracemalloc
+from tttech.pyware.codec import get_codec
+from tttech.pyware.payload import create_payload, create_lazy_payload
+from bench_codec import search_result
+
+
+def peak_memory(fn):
+    tracemalloc.start()
+    result = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    codec = get_codec()
+    body = json.dumps(search_result(20000)).encode('utf-8')
+    print('20000 issues, %d KiB, codec %s' % (len(body) // 1024, codec.name))
+    paths = [
+        ('text+json+copy', lambda: create_payload(json.loads(body.decode('utf-8')))),
+        ('loads_payload', lambda: codec.loads_payload(body)),
+        ('loads_lazy_payload', lambda: codec.loads_lazy_payload(body)),
+    ]
+    for name, decode in paths:
+        read = lambda: (lambda page: (page.total, page.issues[0].key))(decode())
+        t = min(timeit.repeat(read, number=1, repeat=5))
+        # memory beyond the body: the conversion, and what it keeps
+        print('  %-20s %9.1f ms  peak %7.1f MiB' % (name, t * 1000, peak_memory(read) / 2 ** 20))
+    print('the conversion of the decoded result alone:')
+    decoded = codec.loads(body)
+    for name, convert in [('create_payload', create_payload), ('create_lazy_payload', create_lazy_payload)]:
+        read = lambda: convert(decoded).issues[0].key
+        t = min(timeit.repeat(read, number=1, repeat=5))
+        print('  %-20s %9.1f ms  peak %7.1f MiB' % (name, t * 1000, peak_memory(read) / 2 ** 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    bench_records.py: Memory held by 100k issues as payloads and as records made from the schema of the search method
+"""
+
+import os
+import gc
+import time
+import logging
+import tracemalloc
+from tttech.pyware.wadl_parser import WadlParser
+from tttech.pyware.payload import create_payload
+from bench_codec import search_result
+
+WADL = os.path.join(os.path.dirname(__file__), '..', 'tests', 'jira-rest-plugin-7.6.9.wadl')
+
+
+def held_memory(fn):
+    """ Return the bytes held by the result of `fn` """
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return held
+
+
+def seconds(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    logging.disable(logging.INFO)
+    parser = WadlParser(WADL)
+    search = next(method for resource in parser._resources for method in resource._methods if method.__name__ == 'search')
+    decoder = parser._record_decoder(search)
+    decoded = search_result(100000)
+    print('100000 issues')
+    # the first response fills in the records of the issue fields, which the schema leaves open
+    print('  %-12s %8.1f ms' % ('first', seconds(lambda: decoder.decode(decoded)) * 1000))
+    for name, convert in [('DictPayLoad', create_payload), ('records', decoder.decode)]:
+        print('  %-12s %8.1f ms %8.1f MiB' % (name, seconds(lambda: convert(decoded)) * 1000, held_memory(lambda: convert(decoded)) / 2 ** 20))
+    print('  issue record: %s' % type(decoder.decode(search_result(1)).issues[0]).__name__)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    bench_scaling.py: Time and peak memory of WadlParser, ClientBuilder, its flat naming scheme and the docs of docs_handler by size of the WADL
+
+    python bench_scaling.py --sizes 50 200 800 --depth 4 --params 10 --conflict-rate 0.3
+"""
+
+import os
+import sys
+import math
+import time
+import types
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from tttech.pyware.wadl_parser import WadlParser
+from tttech.pyware.client_builder import ClientBuilder
+from tttech.pyware.docs_handler import HtmlHelp, MethodInfoExtractor
+from wadl_generator import write_wadl
+
+
+def html_docs(client):
+    """ What the web command renders, without the browser """
+    printer = HtmlHelp(MethodInfoExtractor)
+    return '\n'.join(line for method in vars(client._func).values() for line in printer.print_html(method))
+
+
+def unnamed_client(path):
+    """ A client of a parsed WADL, before its flat naming scheme is built """
+    client = ClientBuilder.__new__(ClientBuilder)
+    client.logger = logging.getLogger('tttech.pyware.client_builder')
+    client._wadl = WadlParser(wadl_file=path)
+    client._PREFIX = 'api/2'
+    client._func = types.SimpleNamespace()
+    return client
+
+
+def measure(fn, setup=None):
+    """ Seconds of one run, then the peak of the memory allocated during a second, traced run.
+        `setup` runs untimed and untraced before each run, its result is passed to `fn`
+    """
+    state = setup() if setup is not None else None
+    started = time.perf_counter()
+    fn(state)
+    seconds = time.perf_counter() - started
+    state = setup() if setup is not None else None
+    tracemalloc.start()
+    result = fn(state)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return seconds, peak
+
+
+def slope(points):
+    """ Exponent of the growth: the slope of log(value) over log(size), 1.0 is linear """
+    xs = [math.log(x) for x, _ in points]
+    ys = [math.log(max(y, 1e-12)) for _, y in points]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    var = sum((x - mx) ** 2 for x in xs)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / var if var else float('nan')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Scaling of pyware with the size of the WADL')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 800], help='Top resources of the WADLs')
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--methods', type=int, default=2)
+    parser.add_argument('--params', type=int, default=10)
+    parser.add_argument('--doc-size', type=int, default=200)
+    parser.add_argument('--conflict-rate', type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    rows = {'WadlParser': [], 'ClientBuilder': [], 'flat naming': [], 'docs (web)': []}
+    print('%-14s %8s %8s %10s %12s %12s' % ('stage', 'size', 'methods', 'KiB', 'seconds', 'peak MiB'))
+    for size in args.sizes:
+        fd, path = tempfile.mkstemp(suffix='.wadl')
+        os.close(fd)
+        try:
+            write_wadl(path, resources=size, depth=args.depth, methods=args.methods, params=args.params,
+                       doc_size=args.doc_size, conflict_rate=args.conflict_rate)
+            kib = os.path.getsize(path) // 1024
+            client = ClientBuilder(wadl_file=path, api_prefix='api/2')
+            methods = client._wadl.method_count
+            for stage, fn, setup in (
+                ('WadlParser', lambda _: WadlParser(wadl_file=path), None),
+                ('ClientBuilder', lambda _: ClientBuilder(wadl_file=path, api_prefix='api/2'), None),
+                # the part of ClientBuilder which resolves the name conflicts
+                ('flat naming', lambda unnamed: unnamed._build_flat_naming_scheme(), lambda: unnamed_client(path)),
+                ('docs (web)', lambda _: html_docs(client), None),
+            ):
+                seconds, peak = measure(fn, setup)
+                rows[stage].append((methods, seconds, peak))
+                print('%-14s %8d %8d %10d %12.3f %12.1f' % (stage, size, methods, kib, seconds, peak / 2 ** 20))
+        finally:
+            os.remove(path)
+
+    if len(args.sizes) > 1:
+        print('\ngrowth by number of methods (1.0 = linear)')
+        for stage, points in rows.items():
+            print('%-14s time ^%.2f  memory ^%.2f' % (
+                stage, slope([(m, s) for m, s, _ in points]), slope([(m, p) for m, _, p in points]),
+            ))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
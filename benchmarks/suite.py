@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    suite.py: Benchmark suite of WADL parsing, client construction, call overhead and payload decoding, compared to a baseline
+
+    python suite.py --save baseline.json                     # once, on the reference version
+    python suite.py --baseline baseline.json --threshold 0.1 # exit code 1 if a benchmark got more than 10% slower
+"""
+
+import os
+import sys
+import json
+import time
+import types
+import logging
+import argparse
+import platform
+import requests
+from tttech.pyware.core import RestHandler
+from tttech.pyware.wadl_parser import WadlParser
+from tttech.pyware.client_builder import ClientBuilder
+from tttech.pyware.payload import create_payload
+from tttech.pyware.codec import get_codec
+from bench_codec import search_result
+
+WADL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests', 'jira-rest-plugin-7.6.9.wadl')
+
+
+class StandInAdapter(requests.adapters.BaseAdapter):
+    """ Answers at once with the same body: what is timed is the work of pyware and requests """
+
+    def __init__(self, body):
+        super().__init__()
+        self.body = body
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers['Content-Type'] = 'application/json'
+        response._content = self.body
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def best(fn, number=1, repeat=5, setup=None):
+    """ The fastest of `repeat` runs of `number` calls, in seconds per call; `setup` runs untimed before each run
+        and its result is passed to `fn`
+    """
+    times = []
+    for _ in range(repeat):
+        state = setup() if setup is not None else None
+        started = time.perf_counter()
+        for _ in range(number):
+            fn(state)
+        times.append((time.perf_counter() - started) / number)
+    return min(times)
+
+
+def unbuilt_client():
+    """ A client of a parsed WADL, before its flat naming scheme is built """
+    client = ClientBuilder.__new__(ClientBuilder)
+    client.logger = logging.getLogger('tttech.pyware.client_builder')
+    client._wadl = WadlParser(wadl_file=WADL)
+    client._PREFIX = 'api/2'
+    client._func = types.SimpleNamespace()
+    return client
+
+
+def stand_in_client(body):
+    handler = RestHandler(base_url='https://www.example.com/rest', user='user', password='password')
+    handler._requests_session.mount('https://', StandInAdapter(body))
+    return ClientBuilder(wadl_file=WADL, api_prefix='api/2', rest_handler=handler)
+
+
+def benchmarks(quick=False):
+    """ Yield (name, function timing the benchmark in seconds per operation) """
+    repeat = 3 if quick else 7
+    yield 'parse.wadl', lambda: best(lambda _: WadlParser(wadl_file=WADL), repeat=repeat)
+    yield 'build.client', lambda: best(lambda _: ClientBuilder(wadl_file=WADL, api_prefix='api/2'), repeat=repeat)
+    yield 'build.flat_naming', lambda: best(lambda client: client._build_flat_naming_scheme(), repeat=repeat, setup=unbuilt_client)
+
+    issue = json.dumps(search_result(1)['issues'][0]).encode('utf-8')
+    client = stand_in_client(issue)
+    calls = 200 if quick else 2000
+    yield 'call.get', lambda: best(lambda _: client.issue.get('ABC-1'), number=calls, repeat=repeat)
+    yield 'call.get_query', lambda: best(lambda _: client.issue.get('ABC-1', fields='summary,labels', expand='names'), number=calls, repeat=repeat)
+    yield 'call.post', lambda: best(lambda _: client.issue.post(data_dict={'fields': {'summary': 'New issue', 'labels': ['bench']}}), number=calls, repeat=repeat)
+    yield 'call.get_raw', lambda: best(lambda _: client.issue.get('ABC-1', requests_response=True), number=calls, repeat=repeat)
+
+    codec = get_codec('json')
+    for issues in (10, 1000, 20000):
+        data = search_result(issues)
+        body = json.dumps(data).encode('utf-8')
+        number = max(1, (200 if quick else 2000) // issues)
+        yield 'decode.payload_%d' % issues, lambda body=body, number=number: best(lambda _: codec.loads_payload(body), number=number, repeat=repeat)
+        yield 'decode.create_payload_%d' % issues, lambda data=data, number=number: best(lambda _: create_payload(data), number=number, repeat=repeat)
+
+
+def compare(results, baseline, threshold):
+    """ Return the lines of the comparison and the names of the benchmarks slower than the baseline by more than `threshold` """
+    lines = []
+    regressions = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            lines.append('%-28s %12.3f us   (new)' % (name, seconds * 1e6))
+            continue
+        change = seconds / before - 1
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        elif change < -threshold:
+            flag = '  faster'
+        lines.append('%-28s %12.3f us %+7.1f%%%s' % (name, seconds * 1e6, change * 100, flag))
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark suite of pyware')
+    parser.add_argument('--save', metavar='FILE', help='Save the results as JSON')
+    parser.add_argument('--baseline', metavar='FILE', help='Compare to the results saved before')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Slowdown counted as a regression, 0.1 = 10%%')
+    parser.add_argument('--filter', default='', help='Run the benchmarks whose name contains this only')
+    parser.add_argument('--quick', action='store_true', help='Fewer runs, for a smoke test')
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, timed in benchmarks(args.quick):
+        if args.filter in name:
+            results[name] = seconds = timed()
+            if not args.baseline:
+                print('%-28s %12.3f us' % (name, seconds * 1e6))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get('python') != platform.python_version():
+            print('Baseline of Python %s, running %s' % (baseline.get('python'), platform.python_version()))
+        lines, regressions = compare(results, baseline['results'], args.threshold)
+        print('\n'.join(lines))
+        if regressions:
+            print('%d regression(s) above %.0f%%: %s' % (len(regressions), args.threshold * 100, ', '.join(regressions)))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'python': platform.python_version(), 'machine': platform.machine(), 'results': results}, f, indent=2, sort_keys=True)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    wadl_generator.py: Synthetic WADL files of any size, for scaling benchmarks
+
+    python wadl_generator.py big.wadl --resources 2000 --depth 6 --params 20 --conflict-rate 0.3
+"""
+
+import sys
+import random
+import argparse
+from xml.sax.saxutils import escape
+
+VERBS = ('GET', 'POST', 'PUT', 'DELETE')
+WORDS = ('issue', 'project', 'user', 'group', 'version', 'component', 'field', 'filter', 'board', 'sprint', 'role', 'scheme')
+
+
+def _doc(rnd, size):
+    if not size:
+        return ''
+    text = ' '.join(rnd.choice(WORDS) for _ in range(size // 6 + 1))[:size]
+    return '<ns2:doc><![CDATA[%s]]></ns2:doc>' % text
+
+
+def _method(rnd, out, verb, method_id, params, doc_size):
+    out.append('<ns2:method id="%s" name="%s">%s' % (method_id, verb, _doc(rnd, doc_size)))
+    if params or verb in ('POST', 'PUT'):
+        out.append('<ns2:request>')
+        for p in range(params):
+            out.append('<ns2:param name="%s%d" style="query" type="xs:string" xmlns:xs="http://www.w3.org/2001/XMLSchema">%s</ns2:param>'
+                       % (rnd.choice(WORDS), p, _doc(rnd, doc_size // 4)))
+        if verb in ('POST', 'PUT'):
+            out.append('<ns2:representation mediaType="application/json"/>')
+        out.append('</ns2:request>')
+    status = '204' if verb == 'DELETE' else '200'
+    out.append('<ns2:response status="%s">' % status)
+    if status == '200':
+        out.append('<ns2:representation mediaType="application/json">%s</ns2:representation>' % _doc(rnd, doc_size))
+    out.append('</ns2:response></ns2:method>')
+
+
+def _resource(rnd, out, name, path, level, options):
+    out.append('<ns2:resource path="%s">' % escape(path))
+    if path.startswith('{'):
+        out.append('<ns2:param name="%s" style="template" type="xs:string" xmlns:xs="http://www.w3.org/2001/XMLSchema"/>' % path[1:-1])
+    for verb in VERBS[:options['methods']]:
+        # a conflicting method takes a name used by many resources, e.g. getItem, the flat naming scheme has to resolve it
+        if rnd.random() < options['conflict_rate']:
+            method_id = '%sItem' % verb.lower()
+        else:
+            method_id = '%s%s' % (verb.lower(), name)
+        _method(rnd, out, verb, method_id, options['params'], options['doc_size'])
+    if level < options['depth']:
+        # entity below a collection, then a sub-collection below the entity
+        child = '{%sId%d}' % (name[:1].lower() + name[1:], level) if not path.startswith('{') else rnd.choice(WORDS) + str(level)
+        _resource(rnd, out, name + 'Sub%d' % level, child, level + 1, options)
+    out.append('</ns2:resource>')
+
+
+def generate_wadl(resources=100, depth=3, methods=2, params=5, doc_size=200, conflict_rate=0.2, prefix='api/2', seed=0):
+    """ Return a WADL document with `resources` top resources, each nesting `depth` levels of resources below it.
+
+        Each resource has `methods` methods (GET, POST, PUT, DELETE in this order) with `params` query parameters and docs of
+        `doc_size` characters. A share `conflict_rate` of the methods get a name which other resources use as well.
+    """
+    rnd = random.Random(seed)
+    options = {'depth': depth, 'methods': max(1, min(methods, len(VERBS))), 'params': params, 'doc_size': doc_size, 'conflict_rate': conflict_rate}
+    out = [
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        '<ns2:application xmlns:ns2="http://wadl.dev.java.net/2009/02">',
+        '<ns2:doc title="Synthetic API"/>',
+        '<ns2:resources base="http://www.example.com/rest/">',
+    ]
+    for i in range(resources):
+        word = WORDS[i % len(WORDS)]
+        name = word.capitalize() + str(i)
+        _resource(rnd, out, name, '%s/%s%d' % (prefix, word, i), 1, options)
+    out.append('</ns2:resources></ns2:application>\n')
+    return ''.join(out)
+
+
+def write_wadl(path, **options):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(generate_wadl(**options))
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic WADL file')
+    parser.add_argument('path')
+    parser.add_argument('--resources', type=int, default=100, help='Top resources')
+    parser.add_argument('--depth', type=int, default=3, help='Levels of resources, nested below each top resource')
+    parser.add_argument('--methods', type=int, default=2, help='Methods per resource, at most 4')
+    parser.add_argument('--params', type=int, default=5, help='Query parameters per method')
+    parser.add_argument('--doc-size', type=int, default=200, help='Characters per doc')
+    parser.add_argument('--conflict-rate', type=float, default=0.2, help='Share of the methods with a name used elsewhere')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    write_wadl(
+        args.path, resources=args.resources, depth=args.depth, methods=args.methods, params=args.params,
+        doc_size=args.doc_size, conflict_rate=args.conflict_rate, seed=args.seed,
+    )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
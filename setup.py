@@ -41,5 +41,9 @@ setup(
         'requests_kerberos',
         'lxml',
     ],
+    extras_require={
+        'compression': ['zstandard', 'brotli'],
+        'json': ['orjson'],
+    },
     include_package_data=True,
     dist_files=dist_files)
@@ -0,0 +1,104 @@
+import io
+import time
+import unittest
+import requests
+from tttech.pyware.core import RestHandler
+from tttech.pyware.client_builder import ClientBuilder
+from tttech.pyware.records import RecordFactory
+
+WADL = 'jira-rest-plugin-7.6.9.wadl'
+
+
+class StubAdapter(requests.adapters.BaseAdapter):
+    """ Answer every request locally and keep the requests.
+
+        `body` and `status` are values, or functions of the request returning them; `status` may be a list answered in
+        turn. With `raw` the body is a stream, read only when the response is consumed. `delay` seconds pass before
+        each answer.
+    """
+
+    def __init__(self, body=b'{"key": "ABC-1"}', status=200, content_type='application/json', headers=None, raw=False, delay=0):
+        super().__init__()
+        self.body = body
+        self.status = list(status) if isinstance(status, (list, tuple)) else status
+        self.content_type = content_type
+        self.headers = headers or {}
+        self.raw = raw
+        self.delay = delay
+        self.requests = []
+        self.streamed = []
+        self.last_raw = None
+        self.raws = []
+
+    @property
+    def calls(self):
+        return len(self.requests)
+
+    @property
+    def urls(self):
+        return [request.url for request in self.requests]
+
+    def send(self, request, stream=False, **kwargs):
+        self.requests.append(request)
+        self.streamed.append(stream)
+        if self.delay:
+            time.sleep(self.delay)
+        response = requests.Response()
+        if isinstance(self.status, list):
+            response.status_code = self.status.pop(0)
+        else:
+            response.status_code = self.status(request) if callable(self.status) else self.status
+        response.headers['Content-Type'] = self.content_type
+        response.headers.update(self.headers)
+        body = self.body(request) if callable(self.body) else self.body
+        if self.raw:
+            response.raw = self.last_raw = io.BytesIO(body)
+            self.raws.append(response.raw)
+            if not stream:
+                response.content
+        else:
+            response._content = body
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+def stub_handler(adapter=None, base_url='https://www.example.com/rest', **options):
+    """ Return a RestHandler answered by `adapter` (a StubAdapter by default), and the adapter """
+    handler = RestHandler(base_url=base_url, user='user', password='password', **options)
+    adapter = adapter if adapter is not None else StubAdapter()
+    handler._requests_session.mount('https://', adapter)
+    return handler, adapter
+
+
+def jira_model():
+    """ A new client of the JIRA WADL, without handler: bind it to one """
+    return ClientBuilder(wadl_file=WADL, api_prefix='api/2')
+
+
+def reset_model(model):
+    """ Forget what calls taught the methods of `model`: their record decoders and the record classes """
+    model._wadl.records = RecordFactory()
+    model._wadl._item_records = {}
+    for resource in model._wadl._resources:
+        for method in resource._methods:
+            method._records = None
+
+
+class JiraTestCase(unittest.TestCase):
+    """ Tests calling the JIRA WADL: the model is built once per test class and reset before each test """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = jira_model()
+
+    def setUp(self):
+        reset_model(self.model)
+
+    def jira_client(self, rest_handler):
+        """ A client of the model of the test class calling through `rest_handler` """
+        return self.model.bind(rest_handler)
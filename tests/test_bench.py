@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+import requests
+from tttech.pyware.bench import run, load_arg_sets, error_kind
+from tests.stubs import StubAdapter, JiraTestCase, stub_handler
+
+
+class TestBench(JiraTestCase):
+    def setUp(self):
+        super().setUp()
+        # 404 for the issue NONE-1
+        handler, _ = stub_handler(StubAdapter(status=lambda request: 404 if 'NONE-1' in request.url else 200))
+        self.client = self.jira_client(handler)
+
+    def test_concurrency(self):
+        result = run(self.client.issue.get, [(('ABC-1',), {}), (('NONE-1',), {'fields': 'summary'})], concurrency=4, duration=0.3)
+        d = result.to_dict()
+        self.assertGreater(d['requests'], 10)
+        self.assertEqual(d['errors'], {'HTTP 404': result.errors['HTTP 404']})
+        self.assertAlmostEqual(result.errors['HTTP 404'] / d['requests'], 0.5, delta=0.1)
+        self.assertGreater(d['latency']['p99'], 0.0)
+        self.assertIn('HTTP 404', result.format())
+
+    def test_rate(self):
+        result = run(self.client.issue.get, [(('ABC-1',), {})], concurrency=2, rate=100, duration=0.5)
+        self.assertEqual(result.requests, 50)
+        self.assertFalse(result.errors)
+
+    def test_arg_sets(self):
+        fd, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(fd, 'w') as f:
+            f.write('["ABC-1"]\n\n{"fields": "summary"}\n{"args": ["ABC-2"], "kwargs": {"expand": "names"}}\n"ABC-3"\n')
+        try:
+            self.assertEqual(load_arg_sets(path), [
+                (('ABC-1',), {}), ((), {'fields': 'summary'}), (('ABC-2',), {'expand': 'names'}), (('ABC-3',), {}),
+            ])
+        finally:
+            os.remove(path)
+        self.assertEqual(error_kind(Exception('Error 503: unavailable')), 'HTTP 503')
+        self.assertEqual(error_kind(requests.ConnectionError()), 'ConnectionError')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import io
+import sys
+import unittest
+import contextlib
+import tracemalloc
+from unittest import mock
+from tttech.pyware.client_builder import ClientBuilder
+from tttech.pyware.core import RestHandler
+from tttech.pyware.mock_server import MockServer
+from tttech.pyware.docs_handler import cmd_parsing
+from tests.stubs import WADL, StubAdapter, stub_handler
+
+
+def tenant_handler(tenant):
+    body = ('{"key": "ABC-1", "tenant": "%s"}' % tenant).encode()
+    return stub_handler(StubAdapter(body=body), base_url='https://%s.example.com/rest' % tenant)
+
+
+class TestBind(unittest.TestCase):
+    def setUp(self):
+        self.handler, self.adapter = tenant_handler('a')
+        self.client = ClientBuilder(wadl_file=WADL, api_prefix='api/2', rest_handler=self.handler)
+
+    def test_bound_client_calls_through_its_handler(self):
+        handler, adapter = tenant_handler('b')
+        bound = self.client.bind(handler)
+        self.assertEqual(bound.issue.get('ABC-1').tenant, 'b')
+        self.assertEqual(bound._func.getIssue('ABC-1').tenant, 'b')
+        self.assertEqual(self.client.issue.get('ABC-1').tenant, 'a')
+        self.assertEqual(adapter.urls, ['https://b.example.com/rest/api/2/issue/ABC-1'] * 2)
+        self.assertEqual(self.adapter.urls, ['https://a.example.com/rest/api/2/issue/ABC-1'])
+        self.assertEqual(bound.bind(self.handler).issue.get('ABC-1').tenant, 'a')
+
+    def test_bound_client_shares_the_model(self):
+        bound = self.client.bind(tenant_handler('b')[0])
+        method = bound.issue.get
+        self.assertEqual(method.__name__, 'getIssue')
+        self.assertIs(method.__doc__, self.client.issue.get.__doc__)
+        self.assertIs(method._path_params, self.client.issue.get._path_params)
+        self.assertIs(bound.issue.get, method)
+
+    def test_bind_allocates_no_more_than_the_client(self):
+        handler = tenant_handler('b')[0]
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        bound = self.client.bind(handler)
+        allocated = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        self.assertLess(allocated, 1024)
+        self.assertIsNotNone(bound)
+
+    def test_mock_server_of_a_bound_client(self):
+        bound = self.client.bind(tenant_handler('b')[0])
+        with MockServer(bound, base_path='rest') as server:
+            self.assertIs(server.client, self.client)
+            client = bound.bind(RestHandler(base_url=server.url, user='user', password='password'))
+            self.assertEqual(client.resolution.get('1').name, 'Fixed')
+
+    def test_docs_of_a_bound_client(self):
+        bound = self.client.bind(tenant_handler('b')[0])
+        for wadl in (self.client, bound):
+            out = io.StringIO()
+            with mock.patch.object(sys, 'argv', ['pyware', 'list']), contextlib.redirect_stdout(out):
+                cmd_parsing(wadl=wadl)
+            names = out.getvalue().split()
+            self.assertIn('getIssue', names)
+            self.assertEqual(len(names), len(vars(self.client._func)))
+        out = io.StringIO()
+        with mock.patch.object(sys, 'argv', ['pyware', 'help', 'getIssue']), contextlib.redirect_stdout(out):
+            cmd_parsing(wadl=bound)
+        self.assertIn('getIssue', out.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import os
+import time
+import tempfile
+from tttech.pyware.cache import SqliteResponseCache
+from tttech.pyware.core import RestHandler
+from tests.stubs import StubAdapter, JiraTestCase, stub_handler
+
+
+class TestSqliteResponseCache(JiraTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'responses.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_set_and_get(self):
+        cache = SqliteResponseCache(self.path)
+        body = b'{"name": "field"}' * 100
+        cache.set('GET a', 'https://host/a', 200, {'Content-Type': 'application/json', 'Content-Encoding': 'gzip'}, body)
+        status, headers, cached_body = cache.get('GET a')
+        self.assertEqual(status, 200)
+        self.assertEqual(cached_body, body)
+        self.assertNotIn('Content-Encoding', headers)
+        # a second instance, e.g. in another worker, sees the same entry
+        self.assertEqual(SqliteResponseCache(self.path).get('GET a')[2], body)
+        # the body is stored compressed
+        self.assertLess(cache.size()[1], len(body))
+
+    def test_age_eviction(self):
+        cache = SqliteResponseCache(self.path, max_age=0.05)
+        cache.set('GET a', 'https://host/a', 200, {}, b'x')
+        time.sleep(0.1)
+        self.assertIsNone(cache.get('GET a'))
+
+    def test_size_eviction(self):
+        cache = SqliteResponseCache(self.path, max_size=2500, compress_min_size=10 ** 6)
+        for i in range(5):
+            cache.set('GET %d' % i, 'https://host/%d' % i, 200, {}, os.urandom(1000))
+        cache.evict()
+        self.assertEqual(cache.size()[0], 2)
+        self.assertIsNone(cache.get('GET 0'))
+        self.assertIsNotNone(cache.get('GET 4'))
+
+    def test_rest_handler_serves_get_from_cache(self):
+        handler, adapter = stub_handler(StubAdapter(body=b'{"id": "1"}'), response_cache=SqliteResponseCache(self.path))
+        for _ in range(3):
+            response = handler.do_request('api/2/field', 'GET')
+            self.assertEqual(response.json(), {'id': '1'})
+        self.assertEqual(adapter.calls, 1)
+        self.assertEqual(handler.stats['cache_hits'], 2)
+
+    def test_cache_is_per_user(self):
+        cache = SqliteResponseCache(self.path)
+        adapters = []
+        for user in ('alice', 'bob', 'alice'):
+            handler = RestHandler(base_url='https://www.example.com/rest', user=user, password='password', response_cache=cache)
+            adapters.append(StubAdapter())
+            handler._requests_session.mount('https://', adapters[-1])
+            handler.do_request('api/2/myself', 'GET')
+            handler.do_request('api/2/myself', 'GET', headers={'Authorization': 'Bearer token-of-carol'})
+        # bob does not get the response of alice, alice (in another worker) gets her own; a token is a user of its own
+        self.assertEqual([adapter.calls for adapter in adapters], [2, 1, 0])
+
+    def test_no_store_responses_are_stored(self):
+        # as JIRA answers every GET
+        adapter = StubAdapter(headers={'Cache-Control': 'no-cache, no-store, no-transform'})
+        handler, adapter = stub_handler(adapter, response_cache=SqliteResponseCache(self.path))
+        handler.do_request('api/2/myself', 'GET')
+        handler.do_request('api/2/myself', 'GET')
+        self.assertEqual((handler.response_cache.size()[0], adapter.calls), (1, 1))
+
+    def test_private_responses_are_not_stored(self):
+        adapter = StubAdapter(headers={'Cache-Control': 'private, max-age=60'})
+        handler, adapter = stub_handler(adapter, response_cache=SqliteResponseCache(self.path), respect_cache_control=True)
+        handler.do_request('api/2/myself', 'GET')
+        adapter.headers = {'Cache-Control': 'no-store'}
+        handler.do_request('api/2/myself', 'GET')
+        self.assertEqual(handler.response_cache.size()[0], 0)
+        adapter.headers = {'Cache-Control': 'max-age=60'}
+        handler.do_request('api/2/myself', 'GET')
+        self.assertEqual(handler.response_cache.size()[0], 1)
+
+    def test_write_invalidates_entity_subtree(self):
+        handler, adapter = stub_handler(response_cache=SqliteResponseCache(self.path))
+        client = self.jira_client(handler)
+        self.assertIn('api/2/issue/{issueIdOrKey}/worklog/{id}', client.issue.worklog.post._invalidates[0][0])
+
+        for key in ('ABC-1', 'ABC-2'):
+            client.issue.get(key)
+            client.issue.worklog.get(key, '10')
+        self.assertEqual(handler.response_cache.size()[0], 4)
+        client.issue.worklog.post('ABC-1', data_dict={'timeSpent': '1h'})
+        # only the entries of the issue written to are gone
+        self.assertEqual(handler.response_cache.size()[0], 2)
+        client.issue.get('ABC-2')
+        client.issue.get('ABC-1')
+        self.assertEqual(adapter.calls, 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
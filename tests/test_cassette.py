@@ -0,0 +1,109 @@
+import os
+import json
+import time
+import tempfile
+import threading
+import unittest
+import requests
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from tttech.pyware.core import RestHandler
+from tttech.pyware.bench import error_kind
+from tttech.pyware.cassette import Cassette, CassetteMiss, Interaction, use_cassette
+from tttech.pyware.circuit_breaker import CircuitBreaker
+from tests.stubs import JiraTestCase
+
+
+class IssueHandler(BaseHTTPRequestHandler):
+    calls = 0
+
+    def do_GET(self):
+        IssueHandler.calls += 1
+        self.answer({'key': self.path.rsplit('/', 1)[-1], 'call': IssueHandler.calls})
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.answer({'created': data['fields']['summary']}, 201)
+
+    def answer(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCassette(JiraTestCase):
+    def setUp(self):
+        super().setUp()
+        fd, self.path = tempfile.mkstemp(suffix='.cassette.gz')
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def client(self, base_url, mode, **kwargs):
+        handler = RestHandler(base_url=base_url, user='user', password='password')
+        cassette = use_cassette(handler, self.path, mode, **kwargs)
+        return cassette, self.jira_client(handler)
+
+    def test_record_and_replay(self):
+        server = HTTPServer(('127.0.0.1', 0), IssueHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = 'http://127.0.0.1:%d/rest' % server.server_port
+        try:
+            cassette, client = self.client(base_url, 'record')
+            first = client.issue.get('ABC-1')
+            second = client.issue.get('ABC-1')
+            created = client.issue.post(data_dict={'fields': {'summary': 'recorded'}})
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(len(cassette.interactions), 3)
+        self.assertNotIn('Authorization', cassette.interactions[0].request_headers)
+
+        # the server is gone: the answers come from the cassette, in the order they were recorded
+        cassette, client = self.client(base_url, 'replay')
+        self.assertEqual(len(cassette.interactions), 3)
+        self.assertEqual(client.issue.get('ABC-1').call, first.call)
+        self.assertEqual(client.issue.get('ABC-1').call, second.call)
+        self.assertEqual(client.issue.get('ABC-1').call, first.call)
+        self.assertEqual(client.issue.post(data_dict={'fields': {'summary': 'recorded'}}).created, created.created)
+        with self.assertRaises(CassetteMiss):
+            client.issue.post(data_dict={'fields': {'summary': 'other'}})
+        with self.assertRaises(CassetteMiss):
+            client.issue.get('ABC-2')
+
+    def test_replay_latency(self):
+        handler = RestHandler(base_url='https://www.example.com/rest', user='user', password='password')
+        cassette = Cassette(self.path)
+        cassette.append(Interaction('GET', 'https://www.example.com/rest/api/2/issue/ABC-1', {}, b'', 200, 'OK',
+                                    {'Content-Type': 'application/json'}, b'{"key": "ABC-1"}', 0.05))
+        use_cassette(handler, self.path, latency=1.0)
+        started = time.perf_counter()
+        response = handler.do_request('api/2/issue/ABC-1')
+        self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+        self.assertEqual(response.json(), {'key': 'ABC-1'})
+        with self.assertRaises(ValueError):
+            use_cassette(handler, self.path, 'rewind')
+
+    def test_miss_is_not_an_endpoint_failure(self):
+        handler = RestHandler(base_url='https://www.example.com/rest', user='user', password='password',
+                              circuit_breaker=CircuitBreaker(window=2, min_calls=2))
+        Cassette(self.path).append(Interaction('GET', 'https://www.example.com/rest/api/2/issue/ABC-1', {}, b'', 200, 'OK',
+                                               {'Content-Type': 'application/json'}, b'{"key": "ABC-1"}', 0.0))
+        use_cassette(handler, self.path)
+        for _ in range(3):
+            with self.assertRaises(CassetteMiss) as raised:
+                handler.do_request('api/2/issue/ABC-2', resource_path='api/2/issue/{issueIdOrKey}')
+            self.assertNotIsInstance(raised.exception, requests.ConnectionError)
+        self.assertEqual(handler.circuit_breaker.states()['GET api/2/issue/{issueIdOrKey}'], CircuitBreaker.CLOSED)
+        self.assertEqual(error_kind(raised.exception), 'CassetteMiss')
+        self.assertEqual(handler.do_request('api/2/issue/ABC-1', resource_path='api/2/issue/{issueIdOrKey}').json(), {'key': 'ABC-1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
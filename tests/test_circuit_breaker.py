@@ -0,0 +1,72 @@
+import unittest
+import time
+from tttech.pyware.circuit_breaker import CircuitBreaker, CircuitOpenError
+from tttech.pyware.rate_limit import RateLimiter, RateLimitExceeded
+from tests.stubs import StubAdapter, stub_handler
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_open_half_open_closed(self):
+        breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, open_duration=0.1)
+        for ok in (True, False, True, False):
+            breaker.record(breaker.allow('GET', 'api/2/plugin'), ok, 0.01)
+        self.assertRaises(CircuitOpenError, breaker.allow, 'GET', 'api/2/plugin')
+        # other endpoints are not affected
+        breaker.allow('GET', 'api/2/field')
+        time.sleep(0.15)
+        circuit = breaker.allow('GET', 'api/2/plugin')
+        self.assertEqual(circuit.state, CircuitBreaker.HALF_OPEN)
+        # only one trial call at a time
+        self.assertRaises(CircuitOpenError, breaker.allow, 'GET', 'api/2/plugin')
+        breaker.record(circuit, True, 0.01)
+        self.assertEqual(breaker.states()['GET api/2/plugin'], CircuitBreaker.CLOSED)
+
+    def test_slow_calls_open_the_circuit(self):
+        breaker = CircuitBreaker(latency_threshold=1.0, window=2, min_calls=2)
+        for _ in range(2):
+            breaker.record(breaker.allow('GET', 'api/2/plugin'), True, 5.0)
+        self.assertRaises(CircuitOpenError, breaker.allow, 'GET', 'api/2/plugin')
+
+    def test_rest_handler_fails_fast(self):
+        adapter = StubAdapter(body=b'{}', status=lambda request: 503 if 'plugin' in request.url else 200)
+        handler, _ = stub_handler(adapter, circuit_breaker=CircuitBreaker(window=5, min_calls=5))
+        for _ in range(5):
+            handler.do_request('api/2/plugin/1', 'GET', resource_path='api/2/plugin/{id}')
+        self.assertRaises(CircuitOpenError, handler.do_request, 'api/2/plugin/2', 'GET', resource_path='api/2/plugin/{id}')
+        self.assertTrue(handler.do_request('api/2/field', 'GET', resource_path='api/2/field').ok)
+        self.assertEqual(adapter.calls, 6)
+        self.assertEqual(handler.stats['circuit_breakers'], {'GET api/2/plugin/{id}': 'open'})
+        self.assertEqual(handler.stats['circuit_rejections'], 1)
+
+    def test_trial_call_failing_before_it_is_sent(self):
+        failing = [True]
+        adapter = StubAdapter(body=b'{}', status=lambda request: 503 if failing[0] else 200)
+        handler, _ = stub_handler(adapter, circuit_breaker=CircuitBreaker(min_calls=2, window=2, open_duration=0.05),
+                                  rate_limiter=RateLimiter(rate=1, burst=1, max_wait=0.01))
+        handler.do_request('api/2/plugin/1', 'GET', resource_path='api/2/plugin/{id}')
+        handler.rate_limiter = None
+        handler.do_request('api/2/plugin/1', 'GET', resource_path='api/2/plugin/{id}')
+        self.assertEqual(handler.circuit_breaker.states()['GET api/2/plugin/{id}'], CircuitBreaker.OPEN)
+        time.sleep(0.06)
+        # the trial call is throttled: the circuit stays half-open for the next trial, which closes it
+        handler.rate_limiter = RateLimiter(rate=1, burst=1, max_wait=0.01)
+        handler.rate_limiter.acquire(handler._host, 'GET', 'api/2/plugin/{id}')
+        self.assertRaises(RateLimitExceeded, handler.do_request, 'api/2/plugin/1', 'GET', resource_path='api/2/plugin/{id}')
+        self.assertEqual(handler.circuit_breaker.states()['GET api/2/plugin/{id}'], CircuitBreaker.OPEN)
+
+        def broken(next):
+            def call(request):
+                raise ValueError('interceptor')
+            return call
+
+        handler.rate_limiter = None
+        handler._send = broken(handler._transport)
+        self.assertRaises(ValueError, handler.do_request, 'api/2/plugin/1', 'GET', resource_path='api/2/plugin/{id}')
+        handler._send = handler._transport
+        failing[0] = False
+        self.assertTrue(handler.do_request('api/2/plugin/1', 'GET', resource_path='api/2/plugin/{id}').ok)
+        self.assertEqual(handler.circuit_breaker.states()['GET api/2/plugin/{id}'], CircuitBreaker.CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import json
+import logging
+from tttech.pyware.codec import CODECS, JsonCodec, get_codec
+from tttech.pyware.payload import DictPayLoad, LazyDictPayLoad, create_payload
+from tttech.pyware.wadl_parser import WadlParser
+from tests.stubs import StubAdapter, stub_handler
+
+
+class TestCodec(unittest.TestCase):
+    def setUp(self):
+        self.data = {'key': 'ABC-1', 'fields': {'summary': 'Ünïcode', 'labels': ['a', 'b'], 'votes': 3, 'due': None,
+                                                'components': [{'name': 'core'}, {'name': 'ui'}]}}
+
+    def test_round_trip(self):
+        for name in CODECS:
+            codec = get_codec(name)
+            self.assertIsInstance(codec.dumps(self.data), bytes)
+            self.assertEqual(codec.loads(codec.dumps(self.data)), self.data)
+
+    def test_what_the_standard_library_encodes(self):
+        for name in CODECS:
+            codec = get_codec(name)
+            self.assertEqual(json.loads(codec.dumps({'fields': {1: 'x', None: 'y'}})), {'fields': {'1': 'x', 'null': 'y'}})
+            self.assertEqual(json.loads(codec.dumps({'id': 2 ** 70})), {'id': 2 ** 70})
+        # with the default codec, whichever is installed
+        handler, adapter = stub_handler()
+        handler.do_request('api/2/issue', mtype='POST', data_dict={'fields': {1: 'x'}, 'id': 2 ** 70})
+        self.assertEqual(json.loads(adapter.requests[0].body), {'fields': {'1': 'x'}, 'id': 2 ** 70})
+
+    def test_default_and_unknown(self):
+        self.assertEqual(get_codec().name, next(name for name in ('orjson', 'ujson', 'json') if name in CODECS))
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    def test_loads_payload(self):
+        body = json.dumps([self.data, 'text', 1]).encode('utf-8')
+        payload = JsonCodec().loads_payload(body)
+        self.assertEqual(payload[0].fields.components[1].name, 'ui')
+        self.assertEqual(payload[0].fields.labels, ['a', 'b'])
+        self.assertEqual(payload[1:], ['text', 1])
+        self.assertEqual(repr(payload[0]), repr(DictPayLoad(self.data)))
+        self.assertEqual(repr(payload), repr(create_payload([self.data, 'text', 1])))
+
+    def test_handler(self):
+        adapter = StubAdapter(body=json.dumps(self.data).encode('utf-8'), content_type='application/json;charset=UTF-8')
+        handler, _ = stub_handler(adapter, json_codec='json')
+        self.assertEqual(handler.json_codec.name, 'json')
+        handler.do_request('https://www.example.com/rest/issue', mtype='POST', data_dict=self.data)
+        self.assertEqual(json.loads(adapter.requests[0].body), self.data)
+
+        parser = WadlParser.__new__(WadlParser)
+        parser.rest_handler = handler
+        parser.logger = logging.getLogger(__name__)
+        response = handler.do_request('https://www.example.com/rest/issue/ABC-1')
+        self.assertEqual(parser._process_response(response, False).fields.summary, 'Ünïcode')
+
+        handler.lazy_payloads = True
+        response = handler.do_request('https://www.example.com/rest/issue/ABC-1')
+        self.assertIsInstance(parser._process_response(response, False), LazyDictPayLoad)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import gzip
+import json
+from tttech.pyware.compression import RequestCompression, accept_encoding
+from tests.stubs import StubAdapter, stub_handler
+
+
+def refusing_compressed(request):
+    """ 415 to compressed bodies """
+    return 415 if 'Content-Encoding' in request.headers else 201
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.data = {'issues': [{'fields': {'summary': 'Summary %d' % i, 'labels': ['bulk']}} for i in range(200)]}
+
+    def handler(self, adapter, **kwargs):
+        return stub_handler(adapter, **kwargs)[0]
+
+    def test_accept_encoding(self):
+        self.assertEqual(accept_encoding(('gzip', 'deflate')), 'gzip, deflate')
+        # encodings which cannot be decoded here are never asked for
+        self.assertNotIn('unknown', accept_encoding(('unknown', 'gzip')))
+        adapter = StubAdapter(body=b'{}', status=201)
+        self.handler(adapter).do_request('api/2/field')
+        self.assertEqual(adapter.requests[0].headers['Accept-Encoding'], accept_encoding())
+
+    def test_large_bodies_are_compressed(self):
+        adapter = StubAdapter(body=b'{}', status=201)
+        handler = self.handler(adapter, request_compression=RequestCompression('gzip', min_size=1024))
+        handler.do_request('api/2/issue/bulk', 'POST', data_dict=self.data, resource_path='api/2/issue/bulk')
+        handler.do_request('api/2/issue/bulk', 'POST', data_dict={'issues': []}, resource_path='api/2/issue/bulk')
+        compressed, small = adapter.requests
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(compressed.body)), self.data)
+        self.assertNotIn('Content-Encoding', small.headers)
+        self.assertLess(handler.stats['request_bytes_sent'] * 5, handler.stats['request_bytes'])
+
+    def test_endpoint_refusing_compression(self):
+        adapter = StubAdapter(body=b'{}', status=refusing_compressed)
+        handler = self.handler(adapter, request_compression=RequestCompression('gzip', min_size=10))
+        self.assertEqual(handler.do_request('api/2/issue/bulk', 'POST', data_dict=self.data, resource_path='api/2/issue/bulk').status_code, 201)
+        self.assertEqual(handler.do_request('api/2/issue/bulk', 'POST', data_dict=self.data, resource_path='api/2/issue/bulk').status_code, 201)
+        # compressed, refused, uncompressed - then uncompressed right away
+        self.assertEqual([r.headers.get('Content-Encoding') for r in adapter.requests], ['gzip', None, None])
+        self.assertEqual(handler.stats['retries'], 1)
+
+    def test_bad_request_is_not_a_refusal(self):
+        adapter = StubAdapter(body=b'{"errors": {"summary": "required"}}', status=400)
+        handler = self.handler(adapter, request_compression=RequestCompression('gzip', min_size=10))
+        self.assertEqual(handler.do_request('api/2/issue/bulk', 'POST', data_dict=self.data, resource_path='api/2/issue/bulk').status_code, 400)
+        self.assertEqual(handler.do_request('api/2/issue/bulk', 'POST', data_dict=self.data, resource_path='api/2/issue/bulk').status_code, 400)
+        # sent once each, compressed both times
+        self.assertEqual([r.headers.get('Content-Encoding') for r in adapter.requests], ['gzip', 'gzip'])
+        self.assertEqual(handler.stats['retries'], 0)
+
+        adapter = StubAdapter(body=b'Unsupported Content-Encoding: gzip', status=lambda r: 400 if 'Content-Encoding' in r.headers else 201)
+        handler = self.handler(adapter, request_compression=RequestCompression('gzip', min_size=10))
+        self.assertEqual(handler.do_request('api/2/issue/bulk', 'POST', data_dict=self.data, resource_path='api/2/issue/bulk').status_code, 201)
+        self.assertEqual([r.headers.get('Content-Encoding') for r in adapter.requests], ['gzip', None])
+
+    def test_refused_streamed_response_is_closed(self):
+        adapter = StubAdapter(body=b'{}', status=refusing_compressed, raw=True)
+        handler = self.handler(adapter, request_compression=RequestCompression('gzip', min_size=10))
+        response = handler.do_request('api/2/issue/bulk', 'POST', data_dict=self.data, resource_path='api/2/issue/bulk', stream=True)
+        refused, answered = adapter.raws
+        self.assertTrue(refused.closed)
+        self.assertFalse(answered.closed)
+        response.close()
+
+    def test_min_size_in_bytes(self):
+        compression = RequestCompression('gzip', min_size=10)
+        # 5 characters, 10 bytes in UTF-8
+        self.assertEqual(compression.compress('endpoint', '\u00e9' * 5)[1], 'gzip')
+        self.assertEqual(compression.compress('endpoint', '\u00e9' * 4), ('\u00e9' * 4, None))
+
+    def test_unknown_encoding(self):
+        self.assertRaises(ValueError, RequestCompression, 'lzma')
+
+
+if __name__ == '__main__':
+    unittest.main()
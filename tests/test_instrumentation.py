@@ -0,0 +1,65 @@
+import unittest
+import logging
+import requests
+from tttech.pyware.core import RestHandler
+from tttech.pyware.client_builder import ClientBuilder
+from tttech.pyware.instrumentation import BodyLog
+from tests.stubs import WADL
+
+
+class Recorder(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+class UnreadResponse(requests.Response):
+    """ Fails the test if its body is touched """
+
+    @property
+    def content(self):
+        raise AssertionError('the body was read')
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('test_instrumentation')
+        self.logger.propagate = False
+        self.recorder = Recorder()
+        self.logger.addHandler(self.recorder)
+        self.response = requests.Response()
+        self.response.status_code = 200
+        self.response.url = 'https://www.example.com/rest/api/2/issue/ABC-1'
+        self.response._content = b'x' * 5000
+
+    def tearDown(self):
+        self.logger.removeHandler(self.recorder)
+
+    def test_truncated(self):
+        self.logger.setLevel(logging.DEBUG)
+        BodyLog(max_bytes=100).log(self.logger, logging.DEBUG, self.response)
+        self.assertEqual(self.recorder.messages, ['Response 200 %s: %s... (5000 bytes)' % (self.response.url, 'x' * 100)])
+
+    def test_off(self):
+        self.logger.setLevel(logging.INFO)
+        BodyLog().log(self.logger, logging.DEBUG, UnreadResponse())
+        self.logger.setLevel(logging.DEBUG)
+        BodyLog(sample_rate=0.0).log(self.logger, logging.DEBUG, UnreadResponse())
+        self.assertEqual(self.recorder.messages, [])
+        BodyLog(sample_rate=0.0).log(self.logger, logging.ERROR, self.response, sample=False)
+        self.assertEqual(len(self.recorder.messages), 1)
+
+    def test_no_global_configuration(self):
+        root = logging.getLogger()
+        handlers, level = list(root.handlers), root.level
+        handler = RestHandler(base_url='https://www.example.com/rest', user='user', password='password')
+        ClientBuilder(wadl_file=WADL, api_prefix='api/2', rest_handler=handler)
+        self.assertEqual((root.handlers, root.level), (handlers, level))
+        self.assertEqual(logging.getLogger('tttech.pyware.client_builder').level, logging.NOTSET)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from tttech.pyware.interceptors import Request, compile_chain
+from tests.stubs import StubAdapter, JiraTestCase, stub_handler
+
+
+def token_adapter():
+    """ Answer 401 unless the request carries the current token """
+    return StubAdapter(status=lambda request: 200 if request.headers.get('X-Token') == 'fresh' else 401)
+
+
+def refresh_token(tokens):
+    """ Send the token, fetch a new one and send again once when it expired """
+    def interceptor(next):
+        def call(request):
+            request.headers['X-Token'] = tokens[0]
+            response = next(request)
+            if response.status_code == 401:
+                tokens[0] = 'fresh'
+                response = next(request.replace(headers=dict(request.headers, **{'X-Token': 'fresh'})))
+            return response
+        return call
+    return interceptor
+
+
+class TestCompileChain(unittest.TestCase):
+    def test_order_and_disabled_stages(self):
+        seen = []
+
+        def stage(name):
+            def interceptor(next):
+                def call(request):
+                    seen.append(name)
+                    return next(request)
+                return call
+            return interceptor
+
+        send = lambda request: seen.append('send') or 'response'
+        self.assertIs(compile_chain([], send), send)
+        self.assertIs(compile_chain([lambda next: None], send), send)
+        chain = compile_chain([stage('outer'), lambda next: None, stage('inner')], send)
+        self.assertEqual(chain(Request('GET', 'https://www.example.com')), 'response')
+        self.assertEqual(seen, ['outer', 'inner', 'send'])
+
+    def test_replace(self):
+        request = Request('GET', 'https://www.example.com', headers={'A': '1'}, resource_path='issue/{id}')
+        copy = request.replace(url='https://www.example.org')
+        self.assertEqual((copy.url, copy.headers, copy.resource_path), ('https://www.example.org', {'A': '1'}, 'issue/{id}'))
+        self.assertEqual(request.url, 'https://www.example.com')
+
+
+class TestHandlerInterceptors(JiraTestCase):
+    def test_auth_refresh(self):
+        tokens = ['expired']
+        handler, adapter = stub_handler(token_adapter(), interceptors=[refresh_token(tokens)])
+        client = self.jira_client(handler)
+        headers = {'X-Trace': '1'}
+        self.assertEqual(client.issue.get('ABC-1', headers=headers).key, 'ABC-1')
+        self.assertEqual(adapter.calls, 2)
+        self.assertEqual(client.issue.get('ABC-2').key, 'ABC-1')
+        self.assertEqual(adapter.calls, 3)
+        self.assertEqual(headers, {'X-Trace': '1'})
+
+    def test_request_context(self):
+        seen = []
+
+        def interceptor(next):
+            def call(request):
+                seen.append((request.method, request.resource_path, request.method_name))
+                return next(request)
+            return call
+
+        handler, _ = stub_handler(token_adapter(), interceptors=[interceptor])
+        client = self.jira_client(handler)
+        with self.assertRaises(Exception):
+            client.issue.get('ABC-1')
+        self.assertEqual(seen, [('GET', 'api/2/issue/{issueIdOrKey}', client.issue.get.__name__)])
+
+
+if __name__ == '__main__':
+    unittest.main()
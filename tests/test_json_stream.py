@@ -0,0 +1,81 @@
+import json
+import tracemalloc
+import unittest
+from tttech.pyware.json_stream import iter_json_items
+from tttech.pyware.payload import DictPayLoad, LazyDictPayLoad, Record
+from tests.stubs import StubAdapter, JiraTestCase, stub_handler
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class TestJsonStream(JiraTestCase):
+    def setUp(self):
+        super().setUp()
+        self.result = {'startAt': 0, 'names': {'summary': 'Summary', 'odd': ['}]"', {'x': [1, 2]}]},
+                       'issues': [{'key': 'ABC-%d' % i, 'summary': 'Ünïcode "quoted" \\ %d' % i, 'votes': 1234567} for i in range(30)],
+                       'total': 30}
+        self.body = json.dumps(self.result, ensure_ascii=False).encode('utf-8')
+
+    def test_any_chunking(self):
+        for size in (1, 2, 3, 5, 64, len(self.body)):
+            issues = list(iter_json_items(chunked(self.body, size), 'issues'))
+            self.assertEqual([issue.to_dict() for issue in issues], self.result['issues'])
+
+    def test_top_level_array(self):
+        items = list(iter_json_items([b' [1, 22', b'3, "a", null, {"b": [] } ] ']))
+        self.assertEqual(items[:4], [1, 223, 'a', None])
+        self.assertEqual(items[4].b, [])
+
+    def test_numbers_at_any_chunk_boundary(self):
+        body = b'{"n": -1.5e+3, "skip": 0.25E-2, "values": [1.5, 3.25, -0.5, 3e2, 12E-1, 7, -10.125e+2]}'
+        expected = [1.5, 3.25, -0.5, 3e2, 12E-1, 7, -10.125e+2]
+        for offset in range(1, len(body)):
+            chunks = [body[:offset], body[offset:]]
+            self.assertEqual(list(iter_json_items(chunks, 'values')), expected, body[:offset])
+            self.assertEqual(list(iter_json_items(chunks[:1] + [body[offset:offset + 1], body[offset + 1:]], 'values')), expected)
+        array = json.dumps(expected).encode('utf-8')
+        for offset in range(1, len(array)):
+            self.assertEqual(list(iter_json_items([array[:offset], array[offset:]])), expected, array[:offset])
+            self.assertEqual(list(iter_json_items([array[:offset], array[offset:]], loads=json.loads)), expected)
+
+    def test_nested_and_missing(self):
+        self.assertEqual(list(iter_json_items([b'{"data": {"n": 1, "values": [true, false]}}'], 'data.values')), [True, False])
+        self.assertEqual(list(iter_json_items([b'{"data": {}}'], 'data.values')), [])
+        self.assertEqual(list(iter_json_items([b'[]'])), [])
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_items([b'[1, 2'], None))
+
+    def test_generated_method(self):
+        handler, adapter = stub_handler(StubAdapter(body=self.body, raw=True))
+        client = self.jira_client(handler)
+        issues = client.search.get(jql='project = ABC', stream_json='issues', chunk_size=16)
+        first = next(issues)
+        self.assertEqual(first.key, 'ABC-0')
+        # only the beginning of the body is read
+        self.assertLess(adapter.last_raw.tell(), len(self.body))
+        self.assertEqual(len(list(issues)), 29)
+
+
+    def test_payloads_as_configured(self):
+        for options, kind in [({}, DictPayLoad), ({'lazy_payloads': True}, LazyDictPayLoad), ({'records': True}, Record)]:
+            handler, _ = stub_handler(StubAdapter(body=self.body, raw=True), **options)
+            issues = list(self.jira_client(handler).search.get(jql='project = ABC', stream_json='issues'))
+            self.assertIsInstance(issues[0], kind, options)
+            self.assertEqual(issues[3].summary, self.result['issues'][3]['summary'])
+
+    def test_skipped_values_are_not_held(self):
+        body = json.dumps({'names': {str(i): 'name %d' % i for i in range(20000)}, 'values': [1, 2]}).encode('utf-8')
+        chunks = (body[i:i + 4096] for i in range(0, len(body), 4096))
+        tracemalloc.start()
+        try:
+            self.assertEqual(list(iter_json_items(chunks, 'values')), [1, 2])
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, len(body) // 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
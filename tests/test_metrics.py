@@ -0,0 +1,73 @@
+import random
+import unittest
+from tttech.pyware.metrics import Histogram, Metrics
+from tests.stubs import StubAdapter, JiraTestCase, stub_handler
+
+
+class TestHistogram(unittest.TestCase):
+    def test_percentiles(self):
+        histogram = Histogram()
+        values = [random.uniform(0.001, 2.0) for _ in range(10000)]
+        for value in values:
+            histogram.record(value)
+        values.sort()
+        for percent in (50, 95, 99):
+            exact = values[int(percent / 100.0 * len(values)) - 1]
+            self.assertAlmostEqual(histogram.percentile(percent), exact, delta=exact * 0.02)
+        self.assertEqual(histogram.percentile(100), max(values))
+        self.assertEqual(histogram.count, 10000)
+
+    def test_fixed_size(self):
+        histogram = Histogram(max_seconds=10)
+        size = len(histogram.counts)
+        histogram.record(0)
+        histogram.record(1e6)
+        self.assertEqual(len(histogram.counts), size)
+        self.assertEqual(Histogram().percentile(99), 0.0)
+
+
+class TestMetrics(JiraTestCase):
+    def test_generated_methods(self):
+        handler, _ = stub_handler(StubAdapter(status=[200, 200, 404]), metrics=True)
+        client = self.jira_client(handler)
+        client.issue.get('ABC-1')
+        client.issue.get('ABC-2')
+        with self.assertRaises(Exception):
+            client.issue.get('ABC-3')
+
+        metrics = handler.metrics.to_dict()[client.issue.get.__name__]
+        self.assertEqual(metrics['resource_path'], 'api/2/issue/{issueIdOrKey}')
+        self.assertEqual((metrics['requests'], metrics['errors'], metrics['in_flight']), (3, 1, 0))
+        self.assertEqual(metrics['bytes_received'], 3 * len(b'{"key": "ABC-1"}'))
+        self.assertEqual({status: latency['count'] for status, latency in metrics['statuses'].items()}, {200: 2, 404: 1})
+
+        text = handler.metrics.prometheus()
+        self.assertIn('# TYPE pyware_request_duration_seconds summary', text)
+        self.assertIn('pyware_request_duration_seconds_count{name="%s",method="GET",path="api/2/issue/{issueIdOrKey}",status="404"} 1' % client.issue.get.__name__, text)
+        self.assertIn('pyware_request_errors_total{name="%s",method="GET",path="api/2/issue/{issueIdOrKey}"} 1' % client.issue.get.__name__, text)
+
+    def test_interceptor_error(self):
+        def failing(send):
+            def intercept(request):
+                raise ValueError('refused by the interceptor')
+            return intercept
+
+        handler, adapter = stub_handler(metrics=True, interceptors=[failing])
+        with self.assertRaises(ValueError):
+            handler.do_request('api/2/field', 'GET')
+        d = handler.metrics.to_dict()['GET api/2/field']
+        self.assertEqual((d['in_flight'], d['requests'], d['errors']), (0, 1, 1))
+        self.assertEqual((handler.stats['requests_failed'], adapter.calls), (1, 0))
+
+    def test_request_error(self):
+        metrics = Metrics()
+        method = metrics.method(None, 'POST', 'api/2/issue')
+        method.begin()
+        method.end('error', 0.5, bytes_sent=10)
+        d = metrics.to_dict()['POST api/2/issue']
+        self.assertEqual((d['errors'], d['bytes_sent'], d['statuses']['error']['max']), (1, 10, 0.5))
+        self.assertIn('status="error"', metrics.prometheus())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import json
+import unittest
+import requests
+from tttech.pyware.core import RestHandler
+from tttech.pyware.mock_server import MockServer, MockResponse, example_from_schema
+from tests.stubs import WADL, JiraTestCase
+
+
+class TestMockServer(JiraTestCase):
+    def client(self, mock):
+        return self.jira_client(RestHandler(base_url=mock.url, user='user', password='password'))
+
+    def test_examples_of_the_wadl(self):
+        with MockServer(WADL, base_path='rest') as mock:
+            client = self.client(mock)
+            resolutions = client.resolution.get_all()
+            self.assertEqual(resolutions[0].name, 'Fixed')
+            self.assertEqual(client.resolution.get('1').name, 'Fixed')
+            self.assertEqual(client.issue.get('ABC-1').key, client.issue.get('XYZ-9').key)
+            self.assertEqual(mock.requests, 4)
+            self.assertEqual(requests.get(mock.url + '/api/2/nothing').status_code, 404)
+            self.assertEqual(requests.delete(mock.url + '/api/2/resolution').status_code, 405)
+
+    def test_fixtures_errors_and_sizes(self):
+        fixtures = {
+            self.model.resolution.get.__name__: {'id': '7', 'name': 'Done'},
+            self.model.issue.get.__name__: MockResponse(200, 'text/plain', b'plain'),
+        }
+        with MockServer(WADL, fixtures=fixtures, payload_size=10000) as mock:
+            client = self.client(mock)
+            self.assertEqual(client.resolution.get('1').name, 'Done')
+            self.assertEqual(client.issue.get('ABC-1'), b'plain')
+            response = client.resolution.get_all(requests_response=True)
+            self.assertGreaterEqual(len(response.content), 10000)
+            self.assertEqual(len(response.json()) % 2, 0)
+        # a flat name which is not the id of the method in the WADL (getIssueType)
+        fixtures = {'getIssueType_workflowscheme': {'issueType': '1', 'workflow': 'renamed'}}
+        with MockServer(self.model, fixtures=fixtures) as mock:
+            self.assertEqual(self.client(mock)._func.getIssueType_workflowscheme('10', '1').workflow, 'renamed')
+        with MockServer(WADL, error_rate=1.0) as mock:
+            with self.assertRaises(Exception):
+                self.client(mock).resolution.get_all()
+
+    def test_example_from_schema(self):
+        schema = {
+            'type': 'object',
+            'properties': {'id': {'type': 'integer'}, 'self': {'type': 'string', 'format': 'uri'}, 'tags': {'type': 'array', 'items': {'type': 'string'}},
+                           'owner': {'$ref': '#/definitions/user'}},
+            'definitions': {'user': {'type': 'object', 'properties': {'active': {'type': 'boolean'}}}},
+        }
+        example = example_from_schema(schema)
+        self.assertEqual(example, {'id': 1, 'self': 'http://www.example.com', 'tags': ['string'], 'owner': {'active': True}})
+        json.dumps(example)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import time
+import threading
+from tttech.pyware.paginator import Paginator, OffsetPagination, CursorPagination
+from tttech.pyware.wadl_parser import create_payload
+
+
+class FakeSearch():
+    """ A generated method stand-in: JIRA-style pages over `total` issues, the server caps maxResults """
+
+    def __init__(self, total=1000, max_results_cap=100, delay=0.0):
+        self.total = total
+        self.cap = max_results_cap
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, jql, startAt=0, maxResults=50):
+        with self.lock:
+            self.calls.append(startAt)
+        time.sleep(self.delay)
+        limit = min(maxResults, self.cap)
+        issues = [{'key': 'ABC-%d' % i} for i in range(startAt, min(startAt + limit, self.total))]
+        return create_payload({'startAt': startAt, 'maxResults': limit, 'total': self.total, 'issues': issues})
+
+
+class TestPaginator(unittest.TestCase):
+    def test_offset_pages_in_order(self):
+        search = FakeSearch(total=1234)
+        keys = [issue.key for issue in Paginator(search, 'project = ABC', strategy=OffsetPagination(page_size=500))]
+        self.assertEqual(keys, ['ABC-%d' % i for i in range(1234)])
+        # the server capped the page size to 100, the offsets follow
+        self.assertEqual(sorted(search.calls), list(range(0, 1234, 100)))
+
+    def test_fan_out_is_concurrent(self):
+        search = FakeSearch(total=1000, delay=0.05)
+        start = time.monotonic()
+        self.assertEqual(len(list(Paginator(search, 'project = ABC', strategy=OffsetPagination(page_size=100), max_workers=5))), 1000)
+        # 10 pages of 50ms: sequentially at least 0.5s
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_plain_list_pages(self):
+        data = list(range(120))
+        method = lambda startAt, maxResults: data[startAt:startAt + maxResults]
+        self.assertEqual(list(Paginator(method, strategy=OffsetPagination(page_size=50))), data)
+
+    def test_cursor_pages(self):
+        pages = {
+            None: {'values': [{'id': 1}, {'id': 2}], 'nextCursor': 'b'},
+            'b': {'values': [{'id': 3}], 'nextCursor': None},
+        }
+        method = lambda cursor=None: create_payload(pages[cursor])
+        self.assertEqual([item.id for item in Paginator(method, strategy=CursorPagination())], [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import copy
+import pickle
+from tttech.pyware.payload import DictPayLoad, LazyDictPayLoad, create_payload, create_lazy_payload, payload_fields
+
+
+class TestLazyPayload(unittest.TestCase):
+    def setUp(self):
+        self.data = {'total': 2, 'issues': [
+            {'key': 'ABC-1', 'fields': {'summary': 'One', 'labels': ['a'], 'assignee': {'name': 'user'}}},
+            {'key': 'ABC-2', 'fields': {'summary': 'Two', 'labels': [], 'assignee': None}},
+        ]}
+
+    def test_same_as_eager(self):
+        eager, lazy = create_payload(self.data), create_lazy_payload(self.data)
+        self.assertEqual(lazy.issues[0].fields.assignee.name, eager.issues[0].fields.assignee.name)
+        self.assertEqual(lazy['issues'][1]['fields']['summary'], 'Two')
+        self.assertEqual(repr(lazy), repr(eager))
+        self.assertEqual(repr(lazy.to_dict()), repr(eager.to_dict()))
+        self.assertEqual(payload_fields(lazy), payload_fields(eager))
+        self.assertEqual(create_lazy_payload([1, 'a', None]), [1, 'a', None])
+
+    def test_converted_on_access(self):
+        lazy = create_lazy_payload(self.data)
+        self.assertEqual(vars(lazy), {})
+        issue = lazy.issues[1]
+        self.assertIsInstance(issue, LazyDictPayLoad)
+        self.assertIs(lazy.issues[1], issue)
+        self.assertEqual(list(vars(lazy)), ['issues'])
+        self.assertEqual(list(vars(issue)), [])
+
+    def test_missing_and_set(self):
+        lazy = create_lazy_payload(self.data)
+        self.assertFalse(hasattr(lazy, 'startAt'))
+        with self.assertRaises(KeyError):
+            lazy['startAt']
+        lazy['startAt'] = 0
+        lazy.total = 3
+        self.assertEqual(lazy.to_dict()['total'], 3)
+        self.assertEqual(payload_fields(lazy), ['total', 'issues', 'startAt'])
+
+    def test_copy(self):
+        lazy = create_lazy_payload(self.data)
+        self.assertEqual(repr(copy.deepcopy(lazy)), repr(lazy))
+        self.assertEqual(repr(pickle.loads(pickle.dumps(lazy))), repr(lazy))
+        self.assertIsInstance(lazy, DictPayLoad)
+
+
+if __name__ == '__main__':
+    unittest.main()
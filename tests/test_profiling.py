@@ -0,0 +1,59 @@
+import time
+import unittest
+import tracemalloc
+from tttech.pyware.client_builder import ClientBuilder
+from tttech.pyware.profiling import BuildReport
+from tests.stubs import WADL
+
+
+class TestBuildReport(unittest.TestCase):
+    def test_phases_are_exclusive(self):
+        report = BuildReport(trace_memory=False).start()
+        with report.phase('outer'):
+            time.sleep(0.02)
+            with report.phase('inner'):
+                time.sleep(0.05)
+        report.finish()
+        self.assertEqual(report.phases['outer']['calls'], 1)
+        self.assertLess(report.phases['outer']['seconds'], 0.045)
+        self.assertGreaterEqual(report.phases['inner']['seconds'], 0.045)
+
+    def test_retained_memory(self):
+        report = BuildReport().start()
+        with report.phase('keep'):
+            kept = [bytearray(1024) for _ in range(100)]
+        report.finish()
+        self.assertGreater(report.phases['keep']['retained'], 100 * 1024)
+        self.assertFalse(tracemalloc.is_tracing())
+        del kept
+
+    def test_client_build_report(self):
+        client = ClientBuilder(wadl_file=WADL, api_prefix='api/2', build_report=True)
+        report = client.build_report
+        for phase in ('xml_parse', 'object_build', 'resources', 'methods', 'closures', 'prefix_filter', 'flat_naming round 1'):
+            self.assertIn(phase, report.phases)
+        self.assertEqual(report.counts['methods'], client._wadl.method_count)
+        self.assertEqual(report.phases['methods']['calls'], client._wadl.method_count)
+        # one entry per round of naming conflict resolving: JIRA takes three
+        rounds = [name for name in report.phases if name.startswith('flat_naming')]
+        self.assertEqual(rounds, ['flat_naming round 1', 'flat_naming round 2', 'flat_naming round 3'])
+        self.assertEqual([report.phases[name]['calls'] for name in rounds], [1, 1, 1])
+        self.assertIn('xml_parse', report.format())
+        self.assertIsNone(ClientBuilder(wadl_file=WADL, api_prefix='api/2').build_report)
+
+    def test_memory_report(self):
+        client = ClientBuilder(wadl_file=WADL, api_prefix='api/2')
+        report = client.memory_report()
+        for category in ('resource_nodes', 'method_closures', 'path_params', 'query_params', 'docs', 'wadl_tree'):
+            self.assertGreater(report.categories[category], 0)
+        self.assertEqual(sum(report.subtrees.values()), report.total)
+        self.assertGreater(report.subtrees['api/2/issue'], report.subtrees['api/2/myself'])
+        self.assertIn('(client)', report.subtrees)
+        self.assertEqual(report.counts['methods'], client._wadl.method_count)
+        # a second walk counts the same objects
+        self.assertEqual(client.memory_report().total, report.total)
+        self.assertIn('resource subtree', report.format())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import os
+import time
+import tempfile
+from multiprocessing import Pool
+from tttech.pyware.rate_limit import TokenBucket, SharedTokenBucket, RateLimiter, RateLimitExceeded
+
+
+def take_shared_tokens(path):
+    bucket = SharedTokenBucket(path, rate=1, burst=5)
+    return sum(1 for _ in range(5) if bucket.reserve(max_wait=0) is not None)
+
+
+class TestRateLimit(unittest.TestCase):
+    def test_token_bucket_burst_then_rate(self):
+        bucket = TokenBucket(rate=100, burst=5)
+        waits = [bucket.reserve() for _ in range(7)]
+        self.assertEqual(waits[:5], [0.0] * 5)
+        self.assertAlmostEqual(waits[5], 0.01, delta=0.005)
+        self.assertAlmostEqual(waits[6], 0.02, delta=0.005)
+        self.assertIsNone(bucket.reserve(max_wait=0))
+
+    def test_limiter_blocks_at_rate(self):
+        limiter = RateLimiter(rate=50, burst=1)
+        start = time.monotonic()
+        for _ in range(6):
+            limiter.acquire('host', 'GET', 'api/2/field')
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_endpoint_rule(self):
+        limiter = RateLimiter(rate=1000, burst=1000, endpoints={'POST api/2/issue': (1, 1)}, max_wait=0.5)
+        limiter.acquire('host', 'POST', 'api/2/issue/{issueIdOrKey}/comment')
+        # other methods and paths only see the host limit
+        limiter.acquire('host', 'GET', 'api/2/issue/{issueIdOrKey}')
+        limiter.acquire('host', 'POST', 'api/2/issueLink')
+        self.assertRaises(RateLimitExceeded, limiter.acquire, 'host', 'POST', 'api/2/issue')
+
+    def test_refused_request_keeps_host_tokens(self):
+        limiter = RateLimiter(rate=1, burst=2, endpoints={'api/2/search': (1, 1)}, max_wait=0)
+        limiter.acquire('host', 'GET', 'api/2/search')
+        for _ in range(3):
+            self.assertRaises(RateLimitExceeded, limiter.acquire, 'host', 'GET', 'api/2/search')
+        # the refused requests took no host token: one is left
+        limiter.acquire('host', 'GET', 'api/2/field')
+        self.assertRaises(RateLimitExceeded, limiter.acquire, 'host', 'GET', 'api/2/field')
+
+    def test_endpoint_lookup_is_bounded(self):
+        limiter = RateLimiter(rate=10 ** 6, endpoints={'api/2/search': 10 ** 6})
+        for idx in range(3000):
+            limiter.acquire('host', 'GET', 'api/2/issue/ABC-%d' % idx)
+        self.assertLessEqual(limiter._endpoint_bucket.cache_info().currsize, 1024)
+
+    def test_shared_bucket_across_processes(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'host.bucket')
+            with Pool(4) as pool:
+                taken = pool.map(take_shared_tokens, [path] * 4)
+            # 5 tokens in the bucket for all processes together, plus what refilled meanwhile
+            self.assertLessEqual(sum(taken), 6)
+            self.assertGreaterEqual(sum(taken), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+import os
+import json
+import unittest
+import tempfile
+from tests.stubs import WADL, StubAdapter, JiraTestCase, stub_handler
+from tttech.pyware import wadl
+from tttech.pyware.wadl_parser import WadlParser
+from tttech.pyware.payload import DictPayLoad, Record, payload_fields
+from tttech.pyware.records import RecordFactory, RecordDecoder, PLAIN, xsd_schemas
+
+RESOLUTIONS = b'[{"self": "https://jira/rest/api/2/resolution/1", "id": "1", "name": "Fixed"}, {"id": "2", "name": "Won\'t Fix"}]'
+
+
+class TestRecords(JiraTestCase):
+    def test_schema(self):
+        factory = RecordFactory()
+        schema = {'title': 'Version', 'type': 'object', 'properties': {
+            'id': {'type': 'string'}, 'released': {'type': 'boolean'},
+            'owner': {'$ref': '#/definitions/user'}, 'links': {'type': 'array', 'items': {'$ref': '#/definitions/user'}},
+            'avatarUrls': {'type': 'object', 'properties': {'16x16': {'type': 'string'}}}},
+            'definitions': {'user': {'title': 'User', 'type': 'object', 'properties': {'name': {'type': 'string'}}}}}
+        decoder = RecordDecoder(factory, 'version', schema)
+        self.assertIs(decoder.shape.fields['avatarUrls'], PLAIN)
+        version = decoder.decode({'id': '1', 'owner': {'name': 'user'}, 'links': [{'name': 'a'}], 'avatarUrls': {'16x16': 'x'}})
+        self.assertEqual(type(version).__name__, 'Version')
+        self.assertFalse(hasattr(version, '__dict__'))
+        self.assertEqual(version.owner.name, 'user')
+        self.assertIs(type(version.links[0]), type(version.owner))
+        self.assertIsInstance(version.avatarUrls, DictPayLoad)
+        self.assertEqual(version['id'], '1')
+        self.assertFalse(hasattr(version, 'released'))
+        with self.assertRaises(KeyError):
+            version['released']
+        self.assertEqual(payload_fields(version), ['id', 'owner', 'links', 'avatarUrls'])
+        self.assertEqual(repr(version), "{'id': '1', 'owner': {'name': 'user'}, 'links': [{'name': 'a'}], 'avatarUrls': {'16x16': 'x'}}")
+        # the same shape shares its class
+        self.assertIs(RecordDecoder(factory, 'version', schema).shape.cls, decoder.shape.cls)
+
+    def test_inferred(self):
+        decoder = RecordDecoder(RecordFactory(), 'issue')
+        first = decoder.decode([{'key': 'A-1', 'fields': {'summary': 'One'}}, {'key': 'A-2'}])
+        self.assertIsInstance(first[0], Record)
+        self.assertEqual(first[0].fields.summary, 'One')
+        later = decoder.decode({'key': 'A-3', 'fields': {'summary': 'Three', 'labels': ['x']}})
+        self.assertEqual(later.fields.labels, ['x'])
+        self.assertEqual(type(later).__name__, 'Issue')
+        self.assertEqual(type(later.fields)._fields, ('summary', 'labels'))
+
+    def test_xsd(self):
+        xsd = b'''<?xml version="1.0"?>
+            <xs:schema xmlns:xs="http://www.w3.org/2001/XMLSchema">
+              <xs:element name="project" type="projectBean"/>
+              <xs:complexType name="projectBean"><xs:sequence>
+                <xs:element name="key" type="xs:string"/>
+                <xs:element name="components" type="componentBean" maxOccurs="unbounded"/>
+              </xs:sequence><xs:attribute name="id" type="xs:string"/></xs:complexType>
+              <xs:complexType name="componentBean"><xs:sequence><xs:element name="name" type="xs:string"/></xs:sequence></xs:complexType>
+            </xs:schema>'''
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'xsd0.xsd')
+            with open(path, 'wb') as f:
+                f.write(xsd)
+            schemas = xsd_schemas(path)
+        project = RecordDecoder(RecordFactory(), 'project', schemas['project']).decode({'id': '1', 'key': 'ABC', 'components': [{'name': 'ui'}]})
+        self.assertEqual(type(project).__name__, 'ProjectBean')
+        self.assertEqual(type(project)._fields, ('key', 'components', 'id'))
+        self.assertEqual(project.components[0].name, 'ui')
+
+    def test_client(self):
+        handler, _ = stub_handler(StubAdapter(body=RESOLUTIONS), records=True)
+        client = self.jira_client(handler)
+        resolutions = client.resolution.get_all()
+        self.assertEqual(type(resolutions[0]).__name__, 'Resolution')
+        self.assertEqual(resolutions[1].name, "Won't Fix")
+        self.assertFalse(hasattr(resolutions[1], 'self'))
+
+    def test_documented_schemas_are_read_on_demand(self):
+        self.assertIsNone(wadl.doc.subclass)
+        parser = WadlParser(wadl_file=WADL)
+        self.assertIsNone(parser._documented)
+        method = next(method for resource in parser._resources for method in resource._methods if method.__name__ == 'getResolutions')
+        schema = parser._response_schema(method.__wadl__)[0]
+        self.assertEqual(json.loads(schema)['items']['title'], 'Resolution')
+        self.assertIsNotNone(parser._documented)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tttech.pyware.single_flight import SingleFlight
+from tests.stubs import StubAdapter, JiraTestCase, stub_handler
+
+
+class TestSingleFlight(JiraTestCase):
+    def test_concurrent_calls_share_one_run(self):
+        flight = SingleFlight()
+        runs = []
+        started = threading.Event()
+
+        def slow():
+            runs.append(1)
+            started.set()
+            time.sleep(0.2)
+            return 'result'
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            leader = pool.submit(flight.do, 'key', slow)
+            started.wait()
+            followers = [pool.submit(flight.do, 'key', slow) for _ in range(9)]
+            results = [leader.result()] + [f.result() for f in followers]
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(results[0], ('result', False))
+        self.assertTrue(all(result == ('result', True) for result in results[1:]))
+        # the key is free again once the call is done
+        self.assertEqual(flight.do('key', lambda: 'again'), ('again', False))
+
+    def test_exception_is_shared(self):
+        flight = SingleFlight()
+        started = threading.Event()
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise ValueError('boom')
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            leader = pool.submit(flight.do, 'key', failing)
+            started.wait()
+            follower = pool.submit(flight.do, 'key', failing)
+            self.assertRaises(ValueError, leader.result)
+            self.assertRaises(ValueError, follower.result)
+
+    def test_generated_get_is_coalesced(self):
+        adapter = StubAdapter(body=b'[{"id": "summary", "name": "Summary"}]', delay=0.2)
+        handler, _ = stub_handler(adapter, single_flight=True)
+        client = self.jira_client(handler)
+
+        with ThreadPoolExecutor(max_workers=20) as pool:
+            fields = list(pool.map(lambda _: client.field.get(), range(20)))
+        self.assertEqual(adapter.calls, 1)
+        self.assertEqual(handler.stats['requests_coalesced'], 19)
+        self.assertTrue(all(f[0].name == 'Summary' for f in fields))
+
+        # every caller decodes objects of its own
+        self.assertEqual(len({id(f) for f in fields}), 20)
+        fields[0][0].name = 'changed'
+        self.assertEqual(fields[1][0].name, 'Summary')
+
+    def test_other_cookies_are_other_calls(self):
+        adapter = StubAdapter(body=b'{"name": "user"}', delay=0.2)
+        handler, _ = stub_handler(adapter, single_flight=True)
+        client = self.jira_client(handler)
+        sessions = [{'JSESSIONID': 'a'}, {'JSESSIONID': 'b'}] * 5
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            list(pool.map(lambda cookie: client.myself.get(cookie=cookie), sessions))
+        self.assertEqual(adapter.calls, 2)
+        self.assertEqual(sorted(request.headers['Cookie'] for request in adapter.requests), ['JSESSIONID=a', 'JSESSIONID=b'])
+
+    def test_requester_headers_are_deprecated(self):
+        handler, _ = stub_handler()
+        with self.assertWarns(DeprecationWarning):
+            self.assertIs(handler.requester({'X-Test': '1'}), handler._requests_session)
+        self.assertNotIn('X-Test', handler._requests_session.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+import io
+import os
+import mmap
+import tempfile
+from tests.stubs import StubAdapter, JiraTestCase, stub_handler
+
+
+class TestStreaming(JiraTestCase):
+    def setUp(self):
+        super().setUp()
+        self.body = os.urandom(300 * 1024)
+        # the body is only read when the response is consumed
+        adapter = StubAdapter(body=self.body, content_type='application/octet-stream', raw=True)
+        self.handler, self.adapter = stub_handler(adapter)
+        self.client = self.jira_client(self.handler)
+
+    def test_stream_chunks(self):
+        chunks = self.client.attachment.get('10000', stream=True, chunk_size=1024)
+        self.assertEqual(self.adapter.streamed, [True])
+        chunks = list(chunks)
+        self.assertTrue(all(len(chunk) <= 1024 for chunk in chunks))
+        self.assertEqual(b''.join(chunks), self.body)
+
+    def test_stream_to_file(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'attachment.bin')
+            self.assertEqual(self.client.attachment.get('10000', stream_to=path), len(self.body))
+            with open(path, 'rb') as f:
+                self.assertEqual(f.read(), self.body)
+        sink = io.BytesIO()
+        self.client.attachment.get('10000', stream_to=sink)
+        self.assertEqual(sink.getvalue(), self.body)
+
+    def test_multipart_upload_is_streamed(self):
+        with tempfile.TemporaryFile() as f:
+            f.write(self.body)
+            f.seek(0)
+            self.client.issue.attachments.post('ABC-1', files={'file': ('big.bin', f)}, headers={'X-Atlassian-Token': 'no-check'})
+            request = self.adapter.requests[-1]
+            self.assertNotIsInstance(request.body, bytes)
+            self.assertTrue(request.headers['Content-Type'].startswith('multipart/form-data; boundary='))
+            sent = b''.join(bytes(chunk) for chunk in request.body)
+        self.assertEqual(int(request.headers['Content-Length']), len(sent))
+        self.assertIn(b'filename="big.bin"', sent)
+        self.assertIn(self.body, sent)
+
+    def test_generator_and_mmap_bodies(self):
+        self.client.issue.attachments.post('ABC-1', data_dict=(self.body[i:i + 1000] for i in range(0, len(self.body), 1000)))
+        request = self.adapter.requests[-1]
+        self.assertEqual(request.headers['Transfer-Encoding'], 'chunked')
+        with tempfile.TemporaryFile() as f:
+            f.write(self.body)
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.client.issue.attachments.post('ABC-1', data_dict=mapped)
+                request = self.adapter.requests[-1]
+                self.assertEqual(int(request.headers['Content-Length']), len(self.body))
+                self.assertIs(request.body, mapped)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import threading
+import unittest
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from tttech.pyware.core import RestHandler
+from tttech.pyware.timing import PHASES
+from tests.stubs import JiraTestCase, stub_handler
+
+
+class JsonHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = json.dumps({'key': 'ABC-1'}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPhaseTiming(JiraTestCase):
+    def client(self, **kwargs):
+        handler, _ = stub_handler(phase_timing=True, **kwargs)
+        return handler, self.jira_client(handler)
+
+    def test_phases_of_a_call(self):
+        handler, client = self.client(metrics=True)
+        issue = client.issue.get('ABC-1')
+        self.assertEqual(issue.key, 'ABC-1')
+        phases = handler.last_phases()
+        for phase in ('build', 'encode', 'throttle', 'compress', 'headers', 'transfer', 'decode', 'total'):
+            self.assertGreaterEqual(phases[phase], 0.0)
+        self.assertLessEqual(sum(seconds for phase, seconds in phases.items() if phase != 'total'), phases['total'] * 1.01)
+        self.assertEqual(handler.stats['phase_time']['total'], phases['total'])
+        metrics = handler.metrics.to_dict()[client.issue.get.__name__]
+        self.assertEqual(metrics['phases']['decode']['count'], 1)
+        self.assertIn('pyware_phase_duration_seconds_count{', handler.metrics.prometheus())
+
+    def test_phases_on_the_response(self):
+        handler, client = self.client()
+        response = client.issue.get('ABC-1', requests_response=True)
+        self.assertIs(response.phases, handler.last_phases())
+        self.assertNotIn('decode', response.phases)
+
+    def test_off_by_default(self):
+        handler, _ = stub_handler()
+        client = self.jira_client(handler)
+        response = client.issue.get('ABC-1', requests_response=True)
+        self.assertFalse(hasattr(response, 'phases'))
+        self.assertIsNone(handler.last_phases())
+        self.assertEqual(handler.stats['phase_time'], {})
+
+    def test_network_phases(self):
+        server = HTTPServer(('127.0.0.1', 0), JsonHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            handler = RestHandler(base_url='http://127.0.0.1:%d/rest' % server.server_port, user='user', password='password', phase_timing=True)
+            response = handler.do_request('api/2/issue/ABC-1', 'GET')
+            self.assertEqual(response.json(), {'key': 'ABC-1'})
+            for phase in ('checkout', 'connect', 'send', 'wait', 'transfer', 'total'):
+                self.assertIn(phase, response.phases)
+            self.assertTrue(set(response.phases) <= set(PHASES) | {'total'})
+            self.assertEqual(handler.stats['requests'], 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
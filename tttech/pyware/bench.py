@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    bench.py: Load generator calling a generated method at a concurrency or a target rate, the `bench` command
+"""
+
+import re
+import json
+import time
+import logging
+import argparse
+import itertools
+import threading
+from collections import Counter
+from .metrics import Histogram
+
+
+def load_arg_sets(path):
+    """ Read the arguments of the calls from a file, one JSON value per line: a list (the positional arguments),
+        an object (the keyword arguments) or {"args": [...], "kwargs": {...}}. The calls take them in turn.
+    """
+    arg_sets = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            value = json.loads(line)
+            if isinstance(value, list):
+                arg_sets.append((tuple(value), {}))
+            elif isinstance(value, dict) and set(value) <= {'args', 'kwargs'} and value:
+                arg_sets.append((tuple(value.get('args', ())), dict(value.get('kwargs', {}))))
+            elif isinstance(value, dict):
+                arg_sets.append(((), value))
+            else:
+                arg_sets.append(((value,), {}))
+    return arg_sets
+
+
+def error_kind(error):
+    """ 'HTTP <status>' for the errors of the generated methods, the exception class otherwise """
+    match = re.match(r'Error (\d{3}):', str(error))
+    return 'HTTP %s' % match.group(1) if match else type(error).__name__
+
+
+class BenchResult():
+    """ Calls, errors by kind, latency histogram and CPU time of the process during a run """
+
+    def __init__(self, method_name, concurrency, rate):
+        self.method_name = method_name
+        self.concurrency = concurrency
+        self.rate = rate
+        self.latency = Histogram()
+        self.errors = Counter()
+        self.requests = 0
+        self.elapsed = 0.0
+        self.cpu = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, error=None):
+        with self._lock:
+            self.requests += 1
+            self.latency.record(seconds)
+            if error is not None:
+                self.errors[error_kind(error)] += 1
+
+    def to_dict(self):
+        return {
+            'method': self.method_name, 'concurrency': self.concurrency, 'rate': self.rate,
+            'requests': self.requests, 'errors': dict(self.errors), 'elapsed': self.elapsed,
+            'throughput': self.requests / self.elapsed if self.elapsed else 0.0,
+            'latency': self.latency.to_dict(),
+            'cpu_seconds': self.cpu, 'cpu_percent': 100.0 * self.cpu / self.elapsed if self.elapsed else 0.0,
+            'cpu_per_request': self.cpu / self.requests if self.requests else 0.0,
+        }
+
+    def format(self):
+        d = self.to_dict()
+        lines = [
+            '%s: %d requests in %.1f s, %.1f requests/s (concurrency %d%s)' % (
+                d['method'], d['requests'], d['elapsed'], d['throughput'], d['concurrency'],
+                ', target %.1f/s' % d['rate'] if d['rate'] else '',
+            ),
+            'latency: p50 %.2f ms, p95 %.2f ms, p99 %.2f ms, max %.2f ms' % tuple(
+                d['latency'][key] * 1e3 for key in ('p50', 'p95', 'p99', 'max')
+            ),
+            'errors: %d%s' % (
+                sum(self.errors.values()),
+                ' (%s)' % ', '.join('%s: %d' % item for item in self.errors.most_common()) if self.errors else '',
+            ),
+            'client CPU: %.2f s, %.0f%% of one core, %.0f us per request' % (d['cpu_seconds'], d['cpu_percent'], d['cpu_per_request'] * 1e6),
+        ]
+        return '\n'.join(lines)
+
+
+def run(method, arg_sets=None, concurrency=1, rate=None, duration=10.0):
+    """ Call `method` from `concurrency` threads for `duration` seconds, with the argument sets in turn.
+
+        Without `rate`, each thread calls again as soon as a call returns. With `rate`, the calls start on a fixed schedule
+        of `rate` per second, and the latency counts from the scheduled start: a slow server delays the calls behind it,
+        that waiting is part of their latency (no coordinated omission).
+    """
+    arg_sets = arg_sets or [((), {})]
+    result = BenchResult(method.__name__, concurrency, rate)
+    counter = itertools.count()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def worker():
+        while True:
+            n = next(counter)
+            args, kwargs = arg_sets[n % len(arg_sets)]
+            if rate:
+                scheduled = started + n / rate
+                if scheduled >= deadline:
+                    return
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= deadline:
+                    return
+            error = None
+            try:
+                method(*args, **kwargs)
+            except Exception as e:
+                error = e
+            result.record(time.perf_counter() - scheduled, error)
+
+    cpu = time.process_time()
+    threads = [threading.Thread(target=worker, name='pyware-bench-%d' % i, daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed = time.perf_counter() - started
+    result.cpu = time.process_time() - cpu
+    return result
+
+
+def main(client, argv):
+    """ The `bench` command of docs_handler: `bench METHOD [--args FILE] [--concurrency N] [--rate R] [--duration S] [--json]` """
+    parser = argparse.ArgumentParser(prog='pyware bench', description='Call a method of the API under load and report the client side view')
+    parser.add_argument('method', help='Flat method name, see the list command')
+    parser.add_argument('--args', metavar='FILE', help='Arguments of the calls, a JSON value per line')
+    parser.add_argument('--concurrency', type=int, default=1, help='Threads calling the method')
+    parser.add_argument('--rate', type=float, default=None, help='Target calls per second, instead of calling as fast as possible')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run')
+    parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+    args = parser.parse_args(argv)
+    method = getattr(client._func, args.method, None)
+    if method is None:
+        parser.error('no method %s' % args.method)
+    # the errors are counted in the report, not logged one by one
+    logging.getLogger('tttech.pyware').setLevel(logging.CRITICAL)
+    result = run(method, load_arg_sets(args.args) if args.args else None, args.concurrency, args.rate, args.duration)
+    print(json.dumps(result.to_dict(), indent=2) if args.json else result.format())
+    return result
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    cache.py: Disk-backed response cache, shared by all processes of a host
+"""
+
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
+import threading
+
+
+class SqliteResponseCache():
+    """ Store GET responses in a SQLite database so that every worker process on a host shares them.
+
+        The database runs in WAL mode: readers never block each other and one writer at a time is
+        serialized by SQLite itself, so any number of processes may point to the same file.
+        Bodies are zlib-compressed, entries expire after `max_age` seconds and the oldest entries
+        are evicted once the bodies stored exceed `max_size` bytes.
+    """
+
+    # headers which describe the wire format, not the (already decoded) body we store
+    _SKIPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'set-cookie')
+
+    def __init__(
+            self,
+            path,
+            max_age=300,
+            max_size=256 * 1024 * 1024,
+            compress_level=6,
+            compress_min_size=512,
+            evict_interval=64,
+            timeout=30,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.max_age = max_age
+        self.max_size = max_size
+        self.compress_level = compress_level
+        self.compress_min_size = compress_min_size
+        self.evict_interval = evict_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        self._setup()
+
+    def _connection(self):
+        """ One connection per process and thread, sqlite3 connections must not cross either """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _setup(self):
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY,'
+            ' url TEXT NOT NULL,'
+            ' resource TEXT,'
+            ' status INTEGER NOT NULL,'
+            ' headers TEXT NOT NULL,'
+            ' body BLOB NOT NULL,'
+            ' compressed INTEGER NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' stored REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS responses_stored ON responses(stored)')
+        conn.execute('CREATE INDEX IF NOT EXISTS responses_resource ON responses(resource)')
+
+    def get(self, key):
+        """ Return (status, headers, body) of a fresh entry, or None """
+        row = self._connection().execute(
+            'SELECT status, headers, body, compressed, stored FROM responses WHERE key = ?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, body, compressed, stored = row
+        if self.max_age is not None and stored < time.time() - self.max_age:
+            self.delete(key)
+            return None
+        if compressed:
+            body = zlib.decompress(body)
+        return status, json.loads(headers), body
+
+    def set(self, key, url, status, headers, body, resource=None):
+        """ Store a response. `resource` is the WADL resource path the URL was rendered from """
+        headers = {k: v for k, v in headers.items() if k.lower() not in self._SKIPPED_HEADERS}
+        compressed = 0
+        if len(body) >= self.compress_min_size:
+            body = zlib.compress(body, self.compress_level)
+            compressed = 1
+        self._connection().execute(
+            'INSERT OR REPLACE INTO responses (key, url, resource, status, headers, body, compressed, size, stored)'
+            ' VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, url, resource, status, json.dumps(headers), sqlite3.Binary(body), compressed, len(body), time.time())
+        )
+        self._writes += 1
+        if self._writes % self.evict_interval == 0:
+            self.evict()
+
+    def delete(self, key):
+        self._connection().execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def invalidate(self, resources, url, subtree=True):
+        """ Drop the entries of the given resource paths whose URL is `url`, or below it if `subtree` """
+        if not resources:
+            return
+        # substr() instead of LIKE: URLs may contain '%' or '_' and LIKE ignores case
+        sql = 'DELETE FROM responses WHERE resource IN (%s) AND (url = ? OR substr(url, 1, ?) = ?' % ', '.join('?' * len(resources))
+        args = list(resources) + [url, len(url) + 1, url + '?']
+        if subtree:
+            sql += ' OR substr(url, 1, ?) = ?'
+            args += [len(url) + 1, url + '/']
+        self._connection().execute(sql + ')', args)
+
+    def clear(self):
+        self._connection().execute('DELETE FROM responses')
+
+    def evict(self):
+        """ Drop expired entries, then the oldest ones until the stored size fits into `max_size` """
+        conn = self._connection()
+        if self.max_age is not None:
+            conn.execute('DELETE FROM responses WHERE stored < ?', (time.time() - self.max_age,))
+        if self.max_size is not None:
+            # the newest entries are kept: find the first (newest to oldest) whose running total overflows
+            row = conn.execute(
+                'SELECT stored FROM (SELECT stored, SUM(size) OVER (ORDER BY stored DESC) AS total FROM responses)'
+                ' WHERE total > ? LIMIT 1', (self.max_size,)
+            ).fetchone()
+            if row is not None:
+                conn.execute('DELETE FROM responses WHERE stored <= ?', (row[0],))
+                self.logger.debug('Response cache evicted entries stored before %s', row[0])
+
+    def size(self):
+        """ Return number of entries and bytes stored """
+        count, total = self._connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return count, total
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    cassette.py: Record requests and responses to a file and replay them without network, for tests and benchmarks
+"""
+
+import os
+import gzip
+import json
+import time
+import hashlib
+import logging
+import datetime
+import threading
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+
+
+class CassetteMiss(requests.RequestException):
+    """ A request which is not on the cassette. Not a connection error: the endpoint did not fail, the cassette lacks it """
+
+
+class Interaction():
+    """ One request and its response """
+    __slots__ = ('method', 'url', 'request_headers', 'request_body', 'status', 'reason', 'headers', 'body', 'elapsed')
+
+    def __init__(self, method, url, request_headers, request_body, status, reason, headers, body, elapsed):
+        self.method = method
+        self.url = url
+        self.request_headers = request_headers
+        self.request_body = request_body
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.elapsed = elapsed
+
+    def key(self, match_body=True):
+        return request_key(self.method, self.url, self.request_body if match_body else b'')
+
+
+def request_key(method, url, body):
+    return method, url, hashlib.sha1(body).hexdigest() if body else ''
+
+
+def body_bytes(body):
+    """ The body of a prepared request as bytes; streamed bodies (files, generators) are not kept, b'' """
+    if isinstance(body, str):
+        return body.encode('utf-8')
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
+    return b''
+
+
+class Cassette():
+    """ Interactions in a gzip file: per interaction a JSON line, then the request and response bodies as they are.
+
+        Credentials (Authorization, Cookie) are never written. Response bodies are stored decoded, as `response.content`,
+        without the headers of the wire format (Content-Encoding, Content-Length, Transfer-Encoding).
+    """
+
+    _SKIPPED_REQUEST_HEADERS = ('authorization', 'proxy-authorization', 'cookie')
+    _SKIPPED_HEADERS = ('content-encoding', 'content-length', 'transfer-encoding', 'set-cookie')
+
+    def __init__(self, path, overwrite=False):
+        self.logger = logging.getLogger(__name__)
+        self.path = path
+        self.interactions = []
+        self._lock = threading.Lock()
+        if overwrite:
+            open(path, 'wb').close()
+        elif os.path.exists(path):
+            self.load()
+
+    def load(self):
+        interactions = []
+        with gzip.open(self.path, 'rb') as f:
+            for line in f:
+                meta = json.loads(line)
+                request_body = f.read(meta['request_size'])
+                body = f.read(meta['size'])
+                interactions.append(Interaction(
+                    meta['method'], meta['url'], meta['request_headers'], request_body,
+                    meta['status'], meta['reason'], meta['headers'], body, meta['elapsed'],
+                ))
+        self.interactions = interactions
+        self.logger.debug('%d interactions loaded from %s', len(interactions), self.path)
+
+    def append(self, interaction):
+        """ Keep an interaction and write it at the end of the file """
+        meta = {
+            'method': interaction.method, 'url': interaction.url, 'request_headers': interaction.request_headers,
+            'status': interaction.status, 'reason': interaction.reason, 'headers': interaction.headers,
+            'elapsed': interaction.elapsed, 'request_size': len(interaction.request_body), 'size': len(interaction.body),
+        }
+        with self._lock:
+            self.interactions.append(interaction)
+            # gzip files may consist of several members, each append adds one
+            with gzip.open(self.path, 'ab') as f:
+                f.write(json.dumps(meta, separators=(',', ':')).encode('utf-8') + b'\n')
+                f.write(interaction.request_body)
+                f.write(interaction.body)
+
+    def record(self, request, response, elapsed):
+        self.append(Interaction(
+            request.method, request.url,
+            {k: v for k, v in request.headers.items() if k.lower() not in self._SKIPPED_REQUEST_HEADERS},
+            body_bytes(request.body),
+            response.status_code, response.reason,
+            {k: v for k, v in response.headers.items() if k.lower() not in self._SKIPPED_HEADERS},
+            response.content or b'', elapsed,
+        ))
+
+
+class RecordingAdapter(BaseAdapter):
+    """ Send the requests with `adapter` (an HTTPAdapter by default) and record them with their responses on `cassette` """
+
+    def __init__(self, cassette, adapter=None):
+        super().__init__()
+        self.cassette = cassette
+        self.adapter = adapter if adapter is not None else HTTPAdapter()
+
+    def send(self, request, **kwargs):
+        started = time.perf_counter()
+        response = self.adapter.send(request, **kwargs)
+        # the whole body, also of a streamed response: it is replayed from memory
+        response.content
+        self.cassette.record(request, response, time.perf_counter() - started)
+        return response
+
+    def close(self):
+        self.adapter.close()
+
+
+class ReplayAdapter(BaseAdapter):
+    """ Answer the requests from `cassette`, without network.
+
+        Requests are matched by method, URL and, with `match_body`, the body. The responses recorded for the same request
+        are replayed in turn, starting over after the last one. With `latency`, a response takes its recorded time
+        multiplied by `latency`; by default it comes at once.
+    """
+
+    def __init__(self, cassette, latency=0.0, match_body=True):
+        super().__init__()
+        self.match_body = match_body
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._responses = {}
+        self._next = {}
+        for interaction in cassette.interactions:
+            self._responses.setdefault(interaction.key(match_body), []).append(interaction)
+
+    def send(self, request, **kwargs):
+        key = request_key(request.method, request.url, body_bytes(request.body) if self.match_body else b'')
+        recorded = self._responses.get(key)
+        if not recorded:
+            raise CassetteMiss('Not on the cassette: %s %s' % (request.method, request.url), request=request)
+        with self._lock:
+            index = self._next.get(key, 0)
+            self._next[key] = (index + 1) % len(recorded)
+        interaction = recorded[index]
+        if self.latency:
+            time.sleep(interaction.elapsed * self.latency)
+        return self.build_response(request, interaction)
+
+    def build_response(self, request, interaction):
+        response = requests.Response()
+        response.status_code = interaction.status
+        response.reason = interaction.reason
+        response.headers = requests.structures.CaseInsensitiveDict(interaction.headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = interaction.body
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = datetime.timedelta(seconds=interaction.elapsed)
+        return response
+
+    def close(self):
+        pass
+
+
+def use_cassette(rest_handler, path, mode='replay', latency=0.0, match_body=True):
+    """ Let `rest_handler` record its requests to the cassette at `path`, or answer them from it, and return the Cassette.
+
+        `mode` is 'replay', 'record' (a new cassette) or 'append' (record after what is on the cassette).
+        Recording goes through the adapters mounted before, e.g. the one of phase timing.
+    """
+    session = rest_handler._requests_session
+    if mode == 'replay':
+        cassette = Cassette(path)
+        adapter = ReplayAdapter(cassette, latency=latency, match_body=match_body)
+        for prefix in ('http://', 'https://'):
+            session.mount(prefix, adapter)
+    elif mode in ('record', 'append'):
+        cassette = Cassette(path, overwrite=mode == 'record')
+        for prefix in ('http://', 'https://'):
+            session.mount(prefix, RecordingAdapter(cassette, session.get_adapter(prefix)))
+    else:
+        raise ValueError("mode must be 'replay', 'record' or 'append', not %r" % mode)
+    return cassette
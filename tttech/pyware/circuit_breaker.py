@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    circuit_breaker.py: Per-endpoint circuit breaker, to fail fast on resources which are failing
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+
+
+class CircuitOpenError(Exception):
+    """ The circuit of the endpoint is open, the request was not sent """
+
+
+class _Circuit():
+    """ State of one endpoint: closed (requests pass), open (requests fail fast) or half-open (a few trial requests) """
+
+    def __init__(self, key, window):
+        self.key = key
+        self.state = CircuitBreaker.CLOSED
+        self.outcomes = deque(maxlen=window)  # True for a bad call: failed or too slow
+        self.opened_at = 0.0
+        self.trials = 0
+
+
+class CircuitBreaker():
+    """ Circuit breakers keyed by HTTP method and resource path, e.g. ('GET', 'api/2/issue/{issueIdOrKey}').
+
+        A circuit opens when, among the last `window` calls (at least `min_calls`), the rate of bad calls
+        reaches `failure_rate`. A call is bad when it raised (timeout, connection error), answered 5xx,
+        or took longer than `latency_threshold` seconds. An open circuit rejects calls with CircuitOpenError
+        for `open_duration` seconds, then lets `half_open_calls` trial calls through: the circuit closes
+        when they all succeed and opens again otherwise.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(
+            self,
+            failure_rate=0.5,
+            latency_threshold=None,
+            window=20,
+            min_calls=10,
+            open_duration=30.0,
+            half_open_calls=1,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.failure_rate = failure_rate
+        self.latency_threshold = latency_threshold
+        self.window = window
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self._lock = threading.Lock()
+        self._circuits = {}
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """ Call `listener(key, old_state, new_state)` on every state change """
+        self._listeners.append(listener)
+
+    def _set_state(self, circuit, state):
+        old_state, circuit.state = circuit.state, state
+        if state == self.OPEN:
+            circuit.opened_at = time.monotonic()
+        # every state judges its own calls only
+        circuit.trials = 0
+        circuit.outcomes.clear()
+        self.logger.warning('Circuit %s %s: %s -> %s', circuit.key[0], circuit.key[1], old_state, state)
+        return old_state
+
+    def _notify(self, circuit, old_state):
+        for listener in self._listeners:
+            listener(circuit.key, old_state, circuit.state)
+
+    def allow(self, mtype, path):
+        """ Return the circuit of the endpoint if the call may go out, raise CircuitOpenError otherwise """
+        key = (mtype, path)
+        changed = None
+        with self._lock:
+            circuit = self._circuits.get(key)
+            if circuit is None:
+                circuit = self._circuits[key] = _Circuit(key, self.window)
+            if circuit.state == self.CLOSED:
+                return circuit
+            if circuit.state == self.OPEN and time.monotonic() - circuit.opened_at >= self.open_duration:
+                changed = self._set_state(circuit, self.HALF_OPEN)
+            if circuit.state == self.HALF_OPEN and circuit.trials < self.half_open_calls:
+                circuit.trials += 1
+                admitted = True
+            else:
+                admitted = False
+        if changed is not None:
+            self._notify(circuit, changed)
+        if not admitted:
+            raise CircuitOpenError('Circuit of %s %s is %s' % (mtype, path, circuit.state))
+        return circuit
+
+    def record(self, circuit, ok, duration):
+        """ Record the outcome of a call admitted by `allow` """
+        bad = not ok or (self.latency_threshold is not None and duration > self.latency_threshold)
+        changed = None
+        with self._lock:
+            if circuit.state == self.HALF_OPEN:
+                if bad:
+                    changed = self._set_state(circuit, self.OPEN)
+                else:
+                    circuit.outcomes.append(False)
+                    if circuit.outcomes.count(False) >= self.half_open_calls:
+                        changed = self._set_state(circuit, self.CLOSED)
+            elif circuit.state == self.CLOSED:
+                circuit.outcomes.append(bad)
+                calls = len(circuit.outcomes)
+                if calls >= self.min_calls and circuit.outcomes.count(True) >= self.failure_rate * calls:
+                    changed = self._set_state(circuit, self.OPEN)
+        if changed is not None:
+            self._notify(circuit, changed)
+
+    def release(self, circuit):
+        """ Give back the admission of a call which ended without an outcome, e.g. it raised before it was sent """
+        with self._lock:
+            if circuit.state == self.HALF_OPEN and circuit.trials > 0:
+                circuit.trials -= 1
+
+    def states(self):
+        """ Return the state of every endpoint seen so far """
+        return {'%s %s' % key: circuit.state for key, circuit in self._circuits.items()}
@@ -1,7 +1,9 @@
 import re
 import logging
 import types
+from tttech.pyware import wadl
 from tttech.pyware.wadl_parser import WadlParser
+from tttech.pyware.profiling import BuildReport, MemoryReport, NO_REPORT
 from pprint import pprint
 from operator import attrgetter
 from collections import defaultdict, deque
@@ -14,21 +16,79 @@ class ClientBuilder():
         - resource based. E.g. resource.resource_child.get(id) 
         - method name based. E.g. getResourceContent(id)
     '''
+    _report = NO_REPORT
+    build_report = None
 
-    def __init__(self, wadl_file, rest_handler=None, api_prefix=''):
-        logging.basicConfig(level=logging.DEBUG, format='%(message)s')
+    def __init__(self, wadl_file, rest_handler=None, api_prefix='', build_report=False):
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.DEBUG)
 
         self.logger.debug("\n\n Initiate client ----------")
 
-        self._wadl = WadlParser(wadl_file=wadl_file, rest_handler=rest_handler)
+        if build_report:
+            # time and memory per phase of the build, kept in `self.build_report`
+            self._report = BuildReport().start()
+        self._wadl = WadlParser(wadl_file=wadl_file, rest_handler=rest_handler, build_report=self._report)
         self._PREFIX = api_prefix
         self._func = types.SimpleNamespace()
 
-        for resource_cls in self._wadl._resources:
-            self._parse_resource(resource_cls, level=1)
-        self._build_flat_naming_scheme()
+        with self._report.phase('prefix_filter'):
+            for resource_cls in self._wadl._resources:
+                self._parse_resource(resource_cls, level=1)
+        # one phase per round of conflict resolving, each round nested in the one before
+        with self._report.phase('flat_naming round 1'):
+            self._build_flat_naming_scheme()
+        if build_report:
+            self.build_report = self._report.finish()
+            self._report = NO_REPORT
+
+    def bind(self, rest_handler):
+        """ Return a client of the same API calling through `rest_handler`. It shares the resources, methods and names
+            of this client: binding allocates no more than the client object, whatever the size of the WADL. A resource
+            node or method is wrapped the first time it is looked up on the bound client, and the wrapper kept there
+        """
+        return BoundClient(self, rest_handler)
+
+    def memory_report(self):
+        """ Return the bytes retained by the model of this client by category (resource nodes, method closures, path and
+            query params, docs, schemas, generateDS methods kept as `__wadl__`, invalidation scopes) and by top resource
+        """
+        resources = self._wadl._resources
+        methods = [method for resource in resources for method in resource._methods]
+        nodes = []
+        pending = [value for name, value in vars(self).items() if isinstance(value, types.SimpleNamespace) and name != '_func']
+        while pending:
+            node = pending.pop()
+            nodes.append(node)
+            pending.extend(value for value in vars(node).values() if isinstance(value, types.SimpleNamespace))
+        boundary = [self, self._wadl, self._wadl.rest_handler, self._func] + resources + methods + nodes
+        report = MemoryReport(boundary=boundary, categories_by_type={wadl.doc: 'docs'})
+
+        for resource in resources:
+            root = resource
+            while root._parent is not None:
+                root = root._parent
+            subtree = root._path_full
+            report.add(resource._path_param, 'path_params', subtree)
+            report.add(resource, 'resource_nodes', subtree)
+            for method in resource._methods:
+                report.add(method._path_params, 'path_params', subtree)
+                report.add(method._query_params, 'query_params', subtree)
+                report.add(method.__doc__, 'docs', subtree)
+                report.add(method._records, 'schemas', subtree)
+                report.add(method.__wadl__, 'wadl_tree', subtree)
+                report.add(method._invalidates, 'invalidation_scopes', subtree)
+                report.add(method, 'method_closures', subtree)
+        # what is not below a resource: the nodes of the resource based names, the flat names, the parser's lists
+        for node in nodes + [self._func, resources]:
+            report.add(node, 'resource_nodes', '(client)')
+        report.add(self._wadl._grammars, 'schemas', '(client)')
+        report.add(self._wadl._documented, 'schemas', '(client)')
+        report.add(self._wadl._item_records, 'schemas', '(client)')
+        report.add(self._wadl.records, 'schemas', '(client)')
+        report.count('resources', len(resources))
+        report.count('methods', len(methods))
+        report.count('client_nodes', len(nodes))
+        return report
 
     def _create_resource(self, resource_names):
         """ Add resource into the object """
@@ -40,7 +100,7 @@ class ClientBuilder():
         for resource_name in resource_names:
             #self.logger.debug('travel to resource: %s' % resource_name)
             if not hasattr(current, resource_name):
-                self.logger.debug("create new node: %s" % resource_name)
+                self.logger.debug("create new node: %s", resource_name)
                 new_rs_node = types.SimpleNamespace()
                 setattr(current, resource_name, new_rs_node)
                 current = new_rs_node
@@ -64,7 +124,7 @@ class ClientBuilder():
 
     def _parse_resource(self, resource_cls, level=1):
         """ Build the structure of resources and methods and assign as attributes of this object """
-        self.logger.debug("%sResource: %s - type: %s" % ("  " * level, resource_cls._path_full, str(type(resource_cls))))
+        self.logger.debug("%sResource: %s - type: %s", "  " * level, resource_cls._path_full, type(resource_cls))
         if not resource_cls._path_full.startswith(self._PREFIX):
             return None
         # remove prefix
@@ -77,7 +137,7 @@ class ClientBuilder():
         current_rs, full_rs_name = self._create_resource(list_component)
         if not current_rs:
             return
-        self.logger.debug("%s current rs: %s" % ("  " * level, full_rs_name))
+        self.logger.debug("%s current rs: %s", "  " * level, full_rs_name)
 
         for method in resource_cls._methods:
             self._create_method(current_rs, method)
@@ -120,7 +180,7 @@ class ClientBuilder():
                 for method in methods:
                     if namedict[method._resource_path]:
                         method.__name__ = '_'.join([method.__name__, namedict[method._resource_path][0]]).replace('{', '').replace('}', '').replace('-', '_')
-                    self.logger.debug('  --> {} --> {}'.format(method._resource_path, method.__name__))
+                    self.logger.debug('  --> %s --> %s', method._resource_path, method.__name__)
         ''' however, the conflict still remain, e.g. with JIRA, after the first round, we still have 2 "delete_version"
         original name: delete
           --> api/2/component/{id}             --> delete_component
@@ -132,10 +192,67 @@ class ClientBuilder():
           --> api/2/version/{id}/removeAndSwap --> delete_version_removeAndSwap
         '''
         if recheck_required:
-            self._build_flat_naming_scheme(counter)
+            with self._report.phase('flat_naming round %d' % (counter + 1)):
+                self._build_flat_naming_scheme(counter)
         else:
             # if there is no conflict, populate them
             for resource in self._wadl._resources:
                 for method in resource._methods:
                     setattr(self._func, method.__name__, method)
             self.logger.debug('Naming conflict resolving done. Round: %s', counter)
+
+
+class BoundNamespace():
+    """ A resource node, or the flat names, of a bound client: its methods call through the RestHandler of the client.
+        The first lookup of a node or method allocates its BoundNamespace or BoundMethod, kept as an attribute so that
+        the next lookups find it directly: a bound client grows with the methods it uses, not with the WADL
+    """
+
+    def __init__(self, node, rest_handler):
+        self._node = node
+        self.rest_handler = rest_handler
+
+    def __getattr__(self, name):
+        value = getattr(self._node, name)
+        if isinstance(value, types.SimpleNamespace):
+            value = BoundNamespace(value, self.rest_handler)
+        elif hasattr(value, '_invoke'):
+            value = BoundMethod(value, self.rest_handler)
+        else:
+            return value
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return dir(self._node)
+
+
+class BoundClient(BoundNamespace):
+    """ A client sharing the model of a ClientBuilder, calling through another RestHandler. See ClientBuilder.bind
+        The ClientBuilder is `_node`, for the tools which read the model rather than call the API
+    """
+
+    def bind(self, rest_handler):
+        return BoundClient(self._node, rest_handler)
+
+
+class BoundMethod():
+    # a generated method called through another RestHandler; its attributes, the docs too, are those of the method
+    __slots__ = ('method', 'rest_handler')
+
+    def __init__(self, method, rest_handler):
+        self.method = method
+        self.rest_handler = rest_handler
+
+    def __call__(self, *args, **kwds):
+        return self.method._invoke(self.rest_handler, args, kwds)
+
+    def __getattr__(self, name):
+        return getattr(self.method, name)
+
+    @property
+    def __doc__(self):
+        return self.method.__doc__
+
+    def __repr__(self):
+        return '<bound method %s of %r>' % (self.method.__name__, self.rest_handler)
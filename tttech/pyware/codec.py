@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    codec.py: JSON encoding and decoding of REST payloads, with orjson or ujson when they are installed
+"""
+
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+from .payload import DictPayLoad, create_lazy_payload
+
+
+class JsonCodec():
+    """ The standard library codec.
+
+        `loads_payload` decodes the body bytes (no str copy of the body) and builds the payload objects
+        in the same pass: the object hook wraps every JSON object as soon as it is decoded.
+    """
+    name = 'json'
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def loads_payload(self, data):
+        return json.loads(data, object_hook=DictPayLoad.from_decoded)
+
+    def loads_lazy_payload(self, data):
+        """ Decode plainly, with the fastest library, and convert on access (LazyDictPayLoad) """
+        return create_lazy_payload(self.loads(data))
+
+
+class OrjsonCodec(JsonCodec):
+    """ orjson encodes, and decodes to plain objects, several times faster than the standard library.
+
+        Payloads still come from the hooked standard decoder: wrapping the objects orjson returns
+        takes a second pass which costs more than it saves (benchmarks/bench_codec.py).
+    """
+    name = 'orjson'
+
+    def dumps(self, obj):
+        # whatever the standard library encodes must go: non-str keys are converted alike, ints above 64 bits
+        # and other types orjson refuses are left to it
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    name = 'ujson'
+
+    def dumps(self, obj):
+        try:
+            return ujson.dumps(obj, ensure_ascii=False).encode('utf-8')
+        except (TypeError, OverflowError):
+            return super().dumps(obj)
+
+    def loads(self, data):
+        return ujson.loads(data)
+
+
+CODECS = {'json': JsonCodec}
+if ujson is not None:
+    CODECS['ujson'] = UjsonCodec
+if orjson is not None:
+    CODECS['orjson'] = OrjsonCodec
+
+
+def get_codec(name=None):
+    """ Return the codec called `name`, or the fastest one installed: orjson, ujson, then the standard library """
+    if name is None:
+        name = next(codec for codec in ('orjson', 'ujson', 'json') if codec in CODECS)
+    if name not in CODECS:
+        raise ValueError('JSON codec %s is not available, choose from: %s' % (name, ', '.join(CODECS)))
+    return CODECS[name]()
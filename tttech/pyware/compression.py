@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    compression.py: Compression of request bodies and Accept-Encoding negotiation
+"""
+
+import zlib
+import gzip
+import threading
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+from urllib3.util.request import ACCEPT_ENCODING
+
+
+# encodings of request bodies, with their default level
+COMPRESSORS = {
+    'gzip': (lambda data, level: gzip.compress(data, compresslevel=level, mtime=0), 6),
+    'deflate': (lambda data, level: zlib.compress(data, level), 6),
+}
+if zstandard is not None:
+    COMPRESSORS['zstd'] = (lambda data, level: zstandard.ZstdCompressor(level=level).compress(data), 3)
+if brotli is not None:
+    COMPRESSORS['br'] = (lambda data, level: brotli.compress(data, quality=level), 5)
+
+# the encodings urllib3 can decode in this installation, it decides by the libraries installed
+DECODABLE_ENCODINGS = [encoding.strip() for encoding in ACCEPT_ENCODING.split(',')]
+
+
+def accept_encoding(preferences=('zstd', 'br', 'gzip', 'deflate')):
+    """ Return the Accept-Encoding header for the preferred encodings which can be decoded here """
+    return ', '.join(encoding for encoding in preferences if encoding in DECODABLE_ENCODINGS)
+
+
+class RequestCompression():
+    """ Compress request bodies of at least `min_size` bytes with `encoding` (gzip, deflate, or zstd/br if installed).
+
+        Compression is negotiated per endpoint: an endpoint which refuses a compressed body (HTTP 415, or 400 naming the Content-Encoding)
+        gets its bodies uncompressed from then on.
+    """
+
+    def __init__(self, encoding='gzip', min_size=1024, level=None):
+        if encoding not in COMPRESSORS:
+            raise ValueError('Compression %s is not available, choose from: %s' % (encoding, ', '.join(COMPRESSORS)))
+        self.encoding = encoding
+        self.min_size = min_size
+        self._compress, default_level = COMPRESSORS[encoding]
+        self.level = default_level if level is None else level
+        self._lock = threading.Lock()
+        self._refused = set()
+
+    def compress(self, endpoint, body):
+        """ Return (body, content encoding). The encoding is None if the body is left as it is """
+        if endpoint in self._refused:
+            return body, None
+        # the size is in bytes, as they are sent
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        if len(data) < self.min_size:
+            return body, None
+        return self._compress(data, self.level), self.encoding
+
+    def refuse(self, endpoint):
+        """ The endpoint does not accept compressed bodies """
+        with self._lock:
+            self._refused.add(endpoint)
+
+    def refused(self):
+        return set(self._refused)
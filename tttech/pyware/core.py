@@ -6,8 +6,22 @@ from pkg_resources import get_distribution, parse_version
 from urllib.parse import urlparse
 import warnings
 import functools
-import json
+import copy
 import re
+import time
+import getpass
+import hashlib
+import threading
+from .single_flight import SingleFlight
+from .circuit_breaker import CircuitOpenError
+from .cassette import CassetteMiss
+from .multipart import MultipartEncoder
+from .compression import accept_encoding as build_accept_encoding
+from .codec import get_codec
+from .instrumentation import BodyLog
+from .metrics import Metrics
+from .timing import PhaseTimer, TimingAdapter, use_timer, current_timer, stop_timer
+from .interceptors import Request, compile_chain
 
 class RestHandler():
     """ Initiate the requests client that supports basic and Kerberos authentication
@@ -19,6 +33,20 @@ class RestHandler():
             user='',
             password='',
             default_request_headers={},
+            response_cache=None,
+            respect_cache_control=False,
+            single_flight=False,
+            rate_limiter=None,
+            circuit_breaker=None,
+            request_compression=None,
+            accept_encoding=('zstd', 'br', 'gzip', 'deflate'),
+            json_codec=None,
+            lazy_payloads=False,
+            records=False,
+            body_log=None,
+            metrics=None,
+            phase_timing=False,
+            interceptors=None,
     ):
         self.logger = logging.getLogger(__name__)
         self.base_url = base_url.strip('/')
@@ -26,10 +54,10 @@ class RestHandler():
             self.base_url='https://' + self.base_url.strip('/')
         # create a request session with proper authentication
         if user and password:
-            self.logger.info(type(self).__name__ + ' authenticates via username and password for: %s' % user)
+            self.logger.info('%s authenticates via username and password for: %s', type(self).__name__, user)
             self.auth = user, password
         else:
-            self.logger.info(type(self).__name__ + ' authenticates via Kerberos')
+            self.logger.info('%s authenticates via Kerberos', type(self).__name__)
             if parse_version(get_distribution('requests_kerberos').version) < parse_version('0.9.0'):
                 hostname_override = None
             else:
@@ -48,7 +76,58 @@ class RestHandler():
             raise TypeError('default_request_headers must be a dict')
         self._requests_session = requests.Session()
         self._requests_session.auth = self.auth        
-        self.stats = {'requests': 0, 'requests_ok': 0, 'requests_failed': 0}
+        # headers are given per request (see request_headers), the shared session stays untouched by concurrent calls.
+        # Only the compressed encodings we prefer and can decode (zstd and br need their libraries) are set once here.
+        self._requests_session.headers = {}
+        if accept_encoding and build_accept_encoding(accept_encoding):
+            self._requests_session.headers['Accept-Encoding'] = build_accept_encoding(accept_encoding)
+        self.stats = {
+            'requests': 0, 'requests_ok': 0, 'requests_failed': 0,
+            'cache_hits': 0, 'cache_invalidations': 0, 'requests_coalesced': 0,
+            'rate_limit_waits': 0, 'rate_limit_wait_time': 0.0,
+            'circuit_rejections': 0, 'circuit_breakers': {},
+            'retries': 0,
+            'request_bytes': 0, 'request_bytes_sent': 0, 'compress_time': 0.0,
+            'response_bytes': 0, 'response_bytes_received': 0,
+            'phase_time': {},
+        }
+
+        # optional store of GET responses, e.g. a SqliteResponseCache shared by all workers of a host
+        self.response_cache = response_cache
+        # JIRA marks every response no-store: Cache-Control is obeyed only on demand
+        self.respect_cache_control = respect_cache_control
+        # who is authenticated: part of the cache key, a response for one user is never served to another
+        self._principal = self._auth_principal()
+        # identical GET calls in flight at the same time wait for the first one and share its result
+        self.single_flight = SingleFlight() if single_flight else None
+        # client-side rate limits (RateLimiter), may be shared with other handlers of the same host
+        self.rate_limiter = rate_limiter
+        self._host = urlparse(self.base_url).hostname
+        # fail fast on endpoints which keep failing (CircuitBreaker), state changes are kept in the stats
+        self.circuit_breaker = circuit_breaker
+        if circuit_breaker is not None:
+            circuit_breaker.add_listener(self._on_circuit_change)
+        # compression of large request bodies (RequestCompression), negotiated per endpoint
+        self.request_compression = request_compression
+        # JSON codec of request and response bodies: a codec name ('orjson', 'ujson', 'json') or object, the fastest installed by default
+        self.json_codec = json_codec if hasattr(json_codec, 'loads_payload') else get_codec(json_codec)
+        # responses as LazyDictPayLoad, which converts nested objects on access
+        self.lazy_payloads = lazy_payloads
+        # responses as records with __slots__, made from the response schema in the WADL or inferred from responses
+        self.records = records
+        # logging of response bodies (BodyLog): at debug level, sampled and truncated
+        self.body_log = body_log or BodyLog()
+        # latency histograms and counters per method: True or a Metrics
+        self.metrics = Metrics() if metrics is True else metrics or None
+        # time per phase of each call, on the responses (`response.phases`), `last_phases()` and in the stats and metrics
+        self.phase_timing = phase_timing
+        self._last_call = threading.local()
+        if phase_timing:
+            for prefix in ('http://', 'https://'):
+                self._requests_session.mount(prefix, TimingAdapter())
+        # stages around sending each request (see interceptors.py), compiled once into the function which sends
+        self.interceptors = list(interceptors or ())
+        self._send = compile_chain(self.interceptors, self._transport)
 
     def _get_hostname(self, url):
         hostname = urlparse(url).hostname if url.startswith("http://") or url.startswith("https://") else url
@@ -65,52 +144,311 @@ class RestHandler():
     
 
     def requester(self, headers=None):
+        """ Return the session to send requests with. Headers are merged per request by `request_headers`: the session
+            is shared by concurrent calls, `headers` are not set on it any more.
+        """
+        if headers:
+            warnings.warn(
+                'requester(headers) ignores the headers, pass them to do_request or merge them with request_headers',
+                DeprecationWarning, stacklevel=2,
+            )
+        return self._requests_session
+
+    def request_headers(self, headers=None):
         """ Support custom header for the REST request """
-        self._requests_session.headers = self._default_request_headers
+        request_headers = dict(self._default_request_headers)
         if headers:
             if not isinstance(headers, dict):
                 raise TypeError('Request header must be a dict')
-            self._requests_session.headers.update(headers)
+            request_headers.update(headers)
             # after update, remove all the empty header value
-            self._requests_session.headers = {k: v for k, v in self._requests_session.headers.items() if v is not None}
-        self.logger.debug("Header will be used: %s " % self._requests_session.headers)
-        return self._requests_session
+            request_headers = {k: v for k, v in request_headers.items() if v is not None}
+        self.logger.debug("Header will be used: %s ", request_headers)
+        return request_headers
 
+    def coalesce(self, key, fn):
+        """ Call `fn`, unless an identical call (same key) is in flight: then wait for it and share its result.
+            The followers get a shallow copy of the result, not the object returned to the first caller.
+        """
+        if self.single_flight is None:
+            return fn()
+        result, shared = self.single_flight.do(key, fn)
+        if shared:
+            self.stats['requests_coalesced'] += 1
+            result = copy.copy(result)
+        return result
 
-    def do_request(self, url, mtype="GET", headers=None, data_dict=None, cookies=None, files=None, timeout=None):
-        """ Send request to the API """
-        myurl = "/".join(x.strip('/') for x in [self.base_url, url]).lstrip("/")
+
+    def do_request(self, url, mtype="GET", headers=None, data_dict=None, cookies=None, files=None, timeout=None, resource_path=None, invalidates=None, stream=False, method_name=None):
+        """ Send request to the API
+
+            `method_name` and `resource_path` tell the generated method which makes the request, for the metrics.
+            `invalidates` lists the cached responses this request makes stale, as (resource paths, URL, subtree) tuples.
+            With `stream`, the body is not read: the caller consumes it (e.g. `response.iter_content()`) and closes the response.
+        """
+        timer = None
+        if self.phase_timing:
+            # a generated method times the call from its start, a direct call from here
+            timer = current_timer()
+            if timer is None:
+                timer = PhaseTimer()
+                use_timer(timer)
+                try:
+                    return self.do_request(url, mtype, headers, data_dict, cookies, files, timeout, resource_path, invalidates, stream, method_name)
+                finally:
+                    self.finish_timing(method_name, mtype, resource_path or url)
+            timer.lap('build')
+        myurl = self._full_url(url)
         self.stats['requests'] += 1
 
+        # serve GET from the response cache if possible
+        cache_key = None
+        if mtype == 'GET' and self.response_cache is not None and not stream:
+            cache_key = self._cache_key(mtype, myurl, headers)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self.logger.info("\nCached response: %s %s", mtype, myurl)
+                self.stats['cache_hits'] += 1
+                self.stats['requests_ok'] += 1
+                response = self._cached_response(myurl, *cached)
+                if timer is not None:
+                    response.phases = timer.phases
+                return response
+
         self.logger.info("\nDoing request  : %s %s", mtype, myurl)
 
         # convert data into JSON if it is a dictionary, otherwise binary.
         # Note: header can be incorrect. User must set the header manually
-        if data_dict and isinstance(data_dict, dict):
-            post_data = json.dumps(data_dict)
+        if files:
+            # multipart body produced while it is sent: files are read chunk by chunk, a dictionary becomes form fields
+            post_data = MultipartEncoder(files, fields=data_dict if isinstance(data_dict, dict) else None)
+            files = None
+            headers = dict(headers or {}, **{'Content-Type': post_data.content_type})
+        elif data_dict and isinstance(data_dict, dict):
+            post_data = self.json_codec.dumps(data_dict)
         else:
+            # bytes are sent as they are. File objects and mmaps are read block by block while they are sent,
+            # generators and other iterables of bytes go out with chunked transfer encoding
             post_data = data_dict
+        if timer is not None:
+            timer.lap('encode')
+
+        # wait for the rate limit rather than sending a request the server would refuse
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire(self._host, mtype, resource_path or url)
+            if waited:
+                self.stats['rate_limit_waits'] += 1
+                self.stats['rate_limit_wait_time'] += waited
+
+        if timer is not None:
+            timer.lap('throttle')
+
+        # compress large bodies, unless the endpoint refused compressed bodies before
+        content_encoding = None
+        raw_data = post_data
+        if self.request_compression is not None and isinstance(post_data, (bytes, str)) and post_data:
+            started = time.perf_counter()
+            post_data, content_encoding = self.request_compression.compress((mtype, resource_path or url), raw_data)
+            if content_encoding:
+                self.stats['compress_time'] += time.perf_counter() - started
+                headers = dict(headers or {}, **{'Content-Encoding': content_encoding})
+        bytes_sent = 0
+        if isinstance(post_data, (bytes, str)):
+            bytes_sent = len(post_data)
+            self.stats['request_bytes'] += len(raw_data)
+            self.stats['request_bytes_sent'] += bytes_sent
+        elif isinstance(post_data, MultipartEncoder) and post_data.len is not None:
+            bytes_sent = post_data.len
+
+        if timer is not None:
+            timer.lap('compress')
+            sending = timer.send_time()
+
+        # refuse at once when the endpoint is known to be failing. Taken last before sending: a call admitted
+        # (possibly the one trial call of a half-open circuit) is recorded, or released if it fails before the server answers
+        circuit = None
+        if self.circuit_breaker is not None:
+            try:
+                circuit = self.circuit_breaker.allow(mtype, resource_path or url)
+            except CircuitOpenError:
+                self.stats['circuit_rejections'] += 1
+                self.stats['requests_failed'] += 1
+                raise
 
         # send request
-        requester = self.requester(headers)
-        if mtype == 'GET':
-            response = requester.get(myurl, cookies=cookies, timeout=timeout)
-        elif mtype == 'POST':
-            response = requester.post(myurl, data=post_data, cookies=cookies, files=files, timeout=timeout)
-        elif mtype == 'PUT':
-            response = requester.put(myurl, data=post_data, cookies=cookies, files=files, timeout=timeout)
-        elif mtype == 'DELETE':
-            response = requester.delete(myurl, cookies=cookies, timeout=timeout)
-        else:
-            raise Exception("Method %s is not supported yet." % mtype)
+        metrics = None
+        if self.metrics is not None:
+            metrics = self.metrics.method(method_name, mtype, resource_path or url)
+            metrics.begin()
+        retries = 0
+        started = time.monotonic()
+        try:
+            response = self._send(Request(mtype, myurl, headers, post_data, cookies, files, timeout, stream, resource_path or url, method_name))
+            if content_encoding and self._refused_encoding(response):
+                # the endpoint does not take compressed bodies: remember that and send it again as it is
+                self.logger.info('%s %s refused a %s body, sending it uncompressed', mtype, myurl, content_encoding)
+                self.request_compression.refuse((mtype, resource_path or url))
+                # give the connection of a streamed response back to the pool
+                response.close()
+                self.stats['retries'] += 1
+                retries += 1
+                headers = {k: v for k, v in headers.items() if k != 'Content-Encoding'}
+                response = self._send(Request(mtype, myurl, headers, raw_data, cookies, files, timeout, stream, resource_path or url, method_name))
+                bytes_sent += len(raw_data)
+        except BaseException as e:
+            if circuit is not None:
+                if isinstance(e, requests.RequestException) and not isinstance(e, CassetteMiss):
+                    self.circuit_breaker.record(circuit, False, time.monotonic() - started)
+                else:
+                    # not a failure of the endpoint, e.g. raised by an interceptor or a request missing from the cassette:
+                    # its admission is given back
+                    self.circuit_breaker.release(circuit)
+            # whatever it was, the call begun in the metrics ends without a response
+            if metrics is not None:
+                metrics.end('error', time.monotonic() - started, bytes_sent, 0, retries)
+            self.stats['requests_failed'] += 1
+            raise
+        if timer is not None:
+            # the body download and the work of requests, besides the phases measured while sending
+            timer.lap('transfer')
+            timer.add('transfer', sending - timer.send_time())
+            response.phases = timer.phases
+        if circuit is not None:
+            self.circuit_breaker.record(circuit, response.status_code < 500, time.monotonic() - started)
+        bytes_received = 0 if stream else self._count_response_bytes(response)
+        if metrics is not None:
+            metrics.end(response.status_code, time.monotonic() - started, bytes_sent, bytes_received, retries)
         self.logger.info('HTTP Code: %d', response.status_code)
+        if response.status_code == 429 and self.rate_limiter is not None:
+            self.rate_limiter.pause(self._host, self._retry_after(response))
         # log error message in case of failed
         if not response.ok:
-            self.logger.error(response.text)
+            self.body_log.log(self.logger, logging.ERROR, response, sample=False)
             self.stats['requests_failed'] += 1
         else:
             self.stats['requests_ok'] += 1
+            if cache_key is not None and response.status_code == 200 and self._storable(response):
+                self.response_cache.set(cache_key, myurl, response.status_code, response.headers, response.content, resource=resource_path)
+        # a write, even a failed one, may have changed cached resources
+        if invalidates and self.response_cache is not None:
+            for resources, path, subtree in invalidates:
+                self.response_cache.invalidate(resources, self._full_url(path), subtree=subtree)
+                self.stats['cache_invalidations'] += 1
         # return data for the callee
         return response
 
+    def _transport(self, request):
+        """ The end of the interceptor chain: send the request with the session """
+        requester = self.requester()
+        mtype, url, data, cookies, files, timeout, stream = (
+            request.method, request.url, request.data, request.cookies, request.files, request.timeout, request.stream
+        )
+        timer = current_timer() if self.phase_timing else None
+        if timer is not None:
+            with timer.phase('headers'):
+                headers = self.request_headers(request.headers)
+        else:
+            headers = self.request_headers(request.headers)
+        if mtype == 'GET':
+            return requester.get(url, headers=headers, cookies=cookies, timeout=timeout, stream=stream)
+        elif mtype == 'POST':
+            return requester.post(url, headers=headers, data=data, cookies=cookies, files=files, timeout=timeout, stream=stream)
+        elif mtype == 'PUT':
+            return requester.put(url, headers=headers, data=data, cookies=cookies, files=files, timeout=timeout, stream=stream)
+        elif mtype == 'DELETE':
+            return requester.delete(url, headers=headers, cookies=cookies, timeout=timeout, stream=stream)
+        else:
+            raise Exception("Method %s is not supported yet." % mtype)
+
+    def finish_timing(self, method_name, mtype, resource_path):
+        """ The call timed in this thread is done: keep its phases for `last_phases()`, add them to the stats and metrics """
+        phases = stop_timer()
+        if phases is None:
+            return
+        self._last_call.phases = phases
+        phase_time = self.stats['phase_time']
+        for phase, seconds in phases.items():
+            phase_time[phase] = phase_time.get(phase, 0.0) + seconds
+        if self.metrics is not None:
+            self.metrics.method(method_name, mtype, resource_path).record_phases(phases)
+
+    def last_phases(self):
+        """ Return the seconds per phase of the last call made by this thread, None if phase timing is off """
+        return getattr(self._last_call, 'phases', None)
+
+    def _count_response_bytes(self, response):
+        """ Count the decoded body and, for a compressed response, the bytes which came over the wire """
+        self.stats['response_bytes'] += len(response.content)
+        received = len(response.content)
+        if response.headers.get('Content-Encoding') and hasattr(response.raw, 'tell'):
+            try:
+                received = response.raw.tell()
+            except (OSError, ValueError):
+                pass
+        self.stats['response_bytes_received'] += received
+        return received
+
+    def _on_circuit_change(self, key, old_state, new_state):
+        self.stats['circuit_breakers']['%s %s' % key] = new_state
+
+    @staticmethod
+    def _refused_encoding(response):
+        """ A compressed body was refused: 415, or 400 naming the Content-Encoding. Other 400s are errors of the request """
+        if response.status_code == 415:
+            return True
+        if response.status_code != 400:
+            return False
+        text = response.text.lower()
+        return 'content-encoding' in text or 'content encoding' in text
+
+    @staticmethod
+    def _retry_after(response, default=1.0):
+        """ Seconds to back off after a 429, from the Retry-After header if it has a number of seconds """
+        try:
+            return float(response.headers.get('Retry-After', default))
+        except ValueError:
+            return default
+
+    def _full_url(self, url):
+        return "/".join(x.strip('/') for x in [self.base_url, url]).lstrip("/")
+
+    def _auth_principal(self):
+        if isinstance(self.auth, tuple):
+            return 'basic:%s' % self.auth[0]
+        # Kerberos authenticates with the tickets of the user running the process
+        try:
+            return 'kerberos:%s' % getpass.getuser()
+        except Exception:
+            return 'kerberos'
+
+    def _cache_key(self, mtype, url, headers=None):
+        """ Responses differ by the content type asked for and by who asks: Accept and the authenticated user, or a
+            digest of the Authorization header given with the request, are part of the key
+        """
+        merged = dict(self._default_request_headers, **(headers or {}))
+        accept = merged.get('Accept') or ''
+        principal = self._principal
+        if merged.get('Authorization'):
+            principal = 'token:%s' % hashlib.sha256(merged['Authorization'].encode('utf-8')).hexdigest()[:32]
+        return '%s %s %s %s' % (mtype, url, accept, principal)
+
+    def _storable(self, response):
+        """ With `respect_cache_control`, responses marked private or no-store are not kept. Entries are per user anyway """
+        if not self.respect_cache_control:
+            return True
+        directives = {d.strip().split('=', 1)[0].lower() for d in response.headers.get('Cache-Control', '').split(',')}
+        return not directives & {'private', 'no-store'}
+
+    @staticmethod
+    def _cached_response(url, status, headers, body):
+        """ Rebuild a `requests` response from a cache entry """
+        response = requests.Response()
+        response.status_code = status
+        response.headers = requests.structures.CaseInsensitiveDict(headers)
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        response.url = url
+        response.from_cache = True
+        return response
+
 
@@ -10,7 +10,9 @@ import argparse
 import logging.handlers
 import datetime
 from textwrap import wrap
-from tttech.pyware.client_builder import ClientBuilder
+from tttech.pyware.client_builder import ClientBuilder, BoundClient
+from tttech.pyware.core import RestHandler
+from tttech.pyware import bench
 import webbrowser
 import http.server as BaseHTTPServer
 
@@ -182,8 +184,9 @@ def cmd_parsing(extractor_cls=MethodInfoExtractor, wadl=None, service_name='Serv
     parser.add_argument('-u', metavar='USER', action='store', type=str, help='Username for API - Keep empty to use Kerberos')
     parser.add_argument('-p', metavar='PASSWORD', action='store', type=str, help='Password for API - Keep empty to use Kerberos')
     parser.add_argument('-f', metavar='WADL_LOCATION', help="WADL file or URL of the service", action='store')
+    parser.add_argument('-b', metavar='BASE_URL', help="Base URL of the service, for the bench command", action='store')
 
-    parser.add_argument("command", help="Command to execute", action='store', choices=['interact', 'list', 'find', 'tree', 'help', 'web'])
+    parser.add_argument("command", help="Command to execute", action='store', choices=['interact', 'list', 'find', 'tree', 'help', 'web', 'bench'])
     parser.add_argument('others', help="Parameters for command", nargs=argparse.REMAINDER)
 
     args = parser.parse_args()
@@ -197,7 +200,9 @@ def cmd_parsing(extractor_cls=MethodInfoExtractor, wadl=None, service_name='Serv
         logger.setLevel(logging.INFO)
         wadl = ClientBuilder(wadl_file=args.f)
 
-    method_list = wadl._func.__dict__.values()
+    # the names are those of the model; a bound client gives its methods, which call through its RestHandler
+    model = wadl._node if isinstance(wadl, BoundClient) else wadl
+    method_list = [getattr(wadl._func, name) for name in model._func.__dict__]
 
     # Commandline mode
     if args.command == 'list':
@@ -238,6 +243,12 @@ def cmd_parsing(extractor_cls=MethodInfoExtractor, wadl=None, service_name='Serv
             html = html.replace('PYWARE_MAIN_HTML_CONTENT', '\n'.join(main_html)).replace('PYWARE_TABLE_OF_CONTENT', '\n'.join(table_of_content))
             Helper.load_in_default_browser(html.encode('utf-8'))
 
+    elif args.command == 'bench':
+        # the same RestHandler as the services, so that the numbers include the work of pyware
+        if not isinstance(wadl, BoundClient) and wadl._wadl.rest_handler is None:
+            wadl._wadl.rest_handler = RestHandler(base_url=args.b or default_based_url, user=args.u, password=args.p)
+        bench.main(wadl, args.others)
+
     # Interactive mode
     if args.command == 'interact':
         import rlcompleter  # for auto-complete
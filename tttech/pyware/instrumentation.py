@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    instrumentation.py: Logging which costs nothing unless it is enabled
+"""
+
+import random
+import logging
+
+
+class Truncated():
+    """ The body of a response, decoded and cut to `max_bytes` only when the log record is formatted """
+    __slots__ = ('response', 'max_bytes')
+
+    def __init__(self, response, max_bytes):
+        self.response = response
+        self.max_bytes = max_bytes
+
+    def __str__(self):
+        body = self.response.content or b''
+        text = body[:self.max_bytes].decode(self.response.encoding or 'utf-8', errors='replace')
+        if len(body) > self.max_bytes:
+            text += '... (%d bytes)' % len(body)
+        return text
+
+
+class BodyLog():
+    """ Logging of response bodies: only when the logger is enabled for the level, for a `sample_rate` share
+        of the responses, at most `max_bytes` of each
+    """
+
+    def __init__(self, max_bytes=2048, sample_rate=1.0):
+        self.max_bytes = max_bytes
+        self.sample_rate = sample_rate
+
+    def log(self, logger, level, response, sample=True):
+        if not logger.isEnabledFor(level):
+            return
+        if sample and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        logger.log(level, 'Response %d %s: %s', response.status_code, response.url, Truncated(response, self.max_bytes))
+
+
+def enable_logging(level=logging.DEBUG, fmt='%(message)s'):
+    """ Print the log of pyware at `level` to stderr. The library itself leaves the logging configuration to the application """
+    logger = logging.getLogger('tttech.pyware')
+    logger.setLevel(level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(fmt))
+        logger.addHandler(handler)
+    return logger
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    interceptors.py: Stages around sending a request, each wrapping the next, compiled into one call path
+"""
+
+
+class Request():
+    """ A request on its way through the interceptors. Stages may change it or send a copy (`replace`) """
+    __slots__ = ('method', 'url', 'headers', 'data', 'cookies', 'files', 'timeout', 'stream', 'resource_path', 'method_name')
+
+    def __init__(self, method, url, headers=None, data=None, cookies=None, files=None, timeout=None, stream=False, resource_path=None, method_name=None):
+        self.method = method
+        self.url = url
+        # a copy: the caller's headers stay as they are whatever the stages do
+        self.headers = dict(headers) if headers else {}
+        self.data = data
+        self.cookies = cookies
+        self.files = files
+        self.timeout = timeout
+        self.stream = stream
+        # the resource template (e.g. 'api/2/issue/{issueIdOrKey}') and the generated method making the request
+        self.resource_path = resource_path
+        self.method_name = method_name
+
+    def replace(self, **changes):
+        request = Request.__new__(Request)
+        for name in self.__slots__:
+            setattr(request, name, changes[name] if name in changes else getattr(self, name))
+        return request
+
+    def __repr__(self):
+        return '<Request %s %s>' % (self.method, self.url)
+
+
+def compile_chain(interceptors, send):
+    """ Return the function sending a Request through `interceptors`, the first one outermost, then `send`.
+
+        An interceptor is called once, here, as `interceptor(next)` where `next(request)` sends the request on and returns
+        the response; it returns the function which takes its place, or None to stay out of the chain (a disabled stage).
+        Without interceptors this is `send` itself, a call goes through nothing else.
+    """
+    call = send
+    for interceptor in reversed(list(interceptors or ())):
+        wrapped = interceptor(call)
+        if wrapped is not None:
+            call = wrapped
+    return call
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    json_stream.py: Decode the elements of a JSON array while the response arrives, one at a time
+"""
+
+import re
+import json
+import codecs
+from .payload import DictPayLoad
+
+WHITESPACE = ' \t\n\r'
+NUMBER = '-0123456789'
+NUMBER_CHARS = '.eE+-0123456789'
+# skipping: a whole string, a bracket, or the quote of a string which goes on in the next chunk. What ends the rest
+# of a string, what ends a number, true, false or null
+TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}"]')
+STRING_END = re.compile(r'["\\]')
+SCALAR_END = re.compile(r'[\s,\]}]')
+PLAIN = json.JSONDecoder()
+
+
+class _Text():
+    """ The decoded part of a byte stream which is not consumed yet """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.pos = 0
+        self.start = 0
+        self.done = False
+
+    def more(self):
+        """ Read the next chunk, False at the end of the stream """
+        if self.done:
+            return False
+        # drop what is consumed, what is kept is at most one element
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.text += text
+                return True
+        self.text += self._decoder.decode(b'', final=True)
+        self.done = True
+        return False
+
+    def peek(self):
+        """ Return the next character which is not whitespace, '' at the end """
+        while True:
+            text, pos = self.text, self.pos
+            while pos < len(text) and text[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < len(text):
+                return text[pos]
+            if not self.more():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if char not in chars or not char:
+            raise json.JSONDecodeError('Expecting one of %r' % chars, self.text, self.pos)
+        self.pos += 1
+        return char
+
+    def value(self, decoder):
+        """ Decode the next JSON value, reading on while it is incomplete """
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.more():
+                    continue
+                raise
+            # a number at the end of the text, or cut after its '.', 'e' or sign, may go on in the next chunk
+            if not self.done and self.text[self.pos] in NUMBER and (end == len(self.text) or self.text[end] in NUMBER_CHARS) and self.more():
+                continue
+            self.start, self.pos = self.pos, end
+            return value
+
+    def raw_value(self):
+        """ Return the JSON text of the next value, reading on while it is incomplete """
+        self.value(PLAIN)
+        return self.text[self.start:self.pos]
+
+    def skip(self):
+        """ Pass the next JSON value without decoding it: its text is dropped while it is scanned """
+        first = self.peek()
+        if not first:
+            raise json.JSONDecodeError('Expecting value', self.text, self.pos)
+        scalar = first not in '"[{'
+        depth = 0
+        in_string = False
+        while True:
+            text, pos = self.text, self.pos
+            if scalar:
+                match = SCALAR_END.search(text, pos)
+                if match is not None:
+                    self.pos = match.start()
+                    return
+                pos = len(text)
+            while pos < len(text):
+                if in_string:
+                    match = STRING_END.search(text, pos)
+                    if match is None:
+                        pos = len(text)
+                    elif match.group() == '"':
+                        pos = match.end()
+                        in_string = False
+                        if not depth:
+                            self.pos = pos
+                            return
+                    elif match.end() < len(text):
+                        pos = match.end() + 1
+                    else:
+                        # the escaped character is in the next chunk
+                        break
+                    continue
+                match = TOKEN.search(text, pos)
+                if match is None:
+                    pos = len(text)
+                    break
+                pos = match.end()
+                token = match.group()
+                if token == '"':
+                    # a string which goes on in the next chunk
+                    in_string = True
+                elif token in '[{':
+                    depth += 1
+                elif token in ']}':
+                    depth -= 1
+                if not depth and not in_string:
+                    self.pos = pos
+                    return
+            self.pos = pos
+            if not self.more():
+                if scalar and not in_string:
+                    self.pos = len(self.text)
+                    return
+                raise json.JSONDecodeError('Unterminated value', self.text, self.pos)
+
+
+def iter_json_items(chunks, path=None, loads=None):
+    """ Yield the elements of the JSON array at `path` of the JSON document in the byte chunks `chunks`, as they arrive.
+
+        `path` names the array by the keys of the objects around it, e.g. 'issues' or 'data.values';
+        None for a document which is an array. Other fields are scanned, not decoded, nothing is yielded if the path does
+        not exist. Only one element is held in memory. `loads` decodes the JSON text of an element, e.g. with the codec
+        of a handler; by default the elements are decoded into payload objects while they are found.
+    """
+    text = _Text(chunks)
+    decoder = json.JSONDecoder(object_hook=DictPayLoad.from_decoded)
+    for key in path.split('.') if path else []:
+        text.expect('{')
+        while True:
+            if text.peek() == '}':
+                return
+            name = text.value(PLAIN)
+            text.expect(':')
+            if name == key:
+                break
+            text.skip()
+            if text.expect(',}') == '}':
+                return
+    if text.peek() != '[':
+        return
+    text.pos += 1
+    if text.peek() == ']':
+        return
+    while True:
+        yield text.value(decoder) if loads is None else loads(text.raw_value())
+        if text.expect(',]') == ']':
+            return
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    metrics.py: Latency histograms and throughput counters per method, exported as a dict or in the Prometheus text format
+"""
+
+import threading
+from array import array
+
+
+class Histogram():
+    """ Latency histogram of fixed size, in the manner of HDR histograms: log-linear buckets of microseconds.
+
+        Each power of two is split into 2 ** (sub_bucket_bits - 1) buckets, which bounds the relative error of the
+        percentiles to 2 ** (1 - sub_bucket_bits) (1.6% with 6 bits). Values above `max_seconds` count as `max_seconds`.
+    """
+
+    def __init__(self, sub_bucket_bits=6, max_seconds=3600.0):
+        self._bits = sub_bucket_bits
+        self._half = 1 << (sub_bucket_bits - 1)
+        self._max_value = int(max_seconds * 1e6)
+        self.counts = array('Q', bytes(8 * (self._index(self._max_value) + 1)))
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, value):
+        if value < (1 << self._bits):
+            return value
+        shift = value.bit_length() - self._bits
+        return (1 << self._bits) + (shift - 1) * self._half + (value >> shift) - self._half
+
+    def _value(self, index):
+        """ The middle of the values counted in a bucket, in microseconds """
+        if index < (1 << self._bits):
+            return index
+        shift, top = divmod(index - (1 << self._bits), self._half)
+        shift += 1
+        top += self._half
+        return ((top << shift) + ((top + 1) << shift) - 1) / 2
+
+    def record(self, seconds):
+        self.counts[self._index(min(max(int(seconds * 1e6), 0), self._max_value))] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, percent):
+        """ Return the latency in seconds below which `percent` of the calls are, 0.0 if there are none """
+        if not self.count:
+            return 0.0
+        rank = max(1, int(round(percent / 100.0 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self._value(index) / 1e6, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count, 'sum': self.sum, 'max': self.max,
+            'p50': self.percentile(50), 'p95': self.percentile(95), 'p99': self.percentile(99),
+        }
+
+
+class MethodMetrics():
+    """ Counters and latency histograms, overall and per HTTP status, of one method """
+
+    def __init__(self, name, mtype, resource_path, sub_bucket_bits, max_seconds):
+        self.name = name
+        self.mtype = mtype
+        self.resource_path = resource_path
+        self._histogram_args = sub_bucket_bits, max_seconds
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.in_flight = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.latency = Histogram(*self._histogram_args)
+        self.statuses = {}
+        self.phases = {}
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self, status, seconds, bytes_sent=0, bytes_received=0, retries=0):
+        """ A call is done. `status` is the HTTP status code, or 'error' if no response came """
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.retries += retries
+            self.bytes_sent += bytes_sent
+            self.bytes_received += bytes_received
+            if status == 'error' or status >= 400:
+                self.errors += 1
+            self.latency.record(seconds)
+            histogram = self.statuses.get(status)
+            if histogram is None:
+                histogram = self.statuses[status] = Histogram(*self._histogram_args)
+            histogram.record(seconds)
+
+    def record_phases(self, phases):
+        """ Add the seconds per phase of a timed call (see timing.py) """
+        with self._lock:
+            for phase, seconds in phases.items():
+                histogram = self.phases.get(phase)
+                if histogram is None:
+                    histogram = self.phases[phase] = Histogram(*self._histogram_args)
+                histogram.record(seconds)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'method': self.mtype, 'resource_path': self.resource_path,
+                'requests': self.requests, 'errors': self.errors, 'retries': self.retries, 'in_flight': self.in_flight,
+                'bytes_sent': self.bytes_sent, 'bytes_received': self.bytes_received,
+                'latency': self.latency.to_dict(),
+                'statuses': {status: histogram.to_dict() for status, histogram in self.statuses.items()},
+                'phases': {phase: histogram.to_dict() for phase, histogram in self.phases.items()},
+            }
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metrics():
+    """ Metrics of the calls of a RestHandler, keyed by the flat method name and the resource path """
+
+    def __init__(self, sub_bucket_bits=6, max_seconds=3600.0):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.max_seconds = max_seconds
+        self._methods = {}
+        self._lock = threading.Lock()
+
+    def method(self, name, mtype, resource_path):
+        """ Return the metrics of a method, `name` is None for requests which are not made by a generated method """
+        key = (name, mtype, resource_path)
+        metrics = self._methods.get(key)
+        if metrics is None:
+            with self._lock:
+                metrics = self._methods.get(key)
+                if metrics is None:
+                    metrics = self._methods[key] = MethodMetrics(name, mtype, resource_path, self.sub_bucket_bits, self.max_seconds)
+        return metrics
+
+    def methods(self):
+        return list(self._methods.values())
+
+    def to_dict(self):
+        """ Return the metrics by method name, or by 'METHOD resource path' for requests without one """
+        return {metrics.name or '%s %s' % (metrics.mtype, metrics.resource_path): metrics.to_dict() for metrics in self.methods()}
+
+    def prometheus(self, prefix='pyware'):
+        """ Return the metrics in the Prometheus text exposition format """
+        lines = []
+
+        def family(name, kind, doc):
+            lines.append('# HELP %s_%s %s' % (prefix, name, doc))
+            lines.append('# TYPE %s_%s %s' % (prefix, name, kind))
+
+        exported = [(metrics, metrics.to_dict()) for metrics in self.methods()]
+        labels = {
+            id(metrics): 'name="%s",method="%s",path="%s"' % (_label(metrics.name or ''), _label(metrics.mtype), _label(metrics.resource_path))
+            for metrics, _ in exported
+        }
+        family('request_duration_seconds', 'summary', 'Latency of the requests by method and HTTP status.')
+        for metrics, d in exported:
+            for status, latency in sorted(d['statuses'].items(), key=lambda item: str(item[0])):
+                series = '%s,status="%s"' % (labels[id(metrics)], status)
+                for quantile, key in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99'), ('1', 'max')):
+                    lines.append('%s_request_duration_seconds{%s,quantile="%s"} %r' % (prefix, series, quantile, latency[key]))
+                lines.append('%s_request_duration_seconds_sum{%s} %r' % (prefix, series, latency['sum']))
+                lines.append('%s_request_duration_seconds_count{%s} %d' % (prefix, series, latency['count']))
+        if any(d['phases'] for _, d in exported):
+            family('phase_duration_seconds', 'summary', 'Time per phase of the calls, with phase timing on.')
+            for metrics, d in exported:
+                for phase, latency in d['phases'].items():
+                    series = '%s,phase="%s"' % (labels[id(metrics)], phase)
+                    for quantile, key in (('0.5', 'p50'), ('0.99', 'p99')):
+                        lines.append('%s_phase_duration_seconds{%s,quantile="%s"} %r' % (prefix, series, quantile, latency[key]))
+                    lines.append('%s_phase_duration_seconds_sum{%s} %r' % (prefix, series, latency['sum']))
+                    lines.append('%s_phase_duration_seconds_count{%s} %d' % (prefix, series, latency['count']))
+        for name, key, kind, doc in (
+            ('requests_in_flight', 'in_flight', 'gauge', 'Requests sent and not answered yet.'),
+            ('request_errors_total', 'errors', 'counter', 'Requests answered with an HTTP error or without response.'),
+            ('request_retries_total', 'retries', 'counter', 'Requests sent again.'),
+            ('request_bytes_total', 'bytes_sent', 'counter', 'Bytes of request bodies sent.'),
+            ('response_bytes_total', 'bytes_received', 'counter', 'Bytes of response bodies received.'),
+        ):
+            family(name, kind, doc)
+            for metrics, d in exported:
+                lines.append('%s_%s{%s} %d' % (prefix, name, labels[id(metrics)], d[key]))
+        return '\n'.join(lines) + '\n'
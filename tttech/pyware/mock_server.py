@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    mock_server.py: Local HTTP server answering every method of a WADL, for load tests without the real server
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+from .client_builder import ClientBuilder, BoundClient
+
+# a path segment which is a path parameter, e.g. {issueIdOrKey}
+WILDCARD = '{}'
+
+
+def example_from_schema(schema, definitions=None, depth=0):
+    """ Return a value which fits a JSON Schema: one item per array, every property of an object, no map entries """
+    definitions = schema.get('definitions', definitions or {})
+    if depth > 8:
+        return None
+    ref = schema.get('$ref')
+    if ref is not None:
+        definition = definitions.get(ref.rsplit('/', 1)[-1])
+        return example_from_schema(definition, definitions, depth + 1) if definition is not None else None
+    schema_type = schema.get('type')
+    if schema_type == 'object':
+        return {name: example_from_schema(prop, definitions, depth + 1) for name, prop in (schema.get('properties') or {}).items()}
+    if schema_type == 'array':
+        return [example_from_schema(schema.get('items', {}), definitions, depth + 1)]
+    if schema_type == 'string':
+        return 'http://www.example.com' if schema.get('format') == 'uri' else 'string'
+    if schema_type == 'integer':
+        return 1
+    if schema_type == 'number':
+        return 1.5
+    if schema_type == 'boolean':
+        return True
+    return None
+
+
+class MockResponse():
+    """ The answer of a method: status, content type and body """
+    __slots__ = ('status', 'content_type', 'body')
+
+    def __init__(self, status, content_type, body):
+        self.status = status
+        self.content_type = content_type
+        self.body = body
+
+
+class MockServer():
+    """ Answer every method of a WADL on localhost with the example documented for its successful response, a value made
+        from its JSON Schema when there is no example, or a fixture.
+
+        `wadl_file` is a WADL file, or a ClientBuilder, or a client bound from one, whose model is shared. `fixtures` maps the flat names of the methods
+        (as in `ClientBuilder._func`, e.g. getIssueType_workflowscheme) to the data or the MockResponse to answer with.
+        `latency` is seconds per response or a function returning them, e.g. `lambda: random.lognormvariate(math.log(0.02), 0.5)`.
+        A share `error_rate` of the responses are `error_status` errors. With `payload_size`, JSON arrays repeat their
+        items until the body has that many bytes, other bodies are padded with whitespace.
+    """
+
+    def __init__(
+            self,
+            wadl_file,
+            host='127.0.0.1',
+            port=0,
+            base_path='',
+            fixtures=None,
+            latency=0.0,
+            error_rate=0.0,
+            error_status=503,
+            payload_size=None,
+            seed=None,
+    ):
+        self.logger = logging.getLogger(__name__)
+        self.host = host
+        self.port = port
+        # the client names the methods: the flat names are given by its naming scheme. A bound client serves its model
+        if isinstance(wadl_file, BoundClient):
+            wadl_file = wadl_file._node
+        self.client = wadl_file if isinstance(wadl_file, ClientBuilder) else ClientBuilder(wadl_file)
+        self.wadl = self.client._wadl
+        self.base_path = '/' + base_path.strip('/') if base_path.strip('/') else ''
+        self.fixtures = fixtures or {}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.payload_size = payload_size
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._routes = {}
+        for resource in self.wadl._resources:
+            for method in resource._methods:
+                self._add_route(resource._path_full, method._resttype.upper(), self._response(method))
+        self._server = None
+        self._thread = None
+
+    def _add_route(self, path, verb, response):
+        node = self._routes
+        for segment in path.split('/'):
+            node = node.setdefault(WILDCARD if '{' in segment else segment, {})
+        node.setdefault(None, {})[verb] = response
+
+    def route(self, path):
+        """ Return the MockResponses of the methods of a path by HTTP method, None if no resource of the WADL matches """
+        return _match(self._routes, [segment for segment in path.split('/') if segment], 0)
+
+    def _response(self, method):
+        fixture = self.fixtures.get(method.__name__)
+        if isinstance(fixture, MockResponse):
+            return fixture
+        status, representation = _success(method.__wadl__)
+        if fixture is not None:
+            return MockResponse(status, 'application/json', self._pad(json.dumps(fixture).encode('utf-8')))
+        if representation is None:
+            return MockResponse(status, None, b'')
+        content_type = representation.get_mediaType() or 'application/json'
+        example = self.wadl.documented(representation)[1]
+        schema = self.wadl._response_schema(method.__wadl__)[0]
+        if example is None and schema:
+            try:
+                example = json.dumps(example_from_schema(json.loads(schema) if isinstance(schema, str) else schema))
+            except ValueError:
+                self.logger.warning('Invalid JSON Schema of %s', method.__name__)
+        return MockResponse(status, content_type, self._pad((example or '').encode('utf-8')))
+
+    def _pad(self, body):
+        if not self.payload_size or len(body) >= self.payload_size:
+            return body
+        if body.startswith(b'[') and body.endswith(b']') and len(body) > 2:
+            items = body[1:-1]
+            copies = (self.payload_size - 2) // (len(items) + 1) + 1
+            return b'[' + b','.join([items] * copies) + b']'
+        return body + b' ' * (self.payload_size - len(body))
+
+    def answer(self, verb, path):
+        """ Return the status, the headers and the body to answer a request with, after the latency """
+        with self._lock:
+            self.requests += 1
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency > 0:
+            time.sleep(latency)
+        if self.base_path:
+            if path != self.base_path and not path.startswith(self.base_path + '/'):
+                return 404, {}, b''
+            path = path[len(self.base_path):]
+        methods = self.route(path)
+        if methods is None:
+            return 404, {}, b''
+        response = methods.get(verb)
+        if response is None:
+            return 405, {'Allow': ', '.join(sorted(methods))}, b''
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.error_status, {'Content-Type': 'application/json'}, b'{"errorMessages":["Mock error"],"errors":{}}'
+        headers = {'Content-Type': response.content_type} if response.content_type else {}
+        return response.status, headers, response.body
+
+    def start(self):
+        """ Serve in a background thread, return the base URL """
+        self._server = ThreadingHTTPServer((self.host, self.port), _handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, name='pyware-mock-server', daemon=True)
+        self._thread.start()
+        return self.url
+
+    def serve_forever(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), _handler(self))
+        self.logger.info('Serving %s', self.url)
+        self._server.serve_forever()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return 'http://%s:%d%s' % (host, port, self.base_path)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _match(node, segments, idx):
+    """ Walk the route tree, literal segments before path parameters """
+    if idx == len(segments):
+        return node.get(None)
+    for key in (segments[idx], WILDCARD):
+        child = node.get(key)
+        if child is not None:
+            found = _match(child, segments, idx + 1)
+            if found:
+                return found
+    return None
+
+
+def _success(method):
+    """ Return the status and the representation of the first successful response documented for a method """
+    for response in method.get_response():
+        statuses = [status for status in str(response.get_status() or '200').split() if status.startswith('2')]
+        if statuses:
+            representations = response.get_representation()
+            return int(statuses[0]), representations[0] if representations else None
+    return 200, None
+
+
+def _handler(server):
+    class MockRequestHandler(BaseHTTPRequestHandler):
+        # keep-alive: a client sends many requests over one connection
+        protocol_version = 'HTTP/1.1'
+        # the headers and the body go out in one segment, without waiting for the ACK of the previous one
+        wbufsize = 64 * 1024
+        disable_nagle_algorithm = True
+
+        def handle_one_request(self):
+            self.raw_requestline = self.rfile.readline(65537)
+            if not self.raw_requestline:
+                self.close_connection = True
+                return
+            if not self.parse_request():
+                return
+            self._read_body()
+            status, headers, body = server.answer(self.command, urlsplit(self.path).path.rstrip('/') or '/')
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+            self.wfile.flush()
+
+        def _read_body(self):
+            length = self.headers.get('Content-Length')
+            if length:
+                self.rfile.read(int(length))
+            elif self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+                while True:
+                    size = int(self.rfile.readline().split(b';')[0], 16)
+                    self.rfile.read(size + 2)
+                    if not size:
+                        break
+
+        def log_message(self, *args):
+            pass
+
+    return MockRequestHandler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the API of a WADL on localhost with example responses')
+    parser.add_argument('wadl', help='WADL file')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--base-path', default='', help='Path before the resources, e.g. /rest')
+    parser.add_argument('--latency', type=float, default=0.0, help='Mean seconds per response, exponentially distributed')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of the responses which are errors')
+    parser.add_argument('--payload-size', type=int, default=None, help='Bytes of the response bodies at least')
+    args = parser.parse_args(argv)
+    latency = (lambda: random.expovariate(1.0 / args.latency)) if args.latency else 0.0
+    mock = MockServer(
+        args.wadl, host=args.host, port=args.port, base_path=args.base_path,
+        latency=latency, error_rate=args.error_rate, payload_size=args.payload_size,
+    )
+    try:
+        mock.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    multipart.py: multipart/form-data bodies produced while they are sent
+"""
+
+import os
+import uuid
+import mimetypes
+
+
+def body_length(body):
+    """ Return the number of bytes left in `body` (bytes, file object or mmap), None if it cannot be known """
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        return len(body)
+    if hasattr(body, 'read'):
+        position = body.tell() if hasattr(body, 'tell') else 0
+        if hasattr(body, 'fileno'):
+            try:
+                return os.fstat(body.fileno()).st_size - position
+            except (OSError, ValueError):
+                pass
+        if hasattr(body, '__len__'):
+            return len(body) - position  # mmap
+        if hasattr(body, 'seek'):
+            end = body.seek(0, os.SEEK_END)
+            body.seek(position)
+            return end - position
+    return None
+
+
+def iter_body(body, chunk_size):
+    """ Yield `body` (bytes, file object, mmap or iterable of bytes) in chunks of at most `chunk_size` bytes """
+    if isinstance(body, (bytes, bytearray, memoryview)):
+        view = memoryview(body)
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size]
+    elif hasattr(body, 'read'):
+        chunk = body.read(chunk_size)
+        while chunk:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+            chunk = body.read(chunk_size)
+    else:
+        for chunk in body:
+            yield chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+
+class MultipartEncoder():
+    """ multipart/form-data body which reads its files only while it is sent.
+
+        `files` takes the same forms as the `files` of requests: {name: file} or {name: (filename, file[, content_type[, headers]])},
+        where a file is bytes, a file object, an mmap or an iterable of bytes. `fields` are plain form fields.
+
+        `len` is the size of the whole body if every part has a known size, so the request goes out with
+        a Content-Length; otherwise it is None and the body is sent with chunked transfer encoding.
+    """
+
+    def __init__(self, files, fields=None, boundary=None, chunk_size=64 * 1024):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = 'multipart/form-data; boundary=%s' % self.boundary
+        self.chunk_size = chunk_size
+        self._parts = []
+        for name, value in (fields.items() if isinstance(fields, dict) else fields or []):
+            self._add_part(name, None, str(value).encode('utf-8'), None, None)
+        for name, value in (files.items() if isinstance(files, dict) else files):
+            if isinstance(value, (tuple, list)):
+                filename, body = value[0], value[1]
+                content_type = value[2] if len(value) > 2 else None
+                headers = value[3] if len(value) > 3 else None
+            else:
+                filename, body, content_type, headers = os.path.basename(getattr(value, 'name', name) or name), value, None, None
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            self._add_part(name, filename, body, content_type or 'application/octet-stream', headers)
+        self._closing = ('--%s--\r\n' % self.boundary).encode('ascii')
+
+        lengths = [len(header) + body_length(body) + 2 if body_length(body) is not None else None for header, body in self._parts]
+        self.len = None if None in lengths else sum(lengths) + len(self._closing)
+
+    def _add_part(self, name, filename, body, content_type, headers):
+        disposition = 'form-data; name="%s"' % name
+        if filename is not None:
+            disposition += '; filename="%s"' % filename
+            if content_type == 'application/octet-stream':
+                content_type = mimetypes.guess_type(str(filename))[0] or content_type
+        lines = ['--%s' % self.boundary, 'Content-Disposition: %s' % disposition]
+        if content_type:
+            lines.append('Content-Type: %s' % content_type)
+        lines += ['%s: %s' % header for header in (headers or {}).items()]
+        self._parts.append((('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8'), body))
+
+    def __iter__(self):
+        for header, body in self._parts:
+            yield header
+            yield from iter_body(body, self.chunk_size)
+            yield b'\r\n'
+        yield self._closing
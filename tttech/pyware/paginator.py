@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    paginator.py: Iterate over all items of a paged endpoint, fetching pages ahead and in parallel
+"""
+
+from collections import deque
+from itertools import islice
+from urllib.parse import urlparse, parse_qsl
+from concurrent.futures import ThreadPoolExecutor
+from .payload import create_payload, payload_fields
+
+
+class OffsetPagination():
+    """ Paging by offset and limit with a total, e.g. JIRA: ?startAt=0&maxResults=50 -> {"startAt", "maxResults", "total", "issues": [...]}
+
+        `items_key` names the list of items in a page; by default the first list field. Endpoints answering
+        with a plain list are paged until a page is shorter than the limit.
+    """
+
+    def __init__(self, page_size=50, start_param='startAt', limit_param='maxResults', total_key='total', items_key=None):
+        self.page_size = page_size
+        self.start_param = start_param
+        self.limit_param = limit_param
+        self.total_key = total_key
+        self.items_key = items_key
+
+    def first_page(self, kwargs):
+        kwargs = dict(kwargs)
+        kwargs.setdefault(self.start_param, 0)
+        kwargs.setdefault(self.limit_param, self.page_size)
+        return kwargs
+
+    def items(self, page):
+        if isinstance(page, list):
+            return page
+        if self.items_key is not None:
+            return page[self.items_key]
+        for field in payload_fields(page):
+            if isinstance(page[field], list):
+                return page[field]
+        return []
+
+    def _field(self, page, key):
+        return None if isinstance(page, list) or key not in payload_fields(page) else page[key]
+
+    def _step(self, page, kwargs):
+        # the server may cap the limit, it tells the one it used
+        return self._field(page, self.limit_param) or int(kwargs[self.limit_param])
+
+    def next_page(self, page, kwargs):
+        """ Return the arguments of the page after `page`, or None """
+        items = self.items(page)
+        step = self._step(page, kwargs)
+        start = int(kwargs[self.start_param]) + step
+        total = self._field(page, self.total_key)
+        if not items or self._field(page, 'isLast') or (total is not None and start >= total) or (total is None and len(items) < step):
+            return None
+        return dict(kwargs, **{self.start_param: start})
+
+    def remaining_pages(self, page, kwargs):
+        """ Return the arguments of all following pages if the total is known, None otherwise """
+        total = self._field(page, self.total_key)
+        if total is None or not self.items(page):
+            return None
+        step = self._step(page, kwargs)
+        return (dict(kwargs, **{self.start_param: start}) for start in range(int(kwargs[self.start_param]) + step, total, step))
+
+
+class CursorPagination():
+    """ Paging by an opaque cursor which each page hands out for the next one """
+
+    def __init__(self, cursor_param='cursor', next_key='nextCursor', items_key='values', limit_param=None, page_size=None):
+        self.cursor_param = cursor_param
+        self.next_key = next_key
+        self.items_key = items_key
+        self.limit_param = limit_param
+        self.page_size = page_size
+
+    def first_page(self, kwargs):
+        kwargs = dict(kwargs)
+        if self.limit_param:
+            kwargs.setdefault(self.limit_param, self.page_size)
+        return kwargs
+
+    def items(self, page):
+        return page[self.items_key] if self.items_key in payload_fields(page) else []
+
+    def next_page(self, page, kwargs):
+        cursor = page[self.next_key] if self.next_key in payload_fields(page) else None
+        return dict(kwargs, **{self.cursor_param: cursor}) if cursor else None
+
+    def remaining_pages(self, page, kwargs):
+        return None
+
+
+class LinkHeaderPagination():
+    """ Paging by the RFC 5988 `Link: <...>; rel="next"` response header. The query of the next link becomes the arguments """
+
+    def first_page(self, kwargs):
+        return dict(kwargs, requests_response=True)
+
+    def items(self, response):
+        if not response.ok:
+            raise Exception('Error %d: %s' % (response.status_code, response.text))
+        return create_payload(response.json()) if response.content else []
+
+    def next_page(self, response, kwargs):
+        link = response.links.get('next')
+        if not link:
+            return None
+        return dict(parse_qsl(urlparse(link['url']).query), requests_response=True)
+
+    def remaining_pages(self, response, kwargs):
+        return None
+
+
+class Paginator():
+    """ Iterate lazily over the items of all pages of a generated method.
+
+        E.g. `for issue in Paginator(jira.search.get, jql='project = ABC'): ...`
+
+        While the caller works on a page, the next one is fetched in the background (`prefetch`).
+        Once a page tells the total, the remaining pages are fetched by `max_workers` threads,
+        at most `window` pages ahead of the caller, and their items yielded in order.
+    """
+
+    def __init__(self, method, *args, strategy=None, prefetch=True, max_workers=4, window=None, **kwargs):
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+        self.strategy = strategy or OffsetPagination()
+        self.prefetch = prefetch
+        self.max_workers = max_workers
+        self.window = window or 2 * max_workers
+
+    def _fetch(self, kwargs):
+        return self.method(*self.args, **kwargs)
+
+    def __iter__(self):
+        strategy = self.strategy
+        kwargs = strategy.first_page(self.kwargs)
+        page = self._fetch(kwargs)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers) if self.prefetch or self.max_workers > 1 else None
+        try:
+            remaining = strategy.remaining_pages(page, kwargs) if executor is not None and self.max_workers > 1 else None
+            if remaining is not None:
+                # the total is known: fan out, but stay at most `window` pages ahead of the caller
+                remaining = iter(remaining)
+                pending = deque(executor.submit(self._fetch, page_kwargs) for page_kwargs in islice(remaining, self.window))
+                yield from strategy.items(page)
+                while pending:
+                    page = pending.popleft().result()
+                    for page_kwargs in islice(remaining, 1):
+                        pending.append(executor.submit(self._fetch, page_kwargs))
+                    yield from strategy.items(page)
+                return
+
+            # page by page, the next one is on its way while the caller consumes the current one
+            while page is not None:
+                next_kwargs = strategy.next_page(page, kwargs)
+                next_page = None
+                if next_kwargs is not None and executor is not None:
+                    next_page = executor.submit(self._fetch, next_kwargs)
+                yield from strategy.items(page)
+                if next_kwargs is None:
+                    page = None
+                elif next_page is not None:
+                    page = next_page.result()
+                else:
+                    page = self._fetch(next_kwargs)
+                kwargs = next_kwargs
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
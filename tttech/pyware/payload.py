@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    payload.py: Python objects for the JSON returned by the REST API
+"""
+
+
+def create_payload(d):
+    if isinstance(d, list):
+        ret = []
+        for item in d:
+            ret.append(create_payload(item))
+        return ret
+    if isinstance(d, dict):
+        return DictPayLoad(d)
+    # strings, numbers, booleans and null in lists stay as they are
+    return d
+
+
+class DictPayLoad():
+    """ The class keeps JSON fields of the return """
+
+    def __init__(self, d):
+        self.__dict__ = {}
+        for key, value in d.items():
+            if type(value) is dict:
+                value = DictPayLoad(value)
+            elif type(value) is list:
+                value = create_payload(value)
+            self.__dict__[key] = value
+
+    @classmethod
+    def from_decoded(cls, d):
+        """ Wrap a dict whose nested objects are payloads already, e.g. in a JSON object_hook. The dict is not copied """
+        payload = cls.__new__(cls)
+        payload.__dict__ = d
+        return payload
+
+    def to_dict(self):
+        d = {}
+        for key, value in self.__dict__.items():
+            if isinstance(value, DictPayLoad):
+                value = value.to_dict()
+            d[key] = value
+        return d
+
+    def __repr__(self):
+        return str(self.to_dict())
+
+    def __setitem__(self, key, value):
+        self.__dict__[key] = value
+
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+
+def create_lazy_payload(d):
+    """ Like create_payload, but the objects wrap the decoded dicts and convert their nested values only when they are read """
+    if type(d) is list:
+        return [create_lazy_payload(item) for item in d]
+    if type(d) is dict:
+        return LazyDictPayLoad(d)
+    return d
+
+
+class LazyDictPayLoad(DictPayLoad):
+    """ Keeps the decoded dict and wraps a nested object or list on its first access, which is cached.
+
+        Reading two fields of a large search result converts just these two.
+    """
+    __slots__ = ('_raw',)
+
+    def __init__(self, d):
+        self._raw = d
+
+    def _convert(self, key):
+        value = self.__dict__[key] = create_lazy_payload(self._raw[key])
+        return value
+
+    def __getattr__(self, key):
+        # only called for names which are not converted yet
+        if key == '_raw' or key.startswith('__') or key not in self._raw:
+            raise AttributeError(key)
+        return self._convert(key)
+
+    def to_dict(self):
+        d = {}
+        for key in payload_fields(self):
+            value = self[key]
+            if isinstance(value, DictPayLoad):
+                value = value.to_dict()
+            d[key] = value
+        return d
+
+    def __getitem__(self, key):
+        try:
+            return self.__dict__[key]
+        except KeyError:
+            pass
+        return self._convert(key)
+
+
+class Record():
+    """ Base of the record classes made for the responses of a method (see records.py).
+
+        The fields are slots: no dict per object. A field missing in the response is not set, as in DictPayLoad.
+    """
+    __slots__ = ()
+    _fields = ()
+
+    def to_dict(self):
+        d = {}
+        for key in payload_fields(self):
+            value = getattr(self, key)
+            if isinstance(value, (DictPayLoad, Record)):
+                value = value.to_dict()
+            d[key] = value
+        return d
+
+    def __repr__(self):
+        return str(self.to_dict())
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __getitem__(self, key):
+        if key not in self._fields:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
+def payload_fields(payload):
+    """ Return the field names of a payload object """
+    if isinstance(payload, Record):
+        return [key for key in payload._fields if hasattr(payload, key)]
+    if isinstance(payload, LazyDictPayLoad):
+        return list(payload._raw) + [key for key in payload.__dict__ if key not in payload._raw]
+    return list(vars(payload))
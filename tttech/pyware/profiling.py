@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    profiling.py: Build report of a client: time and memory per phase of parsing the WADL and building the methods,
+    and memory report of a built client: the size of its model by category and resource subtree
+"""
+
+import gc
+import sys
+import time
+import types
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+_NULL = nullcontext()
+
+
+class _NoReport():
+    """ Stands in when no report is made: a phase costs one method call """
+
+    def phase(self, name):
+        return _NULL
+
+    def count(self, name, n=1):
+        pass
+
+
+NO_REPORT = _NoReport()
+
+
+class BuildReport():
+    """ Wall time, memory retained and allocated blocks per phase, counted exclusive of the phases nested in it, and counts
+        of what was built. Memory is traced with tracemalloc while the report is made, if `trace_memory`.
+    """
+
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.phases = {}
+        self.counts = Counter()
+        self.seconds = 0.0
+        self.retained = 0
+        self.peak = 0
+        self._stack = []
+        self._started = None
+        self._tracing = False
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._started = self._mark()
+        return self
+
+    def finish(self):
+        now = self._mark()
+        self.seconds = now[0] - self._started[0]
+        self.retained = now[1] - self._started[1]
+        if self.trace_memory:
+            self.peak = tracemalloc.get_traced_memory()[1] - self._started[1]
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+        return self
+
+    def _mark(self):
+        memory = tracemalloc.get_traced_memory()[0] if self.trace_memory else 0
+        return time.perf_counter(), memory, sys.getallocatedblocks()
+
+    def _charge(self, entry, now):
+        stats = self.phases.get(entry[0])
+        if stats is None:
+            stats = self.phases[entry[0]] = {'calls': 0, 'seconds': 0.0, 'retained': 0, 'blocks': 0}
+        mark = entry[1]
+        stats['seconds'] += now[0] - mark[0]
+        stats['retained'] += now[1] - mark[1]
+        stats['blocks'] += now[2] - mark[2]
+        entry[1] = now
+
+    @contextmanager
+    def phase(self, name):
+        now = self._mark()
+        if self._stack:
+            self._charge(self._stack[-1], now)
+        entry = [name, now]
+        self._stack.append(entry)
+        try:
+            yield
+        finally:
+            now = self._mark()
+            self._stack.pop()
+            self._charge(entry, now)
+            self.phases[name]['calls'] += 1
+            if self._stack:
+                # the enclosing phase goes on from here
+                self._stack[-1][1] = now
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    def to_dict(self):
+        return {
+            'seconds': self.seconds, 'retained': self.retained, 'peak': self.peak,
+            'phases': {name: dict(stats) for name, stats in self.phases.items()},
+            'counts': dict(self.counts),
+        }
+
+    def format(self):
+        lines = ['%-24s %7s %10s %12s %10s' % ('phase', 'calls', 'ms', 'retained KiB', 'blocks')]
+        for name, stats in self.phases.items():
+            lines.append('%-24s %7d %10.1f %12.1f %10d' % (name, stats['calls'], stats['seconds'] * 1e3, stats['retained'] / 1024, stats['blocks']))
+        lines.append('%-24s %7s %10.1f %12.1f' % ('total', '', self.seconds * 1e3, self.retained / 1024))
+        if self.trace_memory:
+            lines.append('peak traced memory: %.1f KiB' % (self.peak / 1024))
+        lines.append(', '.join('%s: %d' % item for item in sorted(self.counts.items())))
+        return '\n'.join(lines)
+
+
+class MemoryReport():
+    """ Bytes of the model of a client by category and by resource subtree, summed with sys.getsizeof over the objects
+        reached from each part. An object is counted once, for the first part added which reaches it; the walk stops at
+        the `boundary` objects (other parts of the model), at modules, classes and module globals.
+    """
+
+    def __init__(self, boundary=(), categories_by_type=None):
+        self.categories = Counter()
+        self.subtrees = Counter()
+        self.counts = Counter()
+        self._boundary = set(map(id, boundary))
+        self._by_type = tuple((categories_by_type or {}).items())
+        self._seen = {id(vars(module)) for module in list(sys.modules.values()) if module is not None}
+
+    def add(self, obj, category, subtree=None):
+        """ Charge `obj` and what it references, not counted yet, to `category` and `subtree`. Objects of a type of
+            `categories_by_type` are charged, with what they reference, to their own category
+        """
+        stack = [(obj, category)]
+        root = True
+        while stack:
+            obj, category = stack.pop()
+            key = id(obj)
+            if key in self._seen or (key in self._boundary and not root) or isinstance(obj, (type, types.ModuleType)):
+                continue
+            root = False
+            self._seen.add(key)
+            for cls, own_category in self._by_type:
+                if isinstance(obj, cls):
+                    category = own_category
+            size = sys.getsizeof(obj, 0)
+            self.categories[category] += size
+            self.subtrees[subtree] += size
+            stack.extend((child, category) for child in gc.get_referents(obj))
+
+    def count(self, name, n=1):
+        self.counts[name] += n
+
+    @property
+    def total(self):
+        return sum(self.categories.values())
+
+    def to_dict(self):
+        return {'total': self.total, 'categories': dict(self.categories), 'subtrees': dict(self.subtrees), 'counts': dict(self.counts)}
+
+    def format(self, top=10):
+        total = self.total or 1
+        lines = ['%-24s %12s %7s' % ('category', 'KiB', '%')]
+        for name, size in self.categories.most_common():
+            lines.append('%-24s %12.1f %7.1f' % (name, size / 1024, 100.0 * size / total))
+        lines.append('%-24s %12.1f' % ('total', self.total / 1024))
+        lines.append('')
+        lines.append('%-40s %12s' % ('resource subtree', 'KiB'))
+        for name, size in self.subtrees.most_common(top):
+            lines.append('%-40s %12.1f' % (name, size / 1024))
+        lines.append(', '.join('%s: %d' % item for item in sorted(self.counts.items())))
+        return '\n'.join(lines)
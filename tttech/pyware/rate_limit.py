@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    rate_limit.py: Client-side token-bucket rate limiting, per host and per endpoint
+"""
+
+import os
+import re
+import time
+import fcntl
+import struct
+import hashlib
+import functools
+import threading
+
+
+class RateLimitExceeded(Exception):
+    """ The request would have to wait longer than allowed for a token """
+
+
+class TokenBucket():
+    """ Token bucket of one process: `rate` tokens per second, at most `burst` tokens saved up.
+
+        Tokens are reserved: a caller takes its token at once, possibly into debt, and sleeps for
+        the time the debt needs to be paid back. Waiting callers are thus served in arrival order.
+    """
+
+    def __init__(self, rate, burst=None):
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        self.rate = float(rate)
+        self.burst = float(burst if burst else max(1.0, rate))
+        self._lock = threading.Lock()
+        self._level = self.burst
+        self._updated = time.monotonic()
+
+    def _load(self):
+        return self._level, self._updated
+
+    def _save(self, level, updated):
+        self._level, self._updated = level, updated
+
+    def reserve(self, tokens=1, max_wait=None):
+        """ Take `tokens` and return the seconds to wait before using them.
+            None (and nothing taken) if that would be longer than `max_wait`.
+        """
+        with self._lock:
+            level, updated = self._load()
+            now = time.monotonic()
+            level = min(self.burst, level + max(0.0, now - updated) * self.rate)
+            wait = 0.0 if level >= tokens else (tokens - level) / self.rate
+            if max_wait is not None and wait > max_wait:
+                self._save(level, now)
+                return None
+            self._save(level - tokens, now)
+            return wait
+
+    def refund(self, tokens=1):
+        """ Give back `tokens` reserved for a request which is not sent """
+        with self._lock:
+            level, updated = self._load()
+            self._save(min(self.burst, level + tokens), updated)
+
+    def pause(self, seconds):
+        """ Hand out no token for the next `seconds`, e.g. after the server answered 429 with Retry-After """
+        with self._lock:
+            level, updated = self._load()
+            now = time.monotonic()
+            level = min(self.burst, level + max(0.0, now - updated) * self.rate)
+            self._save(min(level, 0.0) - seconds * self.rate, now)
+
+
+class _FileLock():
+    """ Thread lock plus an exclusive flock on a file, for state shared between processes """
+
+    def __init__(self, fd):
+        self.fd = fd
+        self._thread_lock = threading.Lock()
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+
+class SharedTokenBucket(TokenBucket):
+    """ Token bucket shared by all processes of a host through a small state file.
+
+        The file holds the token level and the time of the last update (CLOCK_MONOTONIC, which is
+        the same for all processes of a host). Every update happens under an exclusive flock.
+    """
+
+    _STATE = struct.Struct('dd')
+
+    def __init__(self, path, rate, burst=None):
+        super().__init__(rate, burst)
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._lock = _FileLock(self._fd)
+
+    def _load(self):
+        data = os.pread(self._fd, self._STATE.size, 0)
+        if len(data) < self._STATE.size:
+            return self.burst, time.monotonic()
+        level, updated = self._STATE.unpack(data)
+        if updated > time.monotonic():
+            # the state was written before a reboot
+            return self.burst, time.monotonic()
+        return level, updated
+
+    def _save(self, level, updated):
+        os.pwrite(self._fd, self._STATE.pack(level, updated), 0)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class RateLimiter():
+    """ Rate limits for the requests of one or more RestHandlers.
+
+        Every host gets a bucket of `rate` requests per second with `burst` requests saved up.
+        `endpoints` adds limits per resource path prefix, optionally per HTTP method, e.g.
+        {'api/2/search': 5, 'POST api/2/issue': (2, 10)} with values rate or (rate, burst).
+        The most specific endpoint rule applies, on top of the host limit.
+
+        With `shared_dir`, buckets live in files in that directory and all processes of a host
+        using the same directory share them. With `max_wait`, a request which would wait longer
+        raises RateLimitExceeded instead of blocking.
+    """
+
+    def __init__(self, rate, burst=None, endpoints=None, shared_dir=None, max_wait=None):
+        self.rate = rate
+        self.burst = burst
+        self.shared_dir = shared_dir
+        self.max_wait = max_wait
+        self._lock = threading.Lock()
+        self._host_buckets = {}
+        self._endpoint_rules = []
+        for rule, limit in (endpoints or {}).items():
+            verb, _, prefix = rule.rpartition(' ')
+            rule_rate, rule_burst = limit if isinstance(limit, (tuple, list)) else (limit, None)
+            self._endpoint_rules.append((verb.upper() or None, prefix.strip('/'), self._bucket(rule, rule_rate, rule_burst)))
+        # most specific rule first: longest prefix, then rules with a method
+        self._endpoint_rules.sort(key=lambda rule: (len(rule[1]), rule[0] is not None), reverse=True)
+        # the endpoint bucket of (method, path), for the most recent paths: concrete URLs are looked up when the
+        # resource path is unknown
+        self._endpoint_bucket = functools.lru_cache(maxsize=1024)(self._find_endpoint_bucket)
+
+    def _bucket(self, name, rate, burst):
+        if self.shared_dir is None:
+            return TokenBucket(rate, burst)
+        file_name = '%s-%s.bucket' % (re.sub(r'[^\w.-]', '_', name)[:64], hashlib.sha1(name.encode()).hexdigest()[:8])
+        return SharedTokenBucket(os.path.join(self.shared_dir, file_name), rate, burst)
+
+    def _host_bucket(self, host):
+        bucket = self._host_buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self._host_buckets.get(host)
+                if bucket is None:
+                    bucket = self._host_buckets[host] = self._bucket('host ' + host, self.rate, self.burst)
+        return bucket
+
+    def _find_endpoint_bucket(self, mtype, path):
+        path = path.strip('/')
+        return next(
+            (bucket for verb, prefix, bucket in self._endpoint_rules
+             if (verb is None or verb == mtype) and (path == prefix or path.startswith(prefix + '/'))),
+            None
+        )
+
+    def acquire(self, host, mtype, path):
+        """ Block until a request to `path` on `host` may be sent. Return the seconds waited """
+        buckets = [self._host_bucket(host)]
+        endpoint_bucket = self._endpoint_bucket(mtype, path) if self._endpoint_rules else None
+        if endpoint_bucket is not None:
+            buckets.append(endpoint_bucket)
+        wait = 0.0
+        for idx, bucket in enumerate(buckets):
+            bucket_wait = bucket.reserve(max_wait=self.max_wait)
+            if bucket_wait is None:
+                # the request is not sent: the tokens taken from the other buckets go back
+                for reserved in buckets[:idx]:
+                    reserved.refund()
+                raise RateLimitExceeded('%s %s would wait more than %ss for the rate limit' % (mtype, path, self.max_wait))
+            wait = max(wait, bucket_wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def pause(self, host, seconds):
+        """ Stop sending to `host` for `seconds` """
+        self._host_bucket(host).pause(seconds)
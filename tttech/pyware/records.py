@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    records.py: Compact record classes (__slots__) for JSON responses, made from the response schema or inferred from responses
+"""
+
+import re
+import json
+import keyword
+import functools
+import threading
+from lxml import etree
+from .payload import Record, create_payload
+
+XHTML_NS = '{http://www.w3.org/1999/xhtml}'
+XSD_NS = '{http://www.w3.org/2001/XMLSchema}'
+
+# a field kept as a payload on purpose, e.g. a map with arbitrary keys
+PLAIN = 'plain'
+
+
+def documented_json(representation):
+    """ Return the JSON Schema and the example documented for a WADL representation element (None if not documented),
+        e.g. JIRA: <h6>Schema</h6><pre><code>{...}</code></pre> and <h6>Example</h6><pre><code>{...}</code></pre>
+    """
+    found = {}
+    for doc in representation.iterchildren('{*}doc'):
+        for h6 in doc.iter(XHTML_NS + 'h6'):
+            title = (h6.text or '').strip()
+            if title in ('Schema', 'Example') and h6.getnext() is not None:
+                code = h6.getnext().find('.//%scode' % XHTML_NS)
+                if code is not None and code.text:
+                    found[title] = code.text
+    return found.get('Schema'), found.get('Example')
+
+
+class RecordShape():
+    """ A JSON object decoded into `cls`; `fields` are the shapes of its fields """
+    __slots__ = ('cls', 'fields', 'setters')
+
+    def __init__(self, cls, fields):
+        self.cls = cls
+        self.fields = fields
+        self.setters = {name: getattr(cls, name).__set__ for name in fields}
+
+
+class ListShape():
+    """ A JSON array whose items have the shape `item` """
+    __slots__ = ('item',)
+
+    def __init__(self, item):
+        self.item = item
+
+
+@functools.lru_cache(maxsize=4096)
+def recordable(name):
+    """ Whether a JSON key can be a slot """
+    return name.isidentifier() and not keyword.iskeyword(name) and not name.startswith('_') and not hasattr(Record, name)
+
+
+def class_name(title):
+    return ''.join(word[:1].upper() + word[1:] for word in re.findall(r'[A-Za-z0-9]+', title or '')) or 'Record'
+
+
+class RecordMismatch(Exception):
+    """ A JSON object does not fit the records """
+
+
+def decode_records(value, shape, strict=False):
+    """ Decode a decoded JSON value into records of `shape`. Objects which do not fit stay payloads,
+        or raise RecordMismatch if `strict` and they are not PLAIN
+    """
+    value_type = type(value)
+    if value_type is dict:
+        if type(shape) is RecordShape and shape.fields.keys() >= value.keys():
+            record = shape.cls.__new__(shape.cls)
+            fields, setters = shape.fields, shape.setters
+            for key, item in value.items():
+                setters[key](record, decode_records(item, fields[key], strict))
+            return record
+        if strict and shape is not PLAIN:
+            raise RecordMismatch()
+        return create_payload(value)
+    if value_type is list:
+        item = shape.item if type(shape) is ListShape else None
+        return [decode_records(v, item, strict) for v in value]
+    return value
+
+
+class _ObjectDraft():
+    __slots__ = ('title', 'fields')
+
+    def __init__(self, title, fields):
+        self.title = title
+        self.fields = fields
+
+
+class _ListDraft():
+    __slots__ = ('item',)
+
+    def __init__(self, item):
+        self.item = item
+
+
+class RecordFactory():
+    """ Make record classes from JSON Schemas, or from decoded responses, and cache them: equal shapes share their class """
+
+    def __init__(self):
+        self._classes = {}
+        self._lock = threading.Lock()
+
+    def record_class(self, title, names):
+        key = (class_name(title), tuple(names))
+        with self._lock:
+            cls = self._classes.get(key)
+            if cls is None:
+                cls = self._classes[key] = type(key[0], (Record,), {'__slots__': key[1], '_fields': key[1]})
+        return cls
+
+    def classes(self):
+        return list(self._classes.values())
+
+    def shape(self, schema, title=None, definitions=None, resolving=()):
+        """ Return the shape of the values described by a JSON Schema: RecordShape, ListShape, PLAIN, or None if unknown """
+        definitions = schema.get('definitions', definitions or {})
+        ref = schema.get('$ref')
+        if ref is not None:
+            name = ref.rsplit('/', 1)[-1]
+            if name not in definitions or name in resolving:
+                return None
+            return self.shape(definitions[name], title, definitions, resolving + (name,))
+        schema_type = schema.get('type')
+        if schema_type == 'array':
+            return ListShape(self.shape(schema.get('items', {}), title, definitions, resolving))
+        if schema_type == 'object':
+            properties = schema.get('properties')
+            if not properties or schema.get('patternProperties'):
+                # a map, e.g. the fields of a JIRA issue: its records are inferred from the responses
+                return None
+            if not all(recordable(name) for name in properties):
+                return PLAIN
+            fields = {name: self.shape(prop, prop.get('title') or name, definitions, resolving) for name, prop in properties.items()}
+            return RecordShape(self.record_class(schema.get('title') or title, fields), fields)
+        return None
+
+    def infer(self, value, shape=None, title=None):
+        """ Return the shape of a decoded response, merged with `shape` inferred from earlier responses """
+        return self._build(self._observe(value, self._draft(shape), title))
+
+    def _draft(self, shape):
+        if type(shape) is RecordShape:
+            return _ObjectDraft(shape.cls.__name__, {name: self._draft(field) for name, field in shape.fields.items()})
+        if type(shape) is ListShape:
+            return _ListDraft(self._draft(shape.item))
+        return shape
+
+    def _observe(self, value, draft, title):
+        if type(value) is list:
+            if type(draft) is not _ListDraft:
+                draft = _ListDraft(None)
+            for item in value:
+                draft.item = self._observe(item, draft.item, title)
+            return draft
+        if type(value) is dict:
+            if draft is PLAIN or not all(recordable(name) for name in value):
+                return PLAIN
+            if type(draft) is not _ObjectDraft:
+                draft = _ObjectDraft(title, {})
+            fields = draft.fields
+            for name, item in value.items():
+                fields[name] = self._observe(item, fields.get(name), name)
+            return draft
+        return draft
+
+    def _build(self, draft):
+        if type(draft) is _ObjectDraft:
+            fields = {name: self._build(field) for name, field in draft.fields.items()}
+            return RecordShape(self.record_class(draft.title, fields), fields)
+        if type(draft) is _ListDraft:
+            return ListShape(self._build(draft.item))
+        return draft
+
+
+class RecordDecoder():
+    """ Decode the responses of one method into records.
+
+        Objects the schema does not describe, or all without a schema, get records inferred from the first response
+        which has them. A later response with more fields extends the records.
+    """
+
+    def __init__(self, factory, title, schema=None):
+        self.factory = factory
+        self.title = title
+        if isinstance(schema, str):
+            schema = json.loads(schema)
+        self.shape = factory.shape(schema, title) if schema else None
+
+    def decode(self, value):
+        try:
+            return decode_records(value, self.shape, strict=True)
+        except RecordMismatch:
+            self.shape = self.factory.infer(value, self.shape, self.title)
+            return decode_records(value, self.shape)
+
+
+def xsd_schemas(path):
+    """ Return the JSON Schemas of the global elements of an XML Schema file, by element name """
+    root = etree.parse(path).getroot()
+    complex_types = {ct.get('name'): ct for ct in root.iterfind(XSD_NS + 'complexType')}
+
+    def local(name):
+        return name.rsplit(':', 1)[-1] if name else name
+
+    def type_schema(complex_type, title, resolving):
+        properties = {}
+
+        def particles(node):
+            for child in node:
+                tag = etree.QName(child).localname if isinstance(child.tag, str) else None
+                if tag in ('sequence', 'all', 'choice', 'complexContent', 'simpleContent'):
+                    particles(child)
+                elif tag == 'extension':
+                    base = local(child.get('base'))
+                    if base in complex_types and base not in resolving:
+                        properties.update(type_schema(complex_types[base], base, resolving + (base,))['properties'])
+                    particles(child)
+                elif tag == 'element':
+                    name = child.get('name') or local(child.get('ref'))
+                    schema = element_schema(child, resolving)
+                    if child.get('maxOccurs', '1') not in ('0', '1'):
+                        schema = {'type': 'array', 'items': schema}
+                    properties[name] = schema
+                elif tag == 'attribute':
+                    properties[child.get('name') or local(child.get('ref'))] = {}
+
+        particles(complex_type)
+        return {'title': title, 'type': 'object', 'properties': properties}
+
+    def element_schema(element, resolving=()):
+        inline = element.find(XSD_NS + 'complexType')
+        if inline is not None:
+            return type_schema(inline, element.get('name'), resolving)
+        type_name = local(element.get('type'))
+        if type_name in complex_types and type_name not in resolving:
+            return type_schema(complex_types[type_name], type_name, resolving + (type_name,))
+        return {}
+
+    return {element.get('name'): element_schema(element) for element in root.iterfind(XSD_NS + 'element')}
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    single_flight.py: Coalesce identical calls which are in flight at the same time
+"""
+
+import threading
+
+
+class _Call():
+    """ One call in flight, waited for by its followers """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight():
+    """ Table of the calls in flight. A call whose key is already in flight does not run:
+        it waits for the running one and shares its result, or its exception.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """ Run `fn` once per key in flight. Return (result, shared) """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # later calls with this key are new calls, they must not get this result
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self):
+        return len(self._calls)
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+""" PyWaRe - Python WADL for RESTful API
+
+    timing.py: Time spent per phase of a call, from building the URL to decoding the payload
+"""
+
+import time
+import threading
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# the phases, in the order they happen
+PHASES = ('build', 'encode', 'throttle', 'compress', 'headers', 'checkout', 'connect', 'send', 'wait', 'transfer', 'decode')
+# the phases measured while the request is sent, the rest of that time is 'transfer'
+SEND_PHASES = ('headers', 'checkout', 'connect', 'send', 'wait')
+
+_local = threading.local()
+
+
+class PhaseTimer():
+    """ Seconds per phase of one call, in `phases`; 'total' when it is finished """
+    __slots__ = ('phases', '_started', '_mark')
+
+    def __init__(self):
+        self.phases = {}
+        self._started = self._mark = time.perf_counter()
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def lap(self, phase):
+        """ Count the time since the last lap, or the start, to `phase` """
+        now = time.perf_counter()
+        self.add(phase, now - self._mark)
+        self._mark = now
+
+    @contextmanager
+    def phase(self, phase):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started)
+
+    def send_time(self):
+        return sum(self.phases.get(phase, 0.0) for phase in SEND_PHASES)
+
+    def finish(self):
+        self.phases['total'] = time.perf_counter() - self._started
+        return self.phases
+
+
+def use_timer(timer):
+    """ Time the call in progress in this thread with `timer` """
+    _local.timer = timer
+
+
+def current_timer():
+    """ The timer of the call in progress in this thread, None if the call is not timed """
+    return getattr(_local, 'timer', None)
+
+
+def stop_timer():
+    timer = current_timer()
+    _local.timer = None
+    return timer.finish() if timer is not None else None
+
+
+def _timed(phase, fn, *args, **kwargs):
+    timer = current_timer()
+    if timer is None:
+        return fn(*args, **kwargs)
+    with timer.phase(phase):
+        return fn(*args, **kwargs)
+
+
+class _TimedConnection():
+    """ Connection which counts DNS, TCP and TLS set up ('connect'), sending the request ('send') and waiting
+        for the response headers ('wait', the server time)
+    """
+
+    def connect(self):
+        return _timed('connect', super().connect)
+
+    def request(self, *args, **kwargs):
+        timer = current_timer()
+        if timer is None:
+            return super().request(*args, **kwargs)
+        # a plain HTTP connection connects on its first request, that is 'connect'
+        connected = timer.phases.get('connect', 0.0)
+        started = time.perf_counter()
+        try:
+            return super().request(*args, **kwargs)
+        finally:
+            timer.add('send', time.perf_counter() - started - (timer.phases.get('connect', 0.0) - connected))
+
+    def getresponse(self, *args, **kwargs):
+        return _timed('wait', super().getresponse, *args, **kwargs)
+
+
+class TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    pass
+
+
+class _TimedPool():
+    """ Connection pool which counts waiting for a free connection ('checkout') """
+
+    def _get_conn(self, *args, **kwargs):
+        return _timed('checkout', super()._get_conn, *args, **kwargs)
+
+
+class TimedHTTPConnectionPool(_TimedPool, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(_TimedPool, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """ HTTPAdapter whose connection pools time the network phases of the call in progress """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
@@ -6,11 +6,18 @@
 
 import os
 import re
-import logging
 import json
+import bisect
+import logging
 import types
+from lxml import etree
 from . import wadl
 from .core import RestHandler
+from .payload import DictPayLoad, create_payload
+from .json_stream import iter_json_items
+from .records import RecordFactory, RecordDecoder, documented_json, xsd_schemas
+from .timing import PhaseTimer, use_timer
+from .profiling import NO_REPORT
 
 
 class WadlParser():
@@ -22,31 +29,55 @@ class WadlParser():
             self,
             wadl_file=None,
             rest_handler=None,
+            build_report=None,
     ):
-        logging.basicConfig(level=logging.DEBUG, format='%(message)s')
         self.logger = logging.getLogger(__name__)
+        # time and memory per phase of the build (profiling.BuildReport)
+        self._report = build_report or NO_REPORT
         wadl_files = [] if not wadl_file else [wadl_file] if not isinstance(wadl_file, list) else wadl_file
         self._resources = []  # a list of resources by their REST URL
         self.method_count = 0
+        self._grammars = {}  # JSON Schemas of the elements of the XML Schema grammars, by element name
+        self._wadl_files = wadl_files
+        self._documented = None  # JSON Schemas and examples documented for the representations, read on first use
+        self._item_records = {}  # record decoders of the elements of streamed arrays, by method and path
+        self.records = RecordFactory()
 
         for wadl_f in wadl_files:
             self.logger.info('Loading WADL: %s', wadl_f)
             self._parse_wadl(wadl_file=wadl_f)
+            self._report.count('wadl_files')
+        with self._report.phase('invalidation_scopes'):
+            self._link_invalidation_scopes()
         self.logger.info("WADL OBJECT IS CREATED!")
 
         self.rest_handler = rest_handler
 
     def _parse_wadl(self, wadl_file=None):
         """ Load all the resources """
-        app = wadl.parse(wadl_file, silence=True)
+        # as wadl.parse, in two steps to tell the XML parsing from the build of the generated objects
+        with self._report.phase('xml_parse'):
+            doc = wadl.parsexml_(wadl_file)
+        with self._report.phase('object_build'):
+            root = doc.getroot()
+            app = (wadl.get_root_tag(root)[1] or wadl.application).factory()
+            app.build(root)
+            doc = root = None
+        if app.get_grammars():
+            with self._report.phase('grammars'):
+                for include in app.get_grammars().get_include():
+                    path = os.path.join(os.path.dirname(wadl_file), include.get_href() or '')
+                    if include.get_href() and os.path.isfile(path):
+                        self._grammars.update(xsd_schemas(path))
         for resources in app.get_resources():
             for resource in resources.get_resource():
-                self._parse_resource(resource)
+                with self._report.phase('resources'):
+                    self._parse_resource(resource)
         self.logger.info("ALL WADL IS DONE")
 
     def _parse_resource(self, resource, resource_parent=None, level=1):
         """ Load a single resource and recursive for child resource """
-        self.logger.info("%s Resource: %s " % ("  " * level, resource.get_path()))
+        self.logger.info("%s Resource: %s ", "  " * level, resource.get_path())
         resource_path = resource.get_path()
 
         # because resources are recursive, we take the parent path_param first
@@ -71,6 +102,7 @@ class WadlParser():
         resource_cls._path_full = http_normalize_slashes('/'.join([resource_parent._path_full, resource_path]) if resource_parent else resource_path)
         resource_cls._category = 'resource'
         resource_cls._path_param = resource_path_param
+        resource_cls._parent = resource_parent
         resource_cls._children = []
         resource_cls._methods = []
 
@@ -78,20 +110,23 @@ class WadlParser():
 
         # build the method. The method does not know
         for method in resource.get_method():
-            method_cls = self._parse_method(method, resource_cls, level=level + 1)
+            with self._report.phase('methods'):
+                method_cls = self._parse_method(method, resource_cls, level=level + 1)
             resource_cls._methods.append(method_cls)
 
         # child resources
         if resource.get_resource():
             for resource_child in resource.get_resource():
-                resource_child_cls = self._parse_resource(resource_child, resource_parent=resource_cls, level=level + 1)
+                with self._report.phase('resources'):
+                    resource_child_cls = self._parse_resource(resource_child, resource_parent=resource_cls, level=level + 1)
                 resource_cls._children.append(resource_child_cls)
-        self.logger.info("%s Resource done: %s " % ("  " * level, resource.get_path()))
+        self.logger.info("%s Resource done: %s ", "  " * level, resource.get_path())
+        self._report.count('resources')
         return resource_cls
 
     def _parse_method(self, method, resource_cls, level=1):
         """ Load methods from a single resource and add as attributes """
-        self.logger.info("%s + Method: %s" % ("  " * level, method.get_id()))
+        self.logger.info("%s + Method: %s", "  " * level, method.get_id())
 
         method_query_param = []
         method_path_param = resource_cls._path_param[:] if resource_cls._path_param else []
@@ -110,13 +145,14 @@ class WadlParser():
             request_headers = {}
 
         # Build the method
-        tmethod = self._method_creator(
-            resource_cls._path_full,  # REST URL to invoke
-            method.get_name(),  # method_type: GET/POST/PUT/DELETE
-            tuple(p.get_name() for p in method_path_param),  # parameters in {} in URL
-            tuple(p.get_name() for p in method_query_param),
-            headers=request_headers,
-        )  # parameters after ? in URL
+        with self._report.phase('closures'):
+            tmethod = self._method_creator(
+                resource_cls._path_full,  # REST URL to invoke
+                method.get_name(),  # method_type: GET/POST/PUT/DELETE
+                tuple(p.get_name() for p in method_path_param),  # parameters in {} in URL
+                tuple(p.get_name() for p in method_query_param),
+                headers=request_headers,
+            )  # parameters after ? in URL
         tmethod.__name__ = method.get_id()
         tmethod.__doc__ = method.get_doc()
         tmethod._category = "method"
@@ -124,34 +160,176 @@ class WadlParser():
         tmethod._resource_path = resource_cls._path_full
         tmethod._path_params = [p for p in method_path_param if p]
         tmethod._query_params = [p for p in method_query_param if p]
+        tmethod._invalidates = ()
+        tmethod._records = None
         tmethod.__wadl__ = method
 
         self.method_count += 1
+        self._report.count('methods')
+        self._report.count('params', len(tmethod._path_params) + len(tmethod._query_params))
         return tmethod
 
+    def _response_schema(self, method):
+        """ Return the JSON Schema of the successful JSON response of a generateDS method (from its docs or the grammars,
+            None if unknown) and the name of its records
+        """
+        for response in method.get_response():
+            if not all(status.startswith('2') for status in str(response.get_status() or '200').split()):
+                continue
+            for representation in response.get_representation():
+                if 'json' not in (representation.get_mediaType() or ''):
+                    continue
+                element = (representation.get_element() or '').rsplit(':', 1)[-1]
+                schema = self.documented(representation)[0]
+                return schema or self._grammars.get(element), element or method.get_id()
+        return None, method.get_id()
+
+    def _record_decoder(self, method):
+        if method._records is None:
+            schema, title = self._response_schema(method.__wadl__)
+            method._records = RecordDecoder(self.records, title, schema)
+        return method._records
+
+    def _item_loader(self, rest_handler, method, path):
+        """ Return the function decoding the JSON text of an element of a streamed array, as `rest_handler` decodes
+            responses: into records, lazy payloads or payloads, with its JSON codec. None for payloads
+        """
+        codec = rest_handler.json_codec
+        if rest_handler.records:
+            decoder = self._item_record_decoder(method, path)
+            return lambda text: decoder.decode(codec.loads(text))
+        if rest_handler.lazy_payloads:
+            return codec.loads_lazy_payload
+        # payloads come from the hooked standard decoder with every codec: iter_json_items decodes them so by default
+        return None
+
+    def _item_record_decoder(self, method, path):
+        """ The records of the elements of the array at `path` of the responses of `method`: the schema of the
+            response, if any, tells their shape
+        """
+        key = (method, path)
+        if key not in self._item_records:
+            schema, title = self._response_schema(method.__wadl__)
+            if isinstance(schema, str):
+                schema = json.loads(schema)
+            definitions = (schema or {}).get('definitions', {})
+            for name in path.split('.') if path else []:
+                schema = ((schema or {}).get('properties') or {}).get(name)
+                title = name
+            schema = (schema or {}).get('items')
+            if schema:
+                schema = dict(schema, definitions=definitions)
+                title = schema.get('title', title)
+            self._item_records[key] = RecordDecoder(self.records, title, schema)
+        return self._item_records[key]
+
+    def documented(self, representation):
+        """ Return the JSON Schema and the example documented for a generateDS representation (None if not documented).
+
+            The generated docs keep their direct text only: the WADL files are read again for these, once, when records
+            or the mock server first need them.
+        """
+        if self._documented is None:
+            self._documented = self._read_documented()
+        return self._documented.get(id(representation), (None, None))
+
+    def _read_documented(self):
+        methods = {}
+        for resource in self._resources:
+            for method in resource._methods:
+                methods[(resource._path_full, method.__wadl__.get_id(), method.__wadl__.get_name())] = method.__wadl__
+        documented = {}
+        for wadl_file in self._wadl_files:
+            for path_full, node in iter_method_nodes(etree.parse(wadl_file).getroot()):
+                method = methods.get((path_full, node.get('id'), node.get('name')))
+                if method is None:
+                    continue
+                # the generated objects keep the order of the elements
+                for response, response_node in zip(method.get_response(), node.iterchildren('{*}response')):
+                    for representation, representation_node in zip(response.get_representation(), response_node.iterchildren('{*}representation')):
+                        docs = documented_json(representation_node)
+                        if docs != (None, None):
+                            documented[id(representation)] = docs
+        return documented
+
+    def _link_invalidation_scopes(self):
+        """ Tell every writing method which cached GET responses it makes stale.
+
+            A write below the first path parameter changes that entity, e.g. POST api/2/issue/{issueIdOrKey}/worklog
+            changes the issue: every GET on api/2/issue/{issueIdOrKey} and below, and the listing api/2/issue.
+            A write without path parameter, e.g. POST api/2/issue, only changes the listing.
+        """
+        # the paths with GET methods, sorted: the paths below a path follow it, as one range found by bisection
+        cached = sorted({
+            resource._path_full for resource in self._resources
+            if any(method._resttype == 'get' for method in resource._methods)
+        })
+        for resource in self._resources:
+            for method in resource._methods:
+                if method._resttype not in ('post', 'put', 'delete', 'patch'):
+                    continue
+                segments = resource._path_full.split('/')
+                entity_idx = next((idx for idx, segment in enumerate(segments) if segment.startswith('{')), None)
+                if entity_idx is None:
+                    scope = [(resource._path_full, False)]
+                else:
+                    scope = [('/'.join(segments[:entity_idx + 1]), True), ('/'.join(segments[:entity_idx]), False)]
+                method._invalidates = tuple(
+                    (self._cached_resources(path, subtree, cached), path, subtree)
+                    for path, subtree in scope
+                )
+
+    @staticmethod
+    def _cached_resources(path, subtree, cached):
+        """ Return the paths of `cached` (sorted) equal to `path`, and below it if `subtree` """
+        idx = bisect.bisect_left(cached, path)
+        found = [path] if idx < len(cached) and cached[idx] == path else []
+        if subtree:
+            prefix = path + '/'
+            idx = bisect.bisect_left(cached, prefix, idx)
+            while idx < len(cached) and cached[idx].startswith(prefix):
+                found.append(cached[idx])
+                idx += 1
+        return tuple(sorted(found))
+
     def _method_creator(self, url, mtype, tparams, qparams, headers=None, timeout=None):
         """ Create method, actually to return a _do_request function """
         self.logger.debug("  --> Creating method: %s, %s, %s, %s", url, mtype, tparams, qparams)
 
-        def method_template(*args, **kwds):
-            """ A closure to capture REST arguments and return a REST method wrapper.
+        def invoke(rest_handler, args, kwds):
+            """ A closure to capture REST arguments and return a REST method wrapper, calling through `rest_handler`.
                 
                 The arguments can be overwritten during the method call. E.g. add custom `headers` into the call.
             """
-            # data_dict is a special parameter, to store the REST payload
+            # with phase timing, binding the arguments is the 'build' phase
+            timer = PhaseTimer() if rest_handler.phase_timing else None
+
+            # data_dict is a special parameter, to store the REST payload: a dict (sent as JSON), bytes,
+            # a file object, an mmap or a generator of bytes (streamed, never read into memory as a whole)
             data_dict = kwds.pop("data_dict", None)
 
             # cookies is a special parameter, to store the custom cookies
             cookies = kwds.pop("cookie", None)
 
-            # upload a files, user can pass: files = {'upload_file': open('file.txt', 'rb')}
+            # upload a files, user can pass: files = {'upload_file': open('file.txt', 'rb')}, the files are streamed
             files = kwds.pop("files", None)
 
             # return_full_response: to return the whole "requests" response object, don't manipulate the JSON
             requests_response = kwds.pop("requests_response", False)
 
-            # custom headers to be update to the default headers
-            headers.update(kwds.pop("headers", {}))
+            # stream: return the body as an iterator of byte chunks instead of reading it into memory
+            # stream_to: write the body into a file name or a file-like object, return the number of bytes written
+            # stream_json: yield the elements of the JSON array in the body as payloads while it arrives; True for a body
+            # which is an array, or the path of the array, e.g. 'issues'
+            stream = kwds.pop("stream", False)
+            stream_to = kwds.pop("stream_to", None)
+            stream_json = kwds.pop("stream_json", None)
+            chunk_size = kwds.pop("chunk_size", 64 * 1024)
+            stream = stream or stream_to is not None or stream_json is not None
+
+            # custom headers to be update to the default headers, for this call only
+            call_headers = dict(headers or {})
+            call_headers.update(kwds.pop("headers", {}))
 
             # here we append optional parameters to the mandatory param list if param name matches
             mandatory_param_list = list(args)
@@ -161,13 +339,11 @@ class WadlParser():
                     mandatory_param_list.append(kwds[tparam])
                     del optional_param_dict[tparam]
 
-            self.logger.debug("Template params: %s", str(tparams))
-            self.logger.debug("Template args  : %s", str(mandatory_param_list))
-            self.logger.debug("Query params   : %s", str(qparams))
-            self.logger.debug("Query args     : %s", str(optional_param_dict))
-            self.logger.debug("URL            : %s", url)
-            self.logger.debug("DATADICT       : %s", data_dict)
-            self.logger.debug("Files          : %s", len(files) if files else 0)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(
+                    "Call %s %s, template params %s: %s, query params %s: %s, data: %s, files: %d",
+                    mtype, url, tparams, mandatory_param_list, qparams, optional_param_dict, data_dict, len(files) if files else 0,
+                )
 
             path_param_list = re.findall("{(.*?)}", url)
             # args is for path parameter, is mandatory
@@ -176,12 +352,8 @@ class WadlParser():
                 self.logger.error("Provided args: %s", str(args))
                 raise ValueError('Not enough arguments')
 
-            do_url = url
-
-            for idx, val in enumerate(path_param_list):
-                # First replace REST positional arguments in { }
-                if idx < len(mandatory_param_list):
-                    do_url = do_url.replace("{%s}" % val, str(mandatory_param_list[idx]))
+            # First replace REST positional arguments in { }
+            do_url = bind_path_params(url, path_param_list, mandatory_param_list)
             # then make the REST query arguments, using kwargs
             url_args = '&'.join(["%s=%s" % (k, v) for k, v in optional_param_dict.items()])
 
@@ -189,68 +361,153 @@ class WadlParser():
             if url_args:
                 do_url = "%s?%s" % (do_url, url_args)
 
-            response = self.rest_handler.do_request(do_url, mtype, headers=headers, data_dict=data_dict, cookies=cookies, files=files, timeout=None)
+            # cached responses made stale by this call, with the path parameters of this call
+            invalidates = [
+                (resources, bind_path_params(path, path_param_list, mandatory_param_list), subtree)
+                for resources, path, subtree in method_template._invalidates
+            ]
+
+            def send():
+                return rest_handler.do_request(
+                    do_url, mtype, headers=call_headers, data_dict=data_dict, cookies=cookies, files=files, timeout=None,
+                    resource_path=url, invalidates=invalidates, stream=stream, method_name=method_template.__name__,
+                )
+
+            def result(response):
+                if stream_json is not None and not requests_response:
+                    path = None if stream_json is True else stream_json
+                    return stream_json_items(response, path, chunk_size, self._item_loader(rest_handler, method_template, path))
+                if stream and not requests_response:
+                    return stream_response(response, stream_to, chunk_size)
+                if timer is not None and not requests_response:
+                    with timer.phase('decode'):
+                        return self._process_response(response, requests_response, method_template, rest_handler)
+                return self._process_response(response, requests_response, method_template, rest_handler)
+
+            def call():
+                # identical GET calls in flight, with the same headers and cookies, share one round trip. Each caller
+                # decodes the body into objects of its own
+                if mtype == 'GET' and not stream and rest_handler.single_flight is not None and (cookies is None or isinstance(cookies, dict)):
+                    key = (mtype, do_url, tuple(sorted(call_headers.items())), tuple(sorted((cookies or {}).items())))
+                    return result(rest_handler.coalesce(key, send))
+                return result(send())
+
+            if timer is None:
+                return call()
+            use_timer(timer)
+            try:
+                return call()
+            finally:
+                rest_handler.finish_timing(method_template.__name__, mtype, url)
+
+        def method_template(*args, **kwds):
+            return invoke(self.rest_handler, args, kwds)
+
+        # the method without its transport: a client bound to another RestHandler calls it (see ClientBuilder.bind)
+        method_template._invoke = invoke
+        return method_template
 
-            self.logger.debug(response.text)
+    def _process_response(self, response, requests_response=False, method=None, rest_handler=None):
+        """ Turn the response of a generated method into its return value """
+        # the option requests_response = True, the function return the whole object
+        if requests_response == True:
+            return response
+
+        rest_handler = rest_handler or self.rest_handler
+        rest_handler.body_log.log(self.logger, logging.DEBUG, response)
+
+        # otherwise, the response is processed. Exception upon failure.
+        if not response.ok:
+            raise Exception('Error %d: %s' % (response.status_code, response.text))
+
+        # extract Payload if possible: decoded straight from the body bytes, payload objects built while decoding
+        if response and "application/json" in response.headers['Content-Type'] and response.content:
+            if rest_handler.records and method is not None:
+                return self._record_decoder(method).decode(rest_handler.json_codec.loads(response.content))
+            if rest_handler.lazy_payloads:
+                return rest_handler.json_codec.loads_lazy_payload(response.content)
+            return rest_handler.json_codec.loads_payload(response.content)
+
+        # if the response cannot be processed (e.g. XML, plaintext), return it the content or failed
+        if response:
+            return response.content
+        else:
+            return '<No response message>'
 
-            # the option requests_response = True, the function return the whole object
-            if requests_response == True:
-                return response
 
-            # otherwise, the response is processed. Exception upon failure.
-            if not response.ok:
-                raise Exception('Error %d: %s' % (response.status_code, response.text))
+def http_normalize_slashes(url):
+    return '/'.join(filter(None, url.split('/')))
 
-            # extract Payload if possible.
-            if response and "application/json" in response.headers['Content-Type'] and response.text:
-                return create_payload(json.loads(response.text))
 
-            # if the response cannot be processed (e.g. XML, plaintext), return it the content or failed
-            if response:
-                return response.content
-            else:
-                return '<No response message>'
+def iter_method_nodes(node, path_full=None):
+    """ Yield the full resource path and the element of every method of a WADL element tree """
+    for child in node.iterchildren('{*}resources', '{*}resource', '{*}method'):
+        tag = etree.QName(child).localname
+        if tag == 'resources':
+            yield from iter_method_nodes(child)
+        elif tag == 'resource':
+            path = child.get('path')
+            yield from iter_method_nodes(child, http_normalize_slashes('/'.join([path_full, path]) if path_full is not None else path))
+        elif path_full is not None:
+            yield path_full, child
 
-        return method_template
 
+def bind_path_params(url, path_param_list, values):
+    """ Replace the {path parameters} of a resource path with the given values """
+    for idx, val in enumerate(path_param_list):
+        if idx < len(values):
+            url = url.replace("{%s}" % val, str(values[idx]))
+    return url
 
-def http_normalize_slashes(url):
-    return '/'.join(filter(None, url.split('/')))
+def stream_response(response, sink=None, chunk_size=64 * 1024):
+    """ Return the body of a streamed response as an iterator of byte chunks, or copy it into `sink`.
 
-def create_payload(d):
-    if isinstance(d, list):
-        ret = []
-        for item in d:
-            ret.append(create_payload(item))
-        return ret
-    return DictPayLoad(d)
-
-
-class DictPayLoad():
-    """ The class keeps JSON fields of the return """
-
-    def __init__(self, d):
-        self.__dict__ = {}
-        for key, value in d.items():
-            if type(value) is dict:
-                value = DictPayLoad(value)
-            elif type(value) is list:
-                value = create_payload(value)
-            self.__dict__[key] = value
-
-    def to_dict(self):
-        d = {}
-        for key, value in self.__dict__.items():
-            if type(value) is DictPayLoad:
-                value = value.to_dict()
-            d[key] = value
-        return d
-
-    def __repr__(self):
-        return str(self.to_dict())
-
-    def __setitem__(self, key, value):
-        self.__dict__[key] = value
-
-    def __getitem__(self, key):
-        return self.__dict__[key]
+        `sink` is a file name or a file-like object. At most `chunk_size` bytes of the body are held in memory.
+    """
+    if not response.ok:
+        try:
+            raise Exception('Error %d: %s' % (response.status_code, response.text))
+        finally:
+            response.close()
+    if sink is None:
+        return iter_chunks(response, chunk_size)
+    try:
+        if isinstance(sink, (str, bytes, os.PathLike)):
+            with open(sink, 'wb') as f:
+                return copy_chunks(response, f, chunk_size)
+        return copy_chunks(response, sink, chunk_size)
+    finally:
+        response.close()
+
+def stream_json_items(response, path=None, chunk_size=64 * 1024, loads=None):
+    """ Return an iterator of the elements of the JSON array at `path` of a streamed response, decoded by `loads`
+        (payload objects by default)
+    """
+    if not response.ok:
+        try:
+            raise Exception('Error %d: %s' % (response.status_code, response.text))
+        finally:
+            response.close()
+    return iter_json_response(response, path, chunk_size, loads)
+
+def iter_json_response(response, path, chunk_size, loads=None):
+    """ Yield the elements, the connection goes back to the pool when done or abandoned """
+    try:
+        yield from iter_json_items(response.iter_content(chunk_size), path, loads)
+    finally:
+        response.close()
+
+def iter_chunks(response, chunk_size):
+    """ Yield the body chunk by chunk, the connection goes back to the pool when done or abandoned """
+    try:
+        for chunk in response.iter_content(chunk_size):
+            yield chunk
+    finally:
+        response.close()
+
+def copy_chunks(response, f, chunk_size):
+    written = 0
+    for chunk in response.iter_content(chunk_size):
+        f.write(chunk)
+        written += len(chunk)
+    return written